@@ -45,7 +45,8 @@ def extract_and_parse_json(text: str):
 class AIClient:
     """Client for interacting with Claude AI."""
 
-    def __init__(self):
+    def __init__(self, on_usage=None):
+        """`on_usage(tokens)` is called after every API call with the tokens it billed."""
         if not HAS_ANTHROPIC:
             raise RuntimeError("Anthropic SDK is not installed")
 
@@ -57,6 +58,13 @@ class AIClient:
         # Use Haiku for individual summaries (cheaper), Sonnet for overall (better quality)
         self.model_fast = "claude-haiku-4-5-20251001"
         self.model_quality = "claude-sonnet-4-5-20250929"
+        self.on_usage = on_usage
+
+    def _create_message(self, **kwargs):
+        response = self.client.messages.create(**kwargs)
+        if self.on_usage:
+            self.on_usage(response.usage.input_tokens + response.usage.output_tokens)
+        return response
 
     def generate_commit_group_summary(
         self,
@@ -133,7 +141,7 @@ Provide a structured analysis. Respond with valid JSON only, no markdown:
 Keep each list to max 5 items. Focus on the most important changes."""
 
         try:
-            response = self.client.messages.create(
+            response = self._create_message(
                 model=self.model_fast,
                 max_tokens=10000,
                 messages=[{"role": "user", "content": prompt}],
@@ -165,6 +173,78 @@ Keep each list to max 5 items. Focus on the most important changes."""
                 "main_contributors": [],
             }
 
+    def generate_issue_summaries(self, issues: list[dict]) -> dict:
+        """
+        Summarize several closed issues (with their resolution PR) in one call.
+
+        Each issue dict has number, title, description, labels, discussion and
+        an optional resolution_pr dict (number, title, description).
+
+        Returns a dict with:
+        - summaries: {issue number: {summary, problem, solution, pr_summary}}
+        - tokens_used: input + output tokens billed for the call
+        """
+        blocks = []
+        for issue in issues:
+            labels = ", ".join(issue["labels"]) or "none"
+            discussion = "\n".join(
+                f"  - {comment['author']}: {comment['body']}" for comment in issue["discussion"]
+            ) or "  (no comments)"
+            block = (
+                f"### Issue #{issue['number']}: {issue['title']}\n"
+                f"Labels: {labels}\n"
+                f"Description:\n{issue['description'] or '(empty)'}\n"
+                f"Discussion:\n{discussion}"
+            )
+            pr = issue.get("resolution_pr")
+            if pr:
+                block += (
+                    f"\nResolved by PR #{pr['number']}: {pr['title']}\n"
+                    f"{pr['description'] or '(no description)'}"
+                )
+            blocks.append(block)
+
+        issues_text = "\n\n".join(blocks)
+
+        prompt = f"""Summarize each of these closed GitHub issues and how it was resolved.
+
+{issues_text}
+
+Respond with valid JSON only, no markdown, with one entry per issue:
+{{
+  "issues": [
+    {{
+      "number": 123,
+      "summary": "One sentence summary of the issue and its outcome",
+      "problem": "2-3 sentences describing the underlying problem",
+      "solution": "2-3 sentences describing how it was fixed, or how it was closed if not fixed",
+      "pr_summary": "One sentence summary of the resolving PR, or null if there is none"
+    }}
+  ]
+}}"""
+
+        try:
+            response = self._create_message(
+                model=self.model_fast,
+                max_tokens=min(400 * len(issues) + 200, 10000),
+                messages=[{"role": "user", "content": prompt}],
+            )
+
+            tokens_used = response.usage.input_tokens + response.usage.output_tokens
+            result = extract_and_parse_json(response.content[0].text) or {}
+
+            summaries = {}
+            for item in result.get("issues", []):
+                try:
+                    summaries[int(item["number"])] = item
+                except (KeyError, TypeError, ValueError):
+                    continue
+            return {"summaries": summaries, "tokens_used": tokens_used}
+
+        except Exception as e:
+            logger.error(f"AI API error for issue summaries: {e}")
+            return {"summaries": {}, "tokens_used": 0}
+
     def generate_overall_summary(
         self,
         repo_name: str,
@@ -225,7 +305,7 @@ Write a comprehensive but concise summary (3-5 paragraphs) that covers:
 Write in a professional, informative tone. Focus on insights that would help someone understand the project's evolution."""
 
         try:
-            response = self.client.messages.create(
+            response = self._create_message(
                 model=self.model_fast,
                 max_tokens=10000,
                 messages=[{"role": "user", "content": prompt}],
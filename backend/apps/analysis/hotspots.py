@@ -0,0 +1,200 @@
+"""
+File hotspot and code-ownership analytics.
+
+Per-file changes are rolled up into PathActivityRollup rows keyed by
+(path prefix, week, author). Rollups are rebuilt only for the weeks that
+received newly ingested commits.
+"""
+
+import logging
+from datetime import datetime, time, timedelta, timezone
+
+from django.db import transaction
+from django.db.models import F, Sum
+
+logger = logging.getLogger(__name__)
+
+
+def _week_start(value):
+    """Monday of the week containing a date (matches weekly commit groups)."""
+    return value - timedelta(days=value.weekday())
+
+
+def _path_prefixes(path: str):
+    """
+    Yield (prefix, parent, is_file) for every directory of a path and the file itself.
+
+    'src/app/main.py' -> ('src', ''), ('src/app', 'src'), ('src/app/main.py', 'src/app')
+    """
+    parts = path.split("/")
+    parent = ""
+    for depth in range(1, len(parts) + 1):
+        prefix = "/".join(parts[:depth])
+        yield prefix, parent, depth == len(parts)
+        parent = prefix
+
+
+def update_hotspot_rollups(repository, batch_size: int = 1000) -> int:
+    """
+    Roll up file changes of newly ingested commits into weekly path activity.
+
+    Every week touched by a commit ingested since the last run is rebuilt from
+    all of that week's commits. Returns the number of weeks rebuilt.
+    """
+    from apps.repositories.models import (
+        CommitData,
+        CommitFileChange,
+        PathActivityRollup,
+    )
+
+    started_at = datetime.now(timezone.utc)
+
+    new_commits = CommitData.objects.filter(repository=repository)
+    if repository.hotspots_rolled_up_at:
+        new_commits = new_commits.filter(created_at__gt=repository.hotspots_rolled_up_at)
+
+    weeks = {
+        _week_start(commit_date.date())
+        for commit_date in new_commits.values_list("commit_date", flat=True)
+    }
+    if not weeks:
+        return 0
+
+    range_start = datetime.combine(min(weeks), time.min, tzinfo=timezone.utc)
+    range_end = datetime.combine(max(weeks) + timedelta(days=7), time.min, tzinfo=timezone.utc)
+
+    changes = (
+        CommitFileChange.objects.filter(
+            commit__repository=repository,
+            commit__commit_date__gte=range_start,
+            commit__commit_date__lt=range_end,
+        )
+        .order_by("commit_id")
+        .values_list(
+            "commit_id",
+            "commit__commit_date",
+            "commit__contributor__github_username",
+            "commit__author_name",
+            "path__path",
+            "additions",
+            "deletions",
+        )
+    )
+
+    # (path, week, author) -> [parent, is_file, commits, additions, deletions, last commit id]
+    buckets = {}
+    for row in changes.iterator(chunk_size=5000):
+        commit_id, commit_date, username, author_name, path, additions, deletions = row
+        week = _week_start(commit_date.date())
+        if week not in weeks:
+            continue
+
+        author = username or author_name
+        for prefix, parent, is_file in _path_prefixes(path):
+            bucket = buckets.get((prefix, week, author))
+            if bucket is None:
+                bucket = buckets[(prefix, week, author)] = [parent, is_file, 0, 0, 0, None]
+            # Rows are ordered by commit, so a commit is counted once per prefix
+            if bucket[5] != commit_id:
+                bucket[2] += 1
+                bucket[5] = commit_id
+            bucket[3] += additions
+            bucket[4] += deletions
+
+    with transaction.atomic():
+        PathActivityRollup.objects.filter(repository=repository, week_start__in=weeks).delete()
+        PathActivityRollup.objects.bulk_create(
+            [
+                PathActivityRollup(
+                    repository=repository,
+                    path=path,
+                    parent=parent,
+                    is_file=is_file,
+                    week_start=week,
+                    author=author,
+                    commits=commits,
+                    additions=additions,
+                    deletions=deletions,
+                )
+                for (path, week, author), (
+                    parent, is_file, commits, additions, deletions, _
+                ) in buckets.items()
+            ],
+            batch_size=batch_size,
+        )
+        repository.hotspots_rolled_up_at = started_at
+        repository.save(update_fields=["hotspots_rolled_up_at"])
+
+    logger.info(
+        f"Rebuilt hotspot rollups for {len(weeks)} weeks of {repository.full_name}"
+    )
+    return len(weeks)
+
+
+def get_hotspots(
+    repository,
+    path: str = "",
+    since=None,
+    until=None,
+    limit: int = 20,
+    owners: int = 3,
+) -> list[dict]:
+    """
+    Return the most-churned children of a directory with their top owners.
+
+    Churn is additions + deletions over the window. Ownership share is an
+    author's churn divided by the path's total churn.
+    """
+    from apps.repositories.models import PathActivityRollup
+
+    rollups = PathActivityRollup.objects.filter(repository=repository, parent=path)
+    if since:
+        rollups = rollups.filter(week_start__gte=_week_start(since))
+    if until:
+        rollups = rollups.filter(week_start__lte=until)
+
+    totals = list(
+        rollups.values("path", "is_file")
+        .annotate(
+            churn=Sum(F("additions") + F("deletions")),
+            commits=Sum("commits"),
+            additions=Sum("additions"),
+            deletions=Sum("deletions"),
+        )
+        .order_by("-churn", "path")[:limit]
+    )
+
+    owners_by_path = {}
+    author_rows = (
+        rollups.filter(path__in=[row["path"] for row in totals])
+        .values("path", "author")
+        .annotate(churn=Sum(F("additions") + F("deletions")), commits=Sum("commits"))
+        .order_by("path", "-churn", "author")
+    )
+    for row in author_rows:
+        owners_by_path.setdefault(row["path"], []).append(row)
+
+    hotspots = []
+    for row in totals:
+        churn = row["churn"] or 0
+        hotspots.append(
+            {
+                "path": row["path"],
+                "type": "file" if row["is_file"] else "directory",
+                "commits": row["commits"],
+                "additions": row["additions"],
+                "deletions": row["deletions"],
+                "churn": churn,
+                "top_contributors": [
+                    {
+                        "author": owner["author"],
+                        "commits": owner["commits"],
+                        "churn": owner["churn"],
+                        "share": round(owner["churn"] / churn, 4) if churn else 0,
+                    }
+                    for owner in owners_by_path.get(row["path"], [])[:owners]
+                ],
+            }
+        )
+
+    return hotspots
@@ -0,0 +1,299 @@
+"""
+Full-text and similarity search over issues ("issue archaeology").
+
+Each issue stores a weighted tsvector (title, AI problem/solution descriptions,
+body, discussion and the linked PR) and a MinHash signature of its terms.
+Signatures are split into LSH bands stored in a GIN-indexed array, so similar
+issue candidates are found with a single array-overlap lookup and ranked by
+the estimated Jaccard similarity of their signatures. Everything runs inside
+Postgres and this process; no external search service is needed.
+
+Issues changed since the repository's `issues_indexed_at` watermark are
+reindexed by `update_issue_search_index`, which ingestion calls after upserts.
+"""
+
+import hashlib
+import logging
+import re
+from datetime import datetime, timezone
+
+from django.contrib.postgres.search import (
+    SearchHeadline,
+    SearchQuery,
+    SearchRank,
+    SearchVector,
+)
+from django.db import transaction
+from django.db.models import F, OuterRef, Subquery, TextField, Value
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Cast, Coalesce, Concat
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CONFIG = "english"
+
+_EMPTY = Value("", output_field=TextField())
+_SPACE = Value(" ", output_field=TextField())
+
+# One-permutation MinHash: each term hash lands in one of 64 bins. The 64 bins
+# are grouped into 32 bands of 2, so pairs with Jaccard >= ~0.18 share a band.
+NUM_BINS = 64
+BAND_ROWS = 2
+
+_BIN_BITS = 6
+_VALUE_BITS = 52
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9_]{2,}")
+_STOPWORDS = frozenset(
+    """
+    about after again also and any are because been before being but can cannot
+    could did does doing done for from had has have having here how into its just
+    like more most not now off once only other our out over same should some such
+    than that the their them then there these they this those through too under
+    until very was were what when where which while who why will with would you
+    your issue issues please thanks thank using use used get got bug
+    """.split()
+)
+
+
+def issue_search_document():
+    """Weighted tsvector stored in Issue.search_vector."""
+    from apps.repositories.models import PullRequest, discussion_text
+
+    linked_pr_text = Subquery(
+        PullRequest.objects.filter(pk=OuterRef("resolution_pr_id"))
+        .annotate(
+            text=Concat(Cast("title", TextField()), _SPACE, Coalesce("description", _EMPTY))
+        )
+        .values("text")[:1]
+    )
+    return (
+        SearchVector("title", weight="A", config=SEARCH_CONFIG)
+        + SearchVector(
+            "problem_description", "solution_description", weight="B", config=SEARCH_CONFIG
+        )
+        + SearchVector("description", weight="B", config=SEARCH_CONFIG)
+        + SearchVector(discussion_text(), weight="C", config=SEARCH_CONFIG)
+        + SearchVector(linked_pr_text, weight="D", config=SEARCH_CONFIG)
+    )
+
+
+def _terms(*texts) -> set:
+    """Lowercased word set of the given texts, without stopwords."""
+    terms = set()
+    for text in texts:
+        if text:
+            terms.update(_TOKEN_RE.findall(text.lower()))
+    return terms - _STOPWORDS
+
+
+def _term_hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode(), digest_size=8).digest(), "big")
+
+
+def minhash_signature(terms) -> list[int]:
+    """
+    MinHash signature of a term set (empty for an empty set).
+
+    One hash per term instead of one per term and permutation; empty bins are
+    filled from the next non-empty bin, offset by the distance, so signatures
+    stay comparable position by position.
+    """
+    bins = [None] * NUM_BINS
+    for term in terms:
+        term_hash = _term_hash(term)
+        slot = term_hash & (NUM_BINS - 1)
+        value = (term_hash >> _BIN_BITS) & ((1 << _VALUE_BITS) - 1)
+        if bins[slot] is None or value < bins[slot]:
+            bins[slot] = value
+
+    if all(value is None for value in bins):
+        return []
+
+    signature = []
+    for slot in range(NUM_BINS):
+        distance = 0
+        while bins[(slot + distance) % NUM_BINS] is None:
+            distance += 1
+        signature.append(bins[(slot + distance) % NUM_BINS] + (distance << _VALUE_BITS))
+    return signature
+
+
+def lsh_bands(signature: list[int]) -> list[int]:
+    """Hash each band of a signature into a signed 64-bit bucket id."""
+    bands = []
+    for start in range(0, len(signature), BAND_ROWS):
+        key = f"{start}:" + ",".join(map(str, signature[start:start + BAND_ROWS]))
+        digest = hashlib.blake2b(key.encode(), digest_size=8).digest()
+        bands.append(int.from_bytes(digest, "big", signed=True))
+    return bands
+
+
+def estimated_similarity(first: list[int], second: list[int]) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures."""
+    if not first or len(first) != len(second):
+        return 0.0
+    return sum(a == b for a, b in zip(first, second)) / len(first)
+
+
+def _issue_terms(issue) -> set:
+    discussion = " ".join(comment.get("body", "") for comment in issue.discussion or [])
+    return _terms(
+        issue.title,
+        issue.description,
+        issue.problem_description,
+        issue.solution_description,
+        discussion,
+    )
+
+
+def update_issue_search_index(repository, batch_size: int = 500) -> int:
+    """
+    Reindex issues changed since the last run (all issues on the first run).
+
+    Returns the number of issues reindexed.
+    """
+    from apps.repositories.models import Issue
+
+    started_at = datetime.now(timezone.utc)
+
+    changed = Issue.objects.filter(repository=repository)
+    if repository.issues_indexed_at:
+        changed = changed.filter(updated_at__gte=repository.issues_indexed_at)
+
+    issue_ids = list(changed.values_list("id", flat=True))
+    if issue_ids:
+        # tsvectors are computed in the database in one statement per batch
+        for start in range(0, len(issue_ids), batch_size):
+            Issue.objects.filter(id__in=issue_ids[start:start + batch_size]).update(
+                search_vector=issue_search_document()
+            )
+
+        fields = ["title", "description", "problem_description", "solution_description", "discussion"]
+        for start in range(0, len(issue_ids), batch_size):
+            issues = list(Issue.objects.filter(id__in=issue_ids[start:start + batch_size]).only("id", *fields))
+            for issue in issues:
+                issue.minhash_signature = minhash_signature(_issue_terms(issue))
+                issue.minhash_bands = lsh_bands(issue.minhash_signature)
+            with transaction.atomic():
+                Issue.objects.bulk_update(issues, ["minhash_signature", "minhash_bands"])
+
+    repository.issues_indexed_at = started_at
+    repository.save(update_fields=["issues_indexed_at"])
+
+    logger.info(f"Indexed {len(issue_ids)} issues for {repository.full_name}")
+    return len(issue_ids)
+
+
+def search_issues(repository, query: str, limit: int = 20, state: str = None) -> list[dict]:
+    """
+    Return issues matching a web-search style query, best first, with snippets.
+
+    Only the top `limit` rows get headlines, so snippet generation cost does not
+    grow with the number of matches.
+    """
+    from apps.repositories.models import Issue
+
+    search_query = SearchQuery(query, search_type="websearch", config=SEARCH_CONFIG)
+    matches = Issue.objects.filter(repository=repository, search_vector=search_query)
+    if state:
+        matches = matches.filter(state=state)
+
+    top = list(
+        matches.annotate(rank=SearchRank(F("search_vector"), search_query))
+        .order_by("-rank", "-created_at_github")
+        .values_list("id", "rank")[:limit]
+    )
+    if not top:
+        return []
+
+    ranks = dict(top)
+    body = Concat(
+        Coalesce("problem_description", _EMPTY),
+        _SPACE,
+        Coalesce("description", _EMPTY),
+    )
+    headline_options = {"max_words": 35, "min_words": 15, "max_fragments": 2}
+    rows = Issue.objects.filter(id__in=ranks).annotate(
+        title_snippet=SearchHeadline(
+            "title", search_query, config=SEARCH_CONFIG, highlight_all=True
+        ),
+        body_snippet=SearchHeadline(body, search_query, config=SEARCH_CONFIG, **headline_options),
+    ).values(
+        "id",
+        "issue_number",
+        "title",
+        "state",
+        "created_at_github",
+        "closed_at",
+        "resolution_pr__pr_number",
+        "title_snippet",
+        "body_snippet",
+    )
+
+    hits = []
+    for row in rows:
+        hits.append(
+            {
+                "id": row["id"],
+                "issue_number": row["issue_number"],
+                "title": row["title"],
+                "state": row["state"],
+                "created_at_github": row["created_at_github"],
+                "closed_at": row["closed_at"],
+                "resolution_pr_number": row["resolution_pr__pr_number"],
+                "rank": round(ranks[row["id"]], 6),
+                "title_snippet": row["title_snippet"],
+                "snippet": row["body_snippet"],
+            }
+        )
+    hits.sort(key=lambda hit: (-hit["rank"], -hit["created_at_github"].timestamp()))
+    return hits
+
+
+def similar_issues(issue, limit: int = 10, min_similarity: float = 0.1) -> list[dict]:
+    """
+    Return issues whose MinHash signatures are closest to the given issue.
+
+    Candidates sharing an LSH band come from the GIN index; the ones sharing
+    the most bands are re-ranked by estimated Jaccard similarity.
+    """
+    from apps.repositories.models import Issue
+
+    if not issue.minhash_bands:
+        return []
+
+    shared_bands = RawSQL(
+        f"SELECT count(*) FROM unnest({Issue._meta.db_table}.minhash_bands) AS band"
+        " WHERE band = ANY(%s)",
+        (issue.minhash_bands,),
+    )
+    candidates = (
+        Issue.objects.filter(
+            repository_id=issue.repository_id,
+            minhash_bands__overlap=issue.minhash_bands,
+        )
+        .exclude(id=issue.id)
+        .annotate(shared_bands=shared_bands)
+        .order_by("-shared_bands")
+        .values(
+            "id",
+            "issue_number",
+            "title",
+            "state",
+            "closed_at",
+            "resolution_pr__pr_number",
+            "minhash_signature",
+        )[:max(limit * 10, 100)]
+    )
+
+    similar = []
+    for candidate in candidates:
+        similarity = estimated_similarity(issue.minhash_signature, candidate.pop("minhash_signature"))
+        if similarity >= min_similarity:
+            candidate["resolution_pr_number"] = candidate.pop("resolution_pr__pr_number")
+            candidate["similarity"] = round(similarity, 4)
+            similar.append(candidate)
+
+    similar.sort(key=lambda candidate: (-candidate["similarity"], -candidate["issue_number"]))
+    return similar[:limit]
@@ -0,0 +1,176 @@
+"""
+Batched AI problem/solution extraction for closed issues.
+
+Closed issues are packed, together with their resolution PR and discussion,
+into multi-issue LLM calls. Each issue stores a hash of the content it was
+summarized from, so unchanged issues are skipped on later runs. A per-repository
+token budget caps each run; issues left over are summarized on the next one.
+"""
+
+import hashlib
+import json
+import logging
+from datetime import datetime, timezone
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+# Bump to re-summarize every issue after changing the prompt or the packed content
+SUMMARY_VERSION = 1
+
+MAX_DESCRIPTION_CHARS = 1500
+MAX_PR_DESCRIPTION_CHARS = 1000
+MAX_COMMENTS = 5
+MAX_COMMENT_CHARS = 400
+
+# Rough output allowance per issue, used when estimating a batch's cost
+OUTPUT_TOKENS_PER_ISSUE = 250
+
+
+def _estimate_tokens(text: str) -> int:
+    """Approximate token count (~4 characters per token)."""
+    return len(text) // 4 + 1
+
+
+def _issue_payload(issue) -> dict:
+    """Truncated content sent to the model for one issue."""
+    payload = {
+        "number": issue.issue_number,
+        "title": issue.title,
+        "description": (issue.description or "")[:MAX_DESCRIPTION_CHARS],
+        "labels": issue.labels or [],
+        "discussion": [
+            {
+                "author": comment.get("author", "unknown"),
+                "body": (comment.get("body") or "")[:MAX_COMMENT_CHARS],
+            }
+            for comment in (issue.discussion or [])[:MAX_COMMENTS]
+        ],
+        "resolution_pr": None,
+    }
+    pr = issue.resolution_pr
+    if pr:
+        payload["resolution_pr"] = {
+            "number": pr.pr_number,
+            "title": pr.title,
+            "description": (pr.description or "")[:MAX_PR_DESCRIPTION_CHARS],
+        }
+    return payload
+
+
+def _content_hash(payload: dict) -> str:
+    content = json.dumps([SUMMARY_VERSION, payload], sort_keys=True, default=str)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+def _pack_batches(items: list, max_batch_tokens: int, max_batch_size: int):
+    """Group (issue, payload, hash, tokens) items into batches under the token limit."""
+    batch, batch_tokens = [], 0
+    for item in items:
+        tokens = item[3]
+        if batch and (batch_tokens + tokens > max_batch_tokens or len(batch) >= max_batch_size):
+            yield batch
+            batch, batch_tokens = [], 0
+        batch.append(item)
+        batch_tokens += tokens
+    if batch:
+        yield batch
+
+
+def summarize_closed_issues(repository, ai_client, token_budget: int = None) -> dict:
+    """
+    Generate ai_summary / problem / solution for closed issues whose content changed.
+
+    Also fills PullRequest.ai_summary for the resolution PRs involved. A batch
+    whose call fails is logged and skipped; its issues are retried next run.
+    Returns {'summarized', 'skipped', 'pending', 'failed', 'calls', 'tokens_used'}.
+    """
+    from apps.repositories.models import Issue, PullRequest
+
+    if token_budget is None:
+        token_budget = settings.AI_ISSUE_SUMMARY_TOKEN_BUDGET
+
+    issues = (
+        Issue.objects.filter(repository=repository, state=Issue.IssueState.CLOSED)
+        .select_related("resolution_pr")
+        .order_by("-closed_at", "-issue_number")
+    )
+
+    pending, skipped = [], 0
+    for issue in issues.iterator(chunk_size=500):
+        payload = _issue_payload(issue)
+        content_hash = _content_hash(payload)
+        if content_hash == issue.ai_content_hash:
+            skipped += 1
+            continue
+        tokens = _estimate_tokens(json.dumps(payload)) + OUTPUT_TOKENS_PER_ISSUE
+        pending.append((issue, payload, content_hash, tokens))
+
+    stats = {"summarized": 0, "skipped": skipped, "pending": 0, "failed": 0, "calls": 0, "tokens_used": 0}
+
+    batches = _pack_batches(
+        pending,
+        max_batch_tokens=settings.AI_ISSUE_SUMMARY_BATCH_TOKENS,
+        max_batch_size=settings.AI_ISSUE_SUMMARY_BATCH_SIZE,
+    )
+    for batch in batches:
+        estimate = sum(item[3] for item in batch)
+        if stats["tokens_used"] + estimate > token_budget:
+            logger.info(f"Issue summary token budget reached for {repository.full_name}")
+            break
+
+        stats["calls"] += 1
+        try:
+            result = ai_client.generate_issue_summaries([item[1] for item in batch])
+        except Exception as e:
+            result = {"summaries": {}, "tokens_used": 0}
+            logger.error(f"Issue summary batch failed for {repository.full_name}: {e}")
+        # A failed call is charged its estimate, so an outage cannot outrun the budget
+        stats["tokens_used"] += result["tokens_used"] or estimate
+        summaries = result["summaries"]
+        if not summaries:
+            # Hashes stay unset, so the batch's issues are retried on the next run
+            logger.warning(
+                f"Issue summary batch of {len(batch)} issues returned nothing for {repository.full_name}"
+            )
+            stats["failed"] += len(batch)
+            continue
+
+        now = datetime.now(timezone.utc)
+        updated_issues, updated_prs = [], []
+        for issue, payload, content_hash, _ in batch:
+            summary = summaries.get(issue.issue_number)
+            if not summary:
+                continue
+            issue.ai_summary = summary.get("summary") or ""
+            issue.problem_description = summary.get("problem") or ""
+            issue.solution_description = summary.get("solution") or ""
+            issue.ai_content_hash = content_hash
+            # updated_at is bumped so the search index picks up the new descriptions
+            issue.updated_at = now
+            updated_issues.append(issue)
+
+            if issue.resolution_pr and summary.get("pr_summary"):
+                issue.resolution_pr.ai_summary = summary["pr_summary"]
+                issue.resolution_pr.updated_at = now
+                updated_prs.append(issue.resolution_pr)
+
+        with transaction.atomic():
+            Issue.objects.bulk_update(
+                updated_issues,
+                ["ai_summary", "problem_description", "solution_description", "ai_content_hash", "updated_at"],
+            )
+            PullRequest.objects.bulk_update(updated_prs, ["ai_summary", "updated_at"])
+
+        stats["summarized"] += len(updated_issues)
+
+    stats["pending"] = len(pending) - stats["summarized"]
+
+    logger.info(
+        f"Summarized {stats['summarized']} issues in {stats['calls']} calls "
+        f"({stats['tokens_used']} tokens, {stats['pending']} pending, {stats['failed']} failed) "
+        f"for {repository.full_name}"
+    )
+    return stats
@@ -0,0 +1,156 @@
+"""
+Issue -> pull request resolution linking.
+
+PR titles, bodies and the messages of their commits are scanned for GitHub
+closing keywords ("fixes #123", "closes owner/repo#45", "resolves
+https://github.com/owner/repo/issues/7") with a single compiled pattern.
+Referenced numbers are resolved through an in-memory issue-number map and
+written to Issue.resolution_pr in bulk.
+
+Only PRs that may link differently since the repository's `issues_linked_at`
+watermark are scanned: PRs changed since, and PRs that can reference issues or
+contain commits first stored since (which arrive in a later fetch than the PR).
+"""
+
+import logging
+import re
+from datetime import datetime, timezone
+
+from django.db.models import Min, Q
+
+logger = logging.getLogger(__name__)
+
+CLOSING_REFERENCE_RE = re.compile(
+    r"\b(?:close[sd]?|fix(?:e[sd])?|resolve[sd]?)\b:?\s+"
+    r"(?:"
+    r"(?P<repo>[\w.-]+/[\w.-]+)?#"
+    r"|https?://github\.com/(?P<url_repo>[\w.-]+/[\w.-]+)/issues/"
+    r")"
+    r"(?P<number>\d+)\b",
+    re.IGNORECASE,
+)
+
+
+def closing_references(text: str, full_name: str) -> set[int]:
+    """Issue numbers in this repository that `text` says it closes."""
+    full_name = full_name.lower()
+    numbers = set()
+    for match in CLOSING_REFERENCE_RE.finditer(text):
+        repo = match.group("repo") or match.group("url_repo")
+        if repo and repo.lower() != full_name:
+            continue
+        numbers.add(int(match.group("number")))
+    return numbers
+
+
+def _link_priority(state: str, merged_at, created_at) -> tuple:
+    """Sort key preferring merged PRs, then the most recent one."""
+    from apps.repositories.models import PullRequest
+
+    moment = merged_at or created_at
+    return (state == PullRequest.PRState.MERGED, moment.timestamp() if moment else 0)
+
+
+def _pull_requests_to_scan(repository, since) -> Q:
+    """
+    Filter for PRs whose links may have changed since the `since` watermark.
+
+    Besides PRs changed since, that is PRs updated on GitHub after the
+    earliest issue first stored since was opened (a PR cannot reference an
+    issue before that), and PRs containing commits first stored since.
+    """
+    from apps.repositories.models import CommitData, Issue
+
+    condition = Q(updated_at__gte=since)
+
+    issues_opened_at = Issue.objects.filter(repository=repository, created_at__gte=since).aggregate(
+        opened_at=Min("created_at_github")
+    )["opened_at"]
+    if issues_opened_at:
+        condition |= Q(updated_at_github__gte=issues_opened_at)
+
+    new_shas = list(
+        CommitData.objects.filter(repository=repository, created_at__gte=since)
+        .order_by()
+        .values_list("commit_sha", flat=True)
+    )
+    if new_shas:
+        condition |= Q(commit_shas__has_any_keys=new_shas)
+
+    return condition
+
+
+def link_issues_to_pull_requests(repository) -> int:
+    """
+    Set Issue.resolution_pr from closing references in PRs that may link differently.
+
+    When several PRs close the same issue, a merged PR wins over an unmerged
+    one and the latest wins among equals. Returns the number of issues updated.
+    """
+    from apps.repositories.models import CommitData, Issue, PullRequest
+
+    started_at = datetime.now(timezone.utc)
+
+    pull_requests = PullRequest.objects.filter(repository=repository)
+    if repository.issues_linked_at:
+        pull_requests = pull_requests.filter(
+            _pull_requests_to_scan(repository, repository.issues_linked_at)
+        )
+    pull_requests = list(
+        pull_requests.values_list(
+            "id", "title", "description", "commit_shas", "state", "merged_at", "created_at_github"
+        )
+    )
+
+    updated = 0
+    if pull_requests:
+        commit_messages = dict(
+            CommitData.objects.filter(
+                repository=repository,
+                commit_sha__in={sha for pr in pull_requests for sha in pr[3] or []},
+            ).values_list("commit_sha", "commit_message")
+        )
+        issue_ids = dict(
+            Issue.objects.filter(repository=repository).values_list("issue_number", "id")
+        )
+
+        # issue id -> (priority, pr id) of the best PR closing it
+        candidates = {}
+        for pr_id, title, description, commit_shas, state, merged_at, created_at in pull_requests:
+            text = "\n".join(
+                [title, description or ""]
+                + [commit_messages.get(sha, "") for sha in commit_shas or []]
+            )
+            priority = _link_priority(state, merged_at, created_at)
+            for number in closing_references(text, repository.full_name):
+                issue_id = issue_ids.get(number)
+                if issue_id and (issue_id not in candidates or priority > candidates[issue_id][0]):
+                    candidates[issue_id] = (priority, pr_id)
+
+        current = Issue.objects.filter(id__in=candidates).values_list(
+            "id",
+            "resolution_pr_id",
+            "resolution_pr__state",
+            "resolution_pr__merged_at",
+            "resolution_pr__created_at_github",
+        )
+        changed = []
+        for issue_id, linked_pr_id, state, merged_at, created_at in current:
+            priority, pr_id = candidates[issue_id]
+            if pr_id == linked_pr_id:
+                continue
+            if linked_pr_id and _link_priority(state, merged_at, created_at) > priority:
+                continue
+            # updated_at is bumped so the search index picks up the linked PR text
+            changed.append(Issue(id=issue_id, resolution_pr_id=pr_id, updated_at=started_at))
+
+        Issue.objects.bulk_update(changed, ["resolution_pr", "updated_at"], batch_size=500)
+        updated = len(changed)
+
+    repository.issues_linked_at = started_at
+    repository.save(update_fields=["issues_linked_at"])
+
+    logger.info(
+        f"Linked {updated} issues from {len(pull_requests)} pull requests for {repository.full_name}"
+    )
+    return updated
@@ -0,0 +1,69 @@
+"""
+Scheduling helpers for periodic repository updates.
+
+Each cron-enabled repository carries `next_update_at`. The first update is
+placed at a random point of its period, so repositories enabled together come
+due spread out rather than all at once. GitHub API usage is reserved against a
+per-user hourly budget before an update is enqueued, since every repository of
+a user spends from the same token's rate limit; repositories over budget stay
+due and are picked up by a later scheduler run rather than deferred by an ETA.
+"""
+
+import random
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+
+FREQUENCY_INTERVALS = {
+    "weekly": timedelta(days=7),
+    "monthly": timedelta(days=30),
+}
+
+# Seconds kept between the longest countdown and the broker's visibility timeout
+COUNTDOWN_MARGIN_SECONDS = 300
+
+
+def update_countdown(window: int) -> float:
+    """
+    Random countdown within `window` seconds for a scheduled update.
+
+    A task waiting on a countdown stays unacknowledged on the Redis broker, so
+    a countdown reaching its visibility timeout would have the update
+    delivered, and run, twice. Countdowns are clamped below it.
+    """
+    visibility_timeout = settings.CELERY_BROKER_TRANSPORT_OPTIONS.get("visibility_timeout", 3600)
+    limit = max(min(window, visibility_timeout - COUNTDOWN_MARGIN_SECONDS), 0)
+    return random.uniform(0, limit)
+
+
+def next_update_at(frequency: str, now, first: bool = False):
+    """When a repository with this cron frequency should next be updated."""
+    interval = FREQUENCY_INTERVALS.get(frequency, FREQUENCY_INTERVALS["weekly"])
+    if first:
+        return now + interval * random.random()
+    return now + interval
+
+
+def _budget_key(user_id, now) -> str:
+    return f"github:budget:{user_id}:{now:%Y%m%d%H}"
+
+
+def reserve_github_budget(user_id, cost: int, now) -> bool:
+    """
+    Reserve `cost` GitHub requests from the user's budget for the current hour.
+
+    Returns False (reserving nothing) when the budget would be exceeded.
+    """
+    key = _budget_key(user_id, now)
+    cache.add(key, 0, timeout=3600)
+    try:
+        used = cache.incr(key, cost)
+    except ValueError:
+        # Expired between add() and incr()
+        cache.set(key, cost, timeout=3600)
+        used = cost
+    if used > settings.GITHUB_HOURLY_REQUEST_BUDGET:
+        cache.decr(key, cost)
+        return False
+    return True
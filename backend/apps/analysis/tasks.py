@@ -0,0 +1,87 @@
+"""
+Periodic analysis tasks run by Celery beat.
+"""
+
+import logging
+from datetime import datetime, timedelta, timezone
+
+from celery import shared_task
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Q
+
+from .scheduling import next_update_at, reserve_github_budget, update_countdown
+
+logger = logging.getLogger(__name__)
+
+
+def update_enqueued_key(repository_id) -> str:
+    """Cache key held while a scheduled update of a repository is queued."""
+    return f"repository:{repository_id}:update-enqueued"
+
+
+@shared_task(ignore_result=True)
+def update_all_repositories():
+    """
+    Enqueue incremental updates for cron-enabled repositories that are due.
+
+    Due repositories come from one query on the partial `next_update_at` index,
+    oldest first. Each enqueued pipeline run gets a random countdown within the
+    scheduling window (kept below the broker's visibility timeout), so a run's
+    updates are spread out rather than started together. Repositories whose
+    owner has no GitHub budget left this hour, or that already have an update
+    queued, stay due for a later run.
+    """
+    from apps.repositories.models import Repository
+    from apps.repositories.tasks import SCHEDULED_PRIORITY, run_repository_pipeline
+
+    now = datetime.now(timezone.utc)
+    window = settings.REPOSITORY_UPDATE_WINDOW_SECONDS
+
+    due = list(
+        Repository.objects.filter(cron_enabled=True)
+        .filter(Q(next_update_at__isnull=True) | Q(next_update_at__lte=now))
+        .exclude(
+            analysis_status__in=[
+                Repository.AnalysisStatus.FETCHING,
+                Repository.AnalysisStatus.ANALYZING,
+            ]
+        )
+        .order_by("next_update_at")
+        .only("id", "user_id", "cron_frequency", "next_update_at")[: settings.REPOSITORY_UPDATE_BATCH_SIZE]
+    )
+
+    scheduled, over_budget, duplicates = [], 0, 0
+    exhausted_users = set()
+    for repository in due:
+        if repository.user_id in exhausted_users:
+            over_budget += 1
+            continue
+
+        # Claim the repository before reserving budget, so duplicates cost nothing
+        countdown = update_countdown(window)
+        enqueued_key = update_enqueued_key(repository.id)
+        if not cache.add(enqueued_key, 1, timeout=int(countdown) + window):
+            duplicates += 1
+            continue
+        if not reserve_github_budget(repository.user_id, settings.GITHUB_UPDATE_REQUEST_COST, now):
+            cache.delete(enqueued_key)
+            exhausted_users.add(repository.user_id)
+            over_budget += 1
+            continue
+
+        run_repository_pipeline.apply_async(
+            args=[str(repository.id)],
+            kwargs={"incremental": True},
+            countdown=countdown,
+            priority=SCHEDULED_PRIORITY,
+        )
+        repository.next_update_at = next_update_at(repository.cron_frequency, now)
+        scheduled.append(repository)
+
+    Repository.objects.bulk_update(scheduled, ["next_update_at"])
+
+    logger.info(
+        f"Scheduled {len(scheduled)} repository updates over {timedelta(seconds=window)} "
+        f"({over_budget} over GitHub budget, {duplicates} already queued)"
+    )
@@ -0,0 +1,70 @@
+"""
+Tests for batched issue summarization.
+"""
+
+from datetime import datetime, timedelta, timezone
+
+from django.test import TestCase, override_settings
+
+from apps.analysis.issue_summaries import summarize_closed_issues
+from apps.repositories.models import Issue, Repository
+from apps.users.models import User
+
+
+class FlakyAIClient:
+    """Fails the calls whose (0-based) index is in `failing_calls`."""
+
+    def __init__(self, failing_calls=()):
+        self.failing_calls = set(failing_calls)
+        self.calls = []
+
+    def generate_issue_summaries(self, issues):
+        self.calls.append([issue['number'] for issue in issues])
+        if len(self.calls) - 1 in self.failing_calls:
+            raise RuntimeError('overloaded')
+        return {
+            'summaries': {
+                issue['number']: {'summary': f"Summary of #{issue['number']}", 'problem': 'p', 'solution': 's'}
+                for issue in issues
+            },
+            'tokens_used': 100,
+        }
+
+
+@override_settings(AI_ISSUE_SUMMARY_BATCH_SIZE=1)
+class SummarizeClosedIssuesTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='owner@example.com', username='owner', password='x')
+        self.repository = Repository.objects.create(
+            user=user,
+            github_repo_url='https://github.com/octo/app',
+            repo_name='app',
+            owner='octo',
+        )
+        closed_at = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        for number in (1, 2, 3):
+            Issue.objects.create(
+                repository=self.repository,
+                issue_number=number,
+                title=f'Issue {number}',
+                author='dev',
+                state=Issue.IssueState.CLOSED,
+                created_at_github=closed_at,
+                closed_at=closed_at + timedelta(days=number),
+            )
+
+    def test_failed_batch_does_not_abandon_later_batches(self):
+        # Issues are batched newest first: #3, #2, #1
+        stats = summarize_closed_issues(self.repository, FlakyAIClient(failing_calls={0}))
+
+        self.assertEqual(stats['summarized'], 2)
+        self.assertEqual(stats['failed'], 1)
+        summarized = Issue.objects.exclude(ai_content_hash='').values_list('issue_number', flat=True)
+        self.assertEqual(sorted(summarized), [1, 2])
+
+        # Only the failed batch is sent again on the next run
+        client = FlakyAIClient()
+        stats = summarize_closed_issues(self.repository, client)
+        self.assertEqual(client.calls, [[3]])
+        self.assertEqual(stats['summarized'], 1)
+        self.assertEqual(Issue.objects.get(issue_number=3).ai_summary, 'Summary of #3')
@@ -0,0 +1,89 @@
+"""
+Tests for linking issues to the pull requests that close them.
+"""
+
+from datetime import datetime, timezone
+
+from django.test import TestCase
+
+from apps.analysis.linking import _pull_requests_to_scan, link_issues_to_pull_requests
+from apps.repositories.models import CommitData, Issue, PullRequest, Repository
+from apps.users.models import User
+
+OPENED = datetime(2024, 1, 1, tzinfo=timezone.utc)
+MERGED = datetime(2024, 1, 8, tzinfo=timezone.utc)
+
+
+class LinkIssuesTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='owner@example.com', username='owner', password='x')
+        self.repository = Repository.objects.create(
+            user=user,
+            github_repo_url='https://github.com/octo/app',
+            repo_name='app',
+            owner='octo',
+        )
+
+    def _pull_request(self, description='', commit_shas=()):
+        return PullRequest.objects.create(
+            repository=self.repository,
+            pr_number=10,
+            title='Fix startup',
+            description=description,
+            author='dev',
+            state=PullRequest.PRState.MERGED,
+            created_at_github=OPENED,
+            updated_at_github=MERGED,
+            merged_at=MERGED,
+            commit_shas=list(commit_shas),
+        )
+
+    def _issue(self, number):
+        return Issue.objects.create(
+            repository=self.repository,
+            issue_number=number,
+            title='Crash on start',
+            author='dev',
+            created_at_github=OPENED,
+        )
+
+    def test_links_an_issue_stored_after_the_pull_request(self):
+        pull_request = self._pull_request(description='Fixes #5')
+        link_issues_to_pull_requests(self.repository)
+
+        # The issue arrives in a later fetch; the PR itself is unchanged
+        issue = self._issue(5)
+        self.repository.refresh_from_db()
+        link_issues_to_pull_requests(self.repository)
+
+        issue.refresh_from_db()
+        self.assertEqual(issue.resolution_pr, pull_request)
+
+    def test_links_through_a_commit_stored_after_the_pull_request(self):
+        sha = 'a' * 40
+        pull_request = self._pull_request(commit_shas=[sha])
+        issue = self._issue(3)
+        link_issues_to_pull_requests(self.repository)
+
+        CommitData.objects.create(
+            repository=self.repository,
+            commit_sha=sha,
+            commit_message='Guard against empty config\n\nCloses #3',
+            commit_date=OPENED,
+            author_name='dev',
+        )
+        self.repository.refresh_from_db()
+        link_issues_to_pull_requests(self.repository)
+
+        issue.refresh_from_db()
+        self.assertEqual(issue.resolution_pr, pull_request)
+
+    def test_unchanged_pull_requests_are_not_rescanned(self):
+        self._pull_request(description='Fixes #5')
+        link_issues_to_pull_requests(self.repository)
+
+        self.repository.refresh_from_db()
+        rescanned = PullRequest.objects.filter(
+            _pull_requests_to_scan(self.repository, self.repository.issues_linked_at)
+        )
+        self.assertFalse(rescanned.exists())
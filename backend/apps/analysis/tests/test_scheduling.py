@@ -0,0 +1,29 @@
+"""
+Tests for scheduled update countdowns.
+"""
+
+from unittest import mock
+
+from django.test import SimpleTestCase, override_settings
+
+from apps.analysis.scheduling import COUNTDOWN_MARGIN_SECONDS, update_countdown
+
+
+def _longest(low, high):
+    return high
+
+
+@mock.patch('apps.analysis.scheduling.random.uniform', _longest)
+class UpdateCountdownTests(SimpleTestCase):
+    @override_settings(CELERY_BROKER_TRANSPORT_OPTIONS={'visibility_timeout': 3600})
+    def test_countdown_stays_below_the_visibility_timeout(self):
+        self.assertEqual(update_countdown(3600), 3600 - COUNTDOWN_MARGIN_SECONDS)
+        self.assertEqual(update_countdown(7200), 3600 - COUNTDOWN_MARGIN_SECONDS)
+
+    @override_settings(CELERY_BROKER_TRANSPORT_OPTIONS={'visibility_timeout': 43200})
+    def test_countdown_spans_a_window_shorter_than_the_timeout(self):
+        self.assertEqual(update_countdown(3600), 3600)
+
+    @override_settings(CELERY_BROKER_TRANSPORT_OPTIONS={'priority_steps': [0, 3, 6, 9]})
+    def test_default_visibility_timeout_applies_when_unset(self):
+        self.assertEqual(update_countdown(3600), 3600 - COUNTDOWN_MARGIN_SECONDS)
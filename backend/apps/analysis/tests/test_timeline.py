@@ -0,0 +1,97 @@
+"""
+Tests for the incremental daily activity rollup.
+"""
+
+from datetime import date, datetime, timezone
+from types import SimpleNamespace
+
+from django.test import TestCase
+
+from apps.analysis.timeline import update_daily_activity
+from apps.repositories.models import DailyActivity, Issue, PullRequest, Repository
+from apps.repositories.tasks import _fetch_issues, _fetch_pull_requests
+from apps.users.models import User
+
+OPENED = datetime(2024, 1, 1, 9, tzinfo=timezone.utc)
+FIRST_CLOSE = datetime(2024, 1, 5, 9, tzinfo=timezone.utc)
+SECOND_CLOSE = datetime(2024, 1, 9, 9, tzinfo=timezone.utc)
+
+
+def _github_issue(state, closed_at):
+    return SimpleNamespace(
+        number=1,
+        title='Crash on start',
+        body='',
+        user=SimpleNamespace(login='dev', avatar_url=None),
+        state=state,
+        created_at=OPENED,
+        updated_at=closed_at or SECOND_CLOSE,
+        closed_at=closed_at,
+        labels=[],
+        pull_request=None,
+        get_comments=lambda: [],
+    )
+
+
+def _github_pull(merged_at):
+    return SimpleNamespace(
+        number=7,
+        title='Fix crash',
+        body='',
+        user=SimpleNamespace(login='dev', avatar_url=None),
+        merged=merged_at is not None,
+        state='closed' if merged_at else 'open',
+        created_at=OPENED,
+        updated_at=merged_at or SECOND_CLOSE,
+        merged_at=merged_at,
+        closed_at=merged_at,
+        additions=1,
+        deletions=0,
+        changed_files=1,
+        labels=[],
+        get_issue_comments=lambda: [],
+        get_commits=lambda: [],
+    )
+
+
+class DailyActivityTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='owner@example.com', username='owner', password='x')
+        self.repository = Repository.objects.create(
+            user=user,
+            github_repo_url='https://github.com/octo/app',
+            repo_name='app',
+            owner='octo',
+        )
+
+    def _fetch(self, fetch, attribute, item):
+        """Ingest one GitHub item, then recount the days touched by the fetch."""
+        started_at = datetime.now(timezone.utc)
+        fetch(self.repository, SimpleNamespace(**{attribute: lambda **kwargs: [item]}))
+        update_daily_activity(self.repository, since=started_at)
+
+    def _activity(self, day, metric):
+        row = DailyActivity.objects.filter(repository=self.repository, day=day).first()
+        return getattr(row, metric) if row else 0
+
+    def test_reopened_issue_is_no_longer_counted_on_its_close_day(self):
+        self._fetch(_fetch_issues, 'get_issues', _github_issue('closed', FIRST_CLOSE))
+        self.assertEqual(self._activity(date(2024, 1, 5), 'issues_closed'), 1)
+
+        self._fetch(_fetch_issues, 'get_issues', _github_issue('open', None))
+        self.assertEqual(Issue.objects.get().state, Issue.IssueState.OPEN)
+        self.assertEqual(self._activity(date(2024, 1, 5), 'issues_closed'), 0)
+        self.assertEqual(self._activity(date(2024, 1, 1), 'issues_opened'), 1)
+
+        self._fetch(_fetch_issues, 'get_issues', _github_issue('closed', SECOND_CLOSE))
+        self.assertEqual(self._activity(date(2024, 1, 5), 'issues_closed'), 0)
+        self.assertEqual(self._activity(date(2024, 1, 9), 'issues_closed'), 1)
+
+    def test_moved_merge_date_is_recounted_on_the_old_day(self):
+        self._fetch(_fetch_pull_requests, 'get_pulls', _github_pull(FIRST_CLOSE))
+        self.assertEqual(self._activity(date(2024, 1, 5), 'prs_merged'), 1)
+
+        self._fetch(_fetch_pull_requests, 'get_pulls', _github_pull(SECOND_CLOSE))
+        self.assertEqual(PullRequest.objects.get().merged_at, SECOND_CLOSE)
+        self.assertEqual(self._activity(date(2024, 1, 5), 'prs_merged'), 0)
+        self.assertEqual(self._activity(date(2024, 1, 9), 'prs_merged'), 1)
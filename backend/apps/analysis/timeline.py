@@ -0,0 +1,277 @@
+"""
+Daily activity rollups and the downsampled timeline built from them.
+
+DailyActivity rows are maintained incrementally at ingest: only the days
+touched by newly ingested or updated commits, PRs and issues are recounted,
+along with the days updated PRs and issues were merged or closed on before.
+The timeline endpoint aggregates those rows into day/week/month/quarter/year
+buckets in the database, so long histories stay a few hundred points.
+"""
+
+import logging
+from datetime import datetime, time, timedelta, timezone
+
+from django.db.models import Count, F, Max, Min, Q, Sum
+from django.db.models.functions import (
+    TruncDate,
+    TruncMonth,
+    TruncQuarter,
+    TruncWeek,
+    TruncYear,
+)
+
+logger = logging.getLogger(__name__)
+
+METRICS = [
+    "commits",
+    "additions",
+    "deletions",
+    "prs_opened",
+    "prs_merged",
+    "issues_opened",
+    "issues_closed",
+]
+
+RESOLUTIONS = ["day", "week", "month", "quarter", "year"]
+
+# Approximate bucket length in days, used to pick a resolution for a point budget
+_RESOLUTION_DAYS = {
+    "day": 1,
+    "week": 7,
+    "month": 30.44,
+    "quarter": 91.31,
+    "year": 365.25,
+}
+
+_TRUNCATE = {
+    "week": TruncWeek,
+    "month": TruncMonth,
+    "quarter": TruncQuarter,
+    "year": TruncYear,
+}
+
+
+def _counts_by_day(queryset, date_field: str, range_start, range_end, **aggregates) -> dict:
+    """Aggregate a queryset per UTC day of `date_field` within a half-open range."""
+    rows = (
+        queryset.filter(
+            **{f"{date_field}__gte": range_start, f"{date_field}__lt": range_end}
+        )
+        .annotate(activity_day=TruncDate(date_field))
+        .values("activity_day")
+        .annotate(**aggregates)
+        .order_by()
+    )
+    return {row.pop("activity_day"): row for row in rows}
+
+
+def update_daily_activity(repository, since=None, batch_size: int = 1000) -> int:
+    """
+    Recount daily activity for the days touched by data ingested since `since`.
+
+    With `since=None` every day is rebuilt. Returns the number of days written.
+    Days a changed PR or issue has moved away from (reopened, merged or closed
+    on another date) are recounted at ingest, see `recount_moved_activity`.
+    """
+    from apps.repositories.models import CommitData, Issue, PullRequest
+
+    changed_commits = CommitData.objects.filter(repository=repository)
+    changed_prs = PullRequest.objects.filter(repository=repository)
+    changed_issues = Issue.objects.filter(repository=repository)
+    if since:
+        changed_commits = changed_commits.filter(created_at__gte=since)
+        changed_prs = changed_prs.filter(updated_at__gte=since)
+        changed_issues = changed_issues.filter(updated_at__gte=since)
+
+    touched = set()
+    for commit_date in changed_commits.values_list("commit_date", flat=True):
+        touched.add(commit_date.date())
+    for dates in changed_prs.values_list("created_at_github", "merged_at", "closed_at"):
+        touched.update(value.date() for value in dates if value)
+    for dates in changed_issues.values_list("created_at_github", "closed_at"):
+        touched.update(value.date() for value in dates if value)
+
+    return _recount_days(repository, touched, METRICS, batch_size)
+
+
+def recount_moved_activity(repository, record_type: str, previous: dict, batch_size: int = 1000) -> int:
+    """
+    Recount the days that upserted PRs or issues no longer count towards.
+
+    `previous` maps PR numbers to their (merged_at,), or issue numbers to
+    their (closed_at, state), as read before the upsert. Where those changed,
+    the old merge or close day is recounted, so a reopened issue or a moved
+    date no longer inflates it; new days are recounted with the rest of the
+    fetch by `update_daily_activity`. Only days already rolled up are
+    written, and only the metrics of `record_type` ("pull_request" or
+    "issue"), so the parallel fetch stages never overwrite each other's
+    counts. Returns the number of days written.
+    """
+    from apps.repositories.models import DailyActivity, Issue, PullRequest
+
+    if not previous:
+        return 0
+
+    if record_type == "pull_request":
+        queryset = PullRequest.objects.filter(repository=repository, pr_number__in=previous)
+        fields = ("pr_number", "merged_at")
+        metrics = ["prs_opened", "prs_merged"]
+    else:
+        queryset = Issue.objects.filter(repository=repository, issue_number__in=previous)
+        fields = ("issue_number", "closed_at", "state")
+        metrics = ["issues_opened", "issues_closed"]
+
+    moved = set()
+    for number, *current in queryset.values_list(*fields):
+        old = previous[number]
+        if old[0] and tuple(current) != tuple(old):
+            moved.add(old[0].date())
+    if not moved:
+        return 0
+
+    days = set(
+        DailyActivity.objects.filter(repository=repository, day__in=moved).values_list("day", flat=True)
+    )
+    return _recount_days(repository, days, metrics, batch_size)
+
+
+def _recount_days(repository, days, metrics, batch_size: int) -> int:
+    """Recompute the given metrics of DailyActivity rows for a set of days."""
+    from apps.repositories.models import CommitData, DailyActivity, Issue, PullRequest
+
+    if not days:
+        return 0
+
+    commits = CommitData.objects.filter(repository=repository)
+    pull_requests = PullRequest.objects.filter(repository=repository)
+    issues = Issue.objects.filter(repository=repository)
+
+    range_start = datetime.combine(min(days), time.min, tzinfo=timezone.utc)
+    range_end = datetime.combine(max(days) + timedelta(days=1), time.min, tzinfo=timezone.utc)
+
+    def per_day(queryset, date_field, count=Count("id")):
+        rows = _counts_by_day(queryset, date_field, range_start, range_end, count=count)
+        return {day: row["count"] for day, row in rows.items()}
+
+    counts = {}
+    if "commits" in metrics:
+        commit_counts = _counts_by_day(
+            commits,
+            "commit_date",
+            range_start,
+            range_end,
+            commits=Count("id"),
+            additions=Sum("additions"),
+            deletions=Sum("deletions"),
+        )
+        for metric in ("commits", "additions", "deletions"):
+            counts[metric] = {day: row[metric] for day, row in commit_counts.items()}
+    if "prs_opened" in metrics:
+        counts["prs_opened"] = per_day(pull_requests, "created_at_github")
+        counts["prs_merged"] = per_day(pull_requests, "merged_at")
+    if "issues_opened" in metrics:
+        counts["issues_opened"] = per_day(issues, "created_at_github")
+        counts["issues_closed"] = per_day(
+            issues, "closed_at", Count("id", filter=Q(state=Issue.IssueState.CLOSED))
+        )
+
+    rows = [
+        DailyActivity(
+            repository=repository,
+            day=day,
+            **{metric: counts[metric].get(day) or 0 for metric in metrics},
+        )
+        for day in sorted(days)
+    ]
+
+    DailyActivity.objects.bulk_create(
+        rows,
+        update_conflicts=True,
+        unique_fields=["repository", "day"],
+        update_fields=metrics,
+        batch_size=batch_size,
+    )
+
+    logger.info(f"Updated {len(rows)} days of activity for {repository.full_name}")
+    return len(rows)
+
+
+def _bucket_start(day, resolution: str):
+    """First day of the bucket containing `day`."""
+    if resolution == "week":
+        return day - timedelta(days=day.weekday())
+    if resolution == "month":
+        return day.replace(day=1)
+    if resolution == "quarter":
+        return day.replace(month=(day.month - 1) // 3 * 3 + 1, day=1)
+    if resolution == "year":
+        return day.replace(month=1, day=1)
+    return day
+
+
+def _next_bucket(day, resolution: str):
+    """First day of the bucket after the one starting at `day`."""
+    if resolution == "day":
+        return day + timedelta(days=1)
+    if resolution == "week":
+        return day + timedelta(days=7)
+
+    months = {"month": 1, "quarter": 3, "year": 12}[resolution]
+    month_index = day.year * 12 + day.month - 1 + months
+    return day.replace(year=month_index // 12, month=month_index % 12 + 1)
+
+
+def pick_resolution(start, end, points: int) -> str:
+    """Smallest resolution that keeps start..end within `points` buckets."""
+    span = (end - start).days + 1
+    for resolution in RESOLUTIONS:
+        if span / _RESOLUTION_DAYS[resolution] <= points:
+            return resolution
+    return RESOLUTIONS[-1]
+
+
+def get_timeline(repository, start=None, end=None, resolution: str = "auto", points: int = 300) -> dict:
+    """
+    Return activity between `start` and `end` (inclusive) downsampled into buckets.
+
+    `resolution='auto'` picks the smallest calendar bucket that yields at most
+    `points` buckets. Empty buckets are included with zero counts.
+    """
+    from apps.repositories.models import DailyActivity
+
+    activity = DailyActivity.objects.filter(repository=repository)
+
+    if start is None or end is None:
+        bounds = activity.aggregate(first=Min("day"), last=Max("day"))
+        start = start or bounds["first"]
+        end = end or bounds["last"]
+
+    if start is None or end is None or start > end:
+        return {"resolution": resolution, "start": start, "end": end, "points": []}
+
+    if resolution == "auto":
+        resolution = pick_resolution(start, end, points)
+
+    activity = activity.filter(day__gte=start, day__lte=end)
+    truncate = _TRUNCATE.get(resolution)
+    bucket = truncate("day") if truncate else F("day")
+
+    rows = (
+        activity.annotate(bucket=bucket)
+        .values("bucket")
+        .annotate(**{f"total_{metric}": Sum(metric) for metric in METRICS})
+        .order_by("bucket")
+    )
+    totals = {row["bucket"]: row for row in rows}
+
+    series = []
+    current = _bucket_start(start, resolution)
+    while current <= end:
+        row = totals.get(current, {})
+        point = {"date": current}
+        for metric in METRICS:
+            point[metric] = row.get(f"total_{metric}") or 0
+        series.append(point)
+        current = _next_bucket(current, resolution)
+
+    return {"resolution": resolution, "start": start, "end": end, "points": series}
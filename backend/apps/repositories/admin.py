@@ -4,10 +4,17 @@ from .models import (
     Contributor,
     CommitGroup,
     CommitData,
+    FilePath,
+    CommitFileChange,
+    PathActivityRollup,
+    DailyActivity,
     PullRequest,
     Issue,
     OverallSummary,
     Export,
+    DeletedRecord,
+    PipelineRun,
+    PipelineStage,
 )
 
 
@@ -55,6 +62,36 @@ class CommitDataAdmin(admin.ModelAdmin):
     short_message.short_description = 'Message'
 
 
+@admin.register(FilePath)
+class FilePathAdmin(admin.ModelAdmin):
+    list_display = ['path', 'repository']
+    list_filter = ['repository']
+    search_fields = ['path']
+
+
+@admin.register(CommitFileChange)
+class CommitFileChangeAdmin(admin.ModelAdmin):
+    list_display = ['commit', 'path', 'status', 'additions', 'deletions']
+    list_filter = ['status']
+    search_fields = ['path__path', 'commit__commit_sha']
+    raw_id_fields = ['commit', 'path']
+
+
+@admin.register(PathActivityRollup)
+class PathActivityRollupAdmin(admin.ModelAdmin):
+    list_display = ['path', 'repository', 'week_start', 'author', 'commits', 'additions', 'deletions']
+    list_filter = ['is_file', 'repository']
+    search_fields = ['path', 'author']
+    ordering = ['-week_start']
+
+
+@admin.register(DailyActivity)
+class DailyActivityAdmin(admin.ModelAdmin):
+    list_display = ['repository', 'day', 'commits', 'prs_opened', 'prs_merged', 'issues_opened', 'issues_closed']
+    list_filter = ['repository']
+    ordering = ['-day']
+
+
 @admin.register(PullRequest)
 class PullRequestAdmin(admin.ModelAdmin):
     list_display = ['pr_number', 'title', 'repository', 'author', 'state', 'created_at_github', 'merged_at']
@@ -84,8 +121,33 @@ class OverallSummaryAdmin(admin.ModelAdmin):
 
 @admin.register(Export)
 class ExportAdmin(admin.ModelAdmin):
-    list_display = ['repository', 'export_type', 'date_range_start', 'date_range_end', 'file_size', 'created_at']
-    list_filter = ['export_type', 'repository', 'created_at']
+    list_display = ['repository', 'export_type', 'export_format', 'date_range_start', 'date_range_end', 'file_size', 'created_at']
+    list_filter = ['export_type', 'export_format', 'repository', 'created_at']
     search_fields = ['repository__repo_name']
     readonly_fields = ['id', 'created_at', 'updated_at']
     ordering = ['-created_at']
+
+
+@admin.register(DeletedRecord)
+class DeletedRecordAdmin(admin.ModelAdmin):
+    list_display = ['repository', 'record_type', 'record_key', 'deleted_at']
+    list_filter = ['record_type', 'repository']
+    ordering = ['-deleted_at']
+
+
+class PipelineStageInline(admin.TabularInline):
+    model = PipelineStage
+    fields = ['name', 'status', 'attempts', 'started_at', 'finished_at', 'error']
+    readonly_fields = fields
+    extra = 0
+    can_delete = False
+
+
+@admin.register(PipelineRun)
+class PipelineRunAdmin(admin.ModelAdmin):
+    list_display = ['repository', 'status', 'incremental', 'started_at', 'finished_at']
+    list_filter = ['status', 'incremental', 'started_at']
+    search_fields = ['repository__repo_name', 'token']
+    readonly_fields = ['id', 'token', 'started_at', 'finished_at']
+    inlines = [PipelineStageInline]
+    ordering = ['-started_at']
@@ -0,0 +1,97 @@
+"""
+Cache helpers for repository data served by the API.
+
+Everything served from a repository's data is tied to `Repository.data_version`,
+which is bumped whenever a pipeline stage finishes writing data.
+"""
+
+import hashlib
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import F
+from django.http import HttpResponse
+from django.utils import timezone
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from rest_framework.renderers import JSONRenderer
+
+
+def stats_cache_key(repository_id) -> str:
+    """Cache key for the aggregate counts returned by the stats endpoint."""
+    return f"repository:{repository_id}:stats"
+
+
+def invalidate_repository_cache(repository_id) -> None:
+    """Drop cached aggregates for a repository after its data changes."""
+    cache.delete(stats_cache_key(repository_id))
+
+
+def mark_repository_data_changed(repository) -> None:
+    """Bump the data version of a repository and drop its cached aggregates."""
+    from .models import Repository
+
+    Repository.objects.filter(pk=repository.pk).update(
+        data_version=F("data_version") + 1,
+        data_updated_at=timezone.now(),
+    )
+    repository.refresh_from_db(fields=["data_version", "data_updated_at"])
+    invalidate_repository_cache(repository.pk)
+
+
+def _request_digest(request) -> str:
+    return hashlib.md5(request.build_absolute_uri().encode()).hexdigest()
+
+
+def repository_etag(repository, request) -> str:
+    """ETag for a repository data response, derived from the data version and URL."""
+    return f'"{repository.data_version}-{_request_digest(request)}"'
+
+
+def versioned_response(view_method):
+    """
+    Serve a repository detail action through the data version.
+
+    Adds ETag/Last-Modified headers, answers matching conditional requests with
+    304, and caches the rendered JSON body keyed on (repository, version, URL).
+    Only successful responses are cached.
+    """
+
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        repository = self.get_object()
+        etag = repository_etag(repository, request)
+        last_modified = repository.data_updated_at
+
+        def add_validators(response):
+            response["ETag"] = etag
+            if last_modified:
+                response["Last-Modified"] = http_date(last_modified.timestamp())
+            response["Cache-Control"] = "private, no-cache"
+            return response
+
+        not_modified = get_conditional_response(
+            request,
+            etag=etag,
+            last_modified=int(last_modified.timestamp()) if last_modified else None,
+        )
+        if not_modified is not None:
+            return add_validators(not_modified)
+
+        cache_key = (
+            f"repository:{repository.pk}:response:"
+            f"{repository.data_version}:{_request_digest(request)}"
+        )
+        content = cache.get(cache_key)
+        if content is None:
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != 200:
+                return response
+
+            content = JSONRenderer().render(response.data)
+            cache.set(cache_key, content, settings.REPOSITORY_RESPONSE_CACHE_TIMEOUT)
+
+        return add_validators(HttpResponse(content, content_type="application/json"))
+
+    return wrapper
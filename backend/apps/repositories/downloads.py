@@ -0,0 +1,155 @@
+"""
+Serving stored export files.
+
+Exports are stored gzip-compressed. Clients that accept gzip get the stored
+bytes as-is with `Content-Encoding: gzip`; others get them decompressed on the
+fly. Byte ranges (for resuming interrupted downloads) are served for the stored
+representation, and with EXPORT_SENDFILE_HEADER set the file is handed to the
+web server instead of being streamed by an application worker.
+"""
+
+import gzip
+import os
+import re
+
+from django.conf import settings
+from django.http import HttpResponse, StreamingHttpResponse
+from django.utils.cache import patch_vary_headers
+from django.utils.http import http_date, parse_http_date_safe, quote_etag
+
+STREAM_BLOCK_SIZE = 64 * 1024
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def accepts_encoding(request, encoding: str) -> bool:
+    """Whether the request's Accept-Encoding allows `encoding` (honouring q=0)."""
+    for item in request.headers.get("Accept-Encoding", "").split(","):
+        name, _, params = item.strip().partition(";")
+        if name.strip().lower() not in (encoding, "*"):
+            continue
+        quality = params.strip()
+        if quality.startswith("q="):
+            try:
+                return float(quality[2:]) > 0
+            except ValueError:
+                return False
+        return True
+    return False
+
+
+def parse_range(header: str, size: int):
+    """
+    Parse a single-range `Range` header into an inclusive (start, end) pair.
+
+    Returns None when the header should be ignored (absent, malformed or a
+    multi-range request) and raises ValueError when it cannot be satisfied.
+    """
+    match = _RANGE_RE.match(header.strip()) if header else None
+    if not match or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if first:
+        start = int(first)
+        end = min(int(last), size - 1) if last else size - 1
+        if start > end:
+            raise ValueError("Unsatisfiable range")
+    else:
+        suffix = int(last)
+        if suffix == 0 or size == 0:
+            raise ValueError("Unsatisfiable range")
+        start, end = max(size - suffix, 0), size - 1
+    return start, end
+
+
+def _read_range(file_path: str, start: int, length: int):
+    with open(file_path, "rb") as f:
+        f.seek(start)
+        while length > 0:
+            block = f.read(min(STREAM_BLOCK_SIZE, length))
+            if not block:
+                break
+            length -= len(block)
+            yield block
+
+
+def _read_decompressed(file_path: str):
+    with gzip.open(file_path, "rb") as f:
+        while block := f.read(STREAM_BLOCK_SIZE):
+            yield block
+
+
+def _sendfile_response(file_path: str, content_type: str) -> HttpResponse:
+    """Empty response telling the web server to send `file_path` itself."""
+    response = HttpResponse(content_type=content_type)
+    header = settings.EXPORT_SENDFILE_HEADER
+    if header.lower() == "x-accel-redirect":
+        exports_dir = os.path.join(settings.BASE_DIR, "exports")
+        relative_path = os.path.relpath(file_path, exports_dir).replace(os.sep, "/")
+        response[header] = settings.EXPORT_SENDFILE_PREFIX.rstrip("/") + "/" + relative_path
+    else:
+        response[header] = file_path
+    return response
+
+
+def export_file_response(
+    request,
+    file_path: str,
+    filename: str,
+    content_type: str,
+    content_encoding: str = "",
+):
+    """
+    Serve a stored export file, compressed or not, with Range support.
+
+    `content_encoding` is how the file is stored ('gzip' or ''). `filename` is
+    the name offered to the client for the decoded content.
+    """
+    encoded = not content_encoding or accepts_encoding(request, content_encoding)
+
+    if not encoded:
+        # Decompressed on the fly: length unknown, so no ranges or handoff
+        response = StreamingHttpResponse(_read_decompressed(file_path), content_type=content_type)
+        response["Accept-Ranges"] = "none"
+    elif settings.EXPORT_SENDFILE_HEADER:
+        # The web server handles Range and conditional requests itself
+        response = _sendfile_response(file_path, content_type)
+    else:
+        stat = os.stat(file_path)
+        size = stat.st_size
+        etag = quote_etag(f"{int(stat.st_mtime)}-{size}")
+
+        byte_range = None
+        if_range = request.headers.get("If-Range")
+        if not if_range or if_range == etag or parse_http_date_safe(if_range) == int(stat.st_mtime):
+            try:
+                byte_range = parse_range(request.headers.get("Range"), size)
+            except ValueError:
+                response = HttpResponse(status=416)
+                response["Content-Range"] = f"bytes */{size}"
+                return response
+
+        if byte_range:
+            start, end = byte_range
+            response = StreamingHttpResponse(
+                _read_range(file_path, start, end - start + 1),
+                status=206,
+                content_type=content_type,
+            )
+            response["Content-Range"] = f"bytes {start}-{end}/{size}"
+            response["Content-Length"] = str(end - start + 1)
+        else:
+            response = StreamingHttpResponse(_read_range(file_path, 0, size), content_type=content_type)
+            response["Content-Length"] = str(size)
+
+        response["Accept-Ranges"] = "bytes"
+        response["ETag"] = etag
+        response["Last-Modified"] = http_date(stat.st_mtime)
+
+    if content_encoding:
+        patch_vary_headers(response, ["Accept-Encoding"])
+        if encoded:
+            response["Content-Encoding"] = content_encoding
+    response["Content-Disposition"] = f'attachment; filename="{filename}"'
+    return response
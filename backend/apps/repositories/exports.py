@@ -0,0 +1,611 @@
+"""
+Export generation.
+
+Exports are produced as a stream of lines and written incrementally, so memory
+stays flat regardless of export size. Markdown is built from ExportUnits, which
+chunked exports pack into token-bounded files without splitting a unit.
+"""
+
+import gzip
+import hashlib
+import json
+import logging
+import os
+import shutil
+from datetime import date, datetime, timezone
+from itertools import islice
+from typing import NamedTuple, Optional
+
+from django.db.models import F, Sum, Window
+from django.db.models.functions import Coalesce, Left, RowNumber
+
+from .stats import repository_counts
+from .tasks import _day_range
+
+logger = logging.getLogger(__name__)
+
+# Rows fetched per round trip when iterating export querysets
+EXPORT_CHUNK_SIZE = 500
+
+# Bytes buffered before a write to the underlying (possibly compressed) stream
+WRITE_BUFFER_SIZE = 64 * 1024
+
+MANIFEST_FILENAME = "manifest.json"
+
+# Export sections, in output order
+PREAMBLE = "preamble"
+TIMELINE = "timeline"
+PULL_REQUESTS = "pull_requests"
+ISSUES = "issues"
+CONTRIBUTORS = "contributors"
+
+SECTION_HEADERS = {
+    TIMELINE: "## Development Timeline\n",
+    PULL_REQUESTS: "## Pull Requests\n",
+    ISSUES: "## Issues\n",
+    CONTRIBUTORS: "## Contributors\n",
+}
+
+EXPORT_FOOTER = [
+    "---\n",
+    "*Generated by [CommitSaga](https://github.com/yashChouriya/commitsaga) - Understand Your Code History*",
+]
+
+
+class ExportUnit(NamedTuple):
+    """A piece of an export that is never split: the preamble, a group, a PR, an issue..."""
+
+    section: str
+    period_start: Optional[date]
+    period_end: Optional[date]
+    lines: list
+
+
+def estimate_tokens(lines) -> int:
+    """Approximate LLM token count of lines (~4 characters per token)."""
+    return sum(len(line) + 1 for line in lines) // 4
+
+
+def export_cache_key(
+    repository,
+    export_type: str,
+    start_date=None,
+    end_date=None,
+    chunk_tokens: int = None,
+    export_format: str = "markdown",
+    since_export_id=None,
+) -> str:
+    """Cache identity of an export: repository, data version and every parameter."""
+    identity = json.dumps(
+        [
+            str(repository.pk),
+            repository.data_version,
+            export_type,
+            str(start_date) if start_date else None,
+            str(end_date) if end_date else None,
+            chunk_tokens,
+            export_format,
+            str(since_export_id) if since_export_id else None,
+        ]
+    )
+    return hashlib.sha256(identity.encode()).hexdigest()
+
+
+def pending_export_key(cache_key: str) -> str:
+    """Django cache key holding the task id of an export being generated."""
+    return f"export:pending:{cache_key}"
+
+
+def find_cached_export(repository, cache_key: str):
+    """Return the newest export with this cache key whose files still exist, or None."""
+    from .models import Export
+
+    export = (
+        Export.objects.filter(repository=repository, cache_key=cache_key)
+        .order_by("-created_at")
+        .first()
+    )
+    if export is None:
+        return None
+
+    if not os.path.exists(export.file_path):
+        export.delete()
+        return None
+
+    Export.objects.filter(pk=export.pk).update(last_accessed_at=datetime.now(timezone.utc))
+    return export
+
+
+def delete_export_files(export) -> None:
+    """Remove an export's file, or its directory for exports with a manifest."""
+    if not export.file_path:
+        return
+    try:
+        if export.has_manifest:
+            shutil.rmtree(os.path.dirname(export.file_path))
+        else:
+            os.remove(export.file_path)
+    except FileNotFoundError:
+        pass
+
+
+def evict_exports(quota_bytes: int, keep=None) -> int:
+    """
+    Delete least recently used exports until their files fit in `quota_bytes`.
+
+    `keep` is an export that must survive (usually the one just written).
+    Returns the number of exports evicted.
+    """
+    from .models import Export
+
+    total = Export.objects.aggregate(total=Sum("file_size"))["total"] or 0
+    if total <= quota_bytes:
+        return 0
+
+    candidates = Export.objects.order_by(
+        Coalesce("last_accessed_at", "created_at"), "created_at"
+    )
+    if keep is not None:
+        candidates = candidates.exclude(pk=keep.pk)
+
+    evicted = 0
+    for export in candidates.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        if total <= quota_bytes:
+            break
+        delete_export_files(export)
+        export.delete()
+        total -= export.file_size
+        evicted += 1
+
+    logger.info(f"Evicted {evicted} exports to stay within {quota_bytes} bytes")
+    return evicted
+
+
+def write_export(file_path: str, lines, compress: bool = False) -> int:
+    """
+    Write lines to `file_path` as UTF-8 text, optionally gzip-compressed.
+
+    The file is written under a temporary name and renamed when complete, so a
+    failed export never leaves a truncated file behind. Returns the number of
+    bytes written to disk, taken from the stream position.
+    """
+    partial_path = f"{file_path}.partial"
+    try:
+        file_size = _write_lines(partial_path, lines, compress)
+    except BaseException:
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        raise
+    os.replace(partial_path, file_path)
+    return file_size
+
+
+def _write_lines(file_path: str, lines, compress: bool) -> int:
+    with open(file_path, "wb") as raw:
+        stream = gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) if compress else raw
+
+        buffer, buffered = [], 0
+        for line in lines:
+            data = line.encode("utf-8")
+            buffer.append(data)
+            buffered += len(data)
+            if buffered >= WRITE_BUFFER_SIZE:
+                stream.write(b"\n".join(buffer) + b"\n")
+                buffer, buffered = [], 0
+        if buffer:
+            stream.write(b"\n".join(buffer) + b"\n")
+
+        if compress:
+            stream.close()
+        return raw.tell()
+
+
+def export_querysets(repository, start_date=None, end_date=None):
+    """Commit groups, pull requests, issues and contributors covered by an export."""
+    from .models import CommitGroup, Contributor, PullRequest, Issue
+
+    # Filter data based on date range
+    if start_date and end_date:
+        period_start, period_end = _day_range(start_date, end_date)
+
+        commit_groups = CommitGroup.objects.filter(
+            repository=repository,
+            start_date__gte=start_date,
+            end_date__lte=end_date,
+        ).order_by("start_date")
+
+        pull_requests = PullRequest.objects.filter(
+            repository=repository,
+            created_at_github__gte=period_start,
+            created_at_github__lt=period_end,
+        ).order_by("-created_at_github")
+
+        issues = Issue.objects.filter(
+            repository=repository,
+            created_at_github__gte=period_start,
+            created_at_github__lt=period_end,
+        ).order_by("-created_at_github")
+    else:
+        commit_groups = CommitGroup.objects.filter(
+            repository=repository
+        ).order_by("start_date")
+
+        pull_requests = PullRequest.objects.filter(
+            repository=repository
+        ).order_by("-created_at_github")
+
+        issues = Issue.objects.filter(
+            repository=repository
+        ).order_by("-created_at_github")
+
+    contributors = Contributor.objects.filter(
+        repository=repository
+    ).order_by("-impact_score")
+
+    return commit_groups, pull_requests, issues, contributors
+
+
+def markdown_export_units(
+    repository,
+    export_type: str,
+    start_date=None,
+    end_date=None,
+):
+    """
+    Yield the export as ExportUnits: the preamble, then one unit per commit
+    group, pull request, issue and contributor.
+    """
+    from .models import OverallSummary
+
+    commit_groups, pull_requests, issues, contributors = export_querysets(
+        repository, start_date, end_date
+    )
+
+    # Header
+    preamble = [
+        "# CommitSaga Analysis Export\n",
+        f"## Repository: {repository.full_name}\n",
+        f"**Branch:** {repository.branch}",
+        f"**Export Type:** {export_type.capitalize()}",
+    ]
+
+    if start_date and end_date:
+        preamble.append(f"**Period:** {start_date} to {end_date}")
+
+    preamble.append(f"**Generated:** {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
+    preamble.append("---\n")
+
+    # Repository Overview
+    overview = repository_counts(repository, pull_requests, issues)
+    preamble += [
+        "## Repository Overview\n",
+        f"- **Total Commits:** {overview['total_commits']}",
+        f"- **Contributors:** {overview['total_contributors']}",
+        f"- **Pull Requests:** {overview['total_prs']} ({overview['merged_prs']} merged, {overview['open_prs']} open)",
+        f"- **Issues:** {overview['total_issues']} ({overview['closed_issues']} closed, {overview['open_issues']} open)\n",
+    ]
+
+    # Overall Summary (for complete exports)
+    if export_type == "complete":
+        overall_summary = OverallSummary.objects.filter(repository=repository).first()
+        if overall_summary:
+            preamble += ["## Summary\n", overall_summary.summary_text, "\n---\n"]
+
+    yield ExportUnit(PREAMBLE, None, None, preamble)
+
+    yield from _timeline_units(commit_groups)
+    yield from _pull_request_units(pull_requests[:50])  # Limit to 50 PRs
+    yield from _issue_units(issues[:50])  # Limit to 50 issues
+    yield from _contributor_units(contributors[:20])  # Top 20
+
+
+def markdown_export_lines(
+    repository,
+    export_type: str,
+    start_date=None,
+    end_date=None,
+):
+    """Yield the lines of a markdown export, section by section."""
+    section = None
+    for unit in markdown_export_units(repository, export_type, start_date, end_date):
+        if unit.section != section:
+            section = unit.section
+            if section in SECTION_HEADERS:
+                yield SECTION_HEADERS[section]
+        yield from unit.lines
+
+    yield from EXPORT_FOOTER
+
+
+def write_chunked_export(
+    directory: str,
+    units,
+    max_tokens: int,
+    metadata: dict = None,
+    compress: bool = False,
+) -> dict:
+    """
+    Split an export into self-contained markdown files of at most `max_tokens`.
+
+    Every chunk repeats the preamble (header, overview and summary) and is cut
+    only between units, so commit groups are never split. A unit larger than
+    the budget gets a chunk of its own. Chunks are written as units arrive
+    (gzip-compressed if `compress`) and the manifest (`metadata` plus the chunk
+    list) is written last as plain manifest.json and returned. If writing fails,
+    the directory is removed so no partial export is left behind.
+    """
+    os.makedirs(directory, exist_ok=True)
+    footer_tokens = estimate_tokens(EXPORT_FOOTER)
+    extension = ".md.gz" if compress else ".md"
+
+    preamble, preamble_tokens = [], 0
+    chunks = []
+    chunk_file = raw_file = None
+
+    def close_chunk():
+        chunk = chunks[-1]
+        chunk_file.write("\n".join(EXPORT_FOOTER).encode("utf-8") + b"\n")
+        if chunk_file is not raw_file:
+            # Closing the gzip stream writes its trailer to the raw file
+            chunk_file.close()
+        chunk["size"] = raw_file.tell()
+        raw_file.close()
+
+    try:
+        for unit in units:
+            if unit.section == PREAMBLE:
+                preamble, preamble_tokens = unit.lines, estimate_tokens(unit.lines)
+                continue
+
+            lines = list(unit.lines)
+            unit_tokens = estimate_tokens(lines)
+
+            chunk = chunks[-1] if chunk_file else None
+            section_header = SECTION_HEADERS[unit.section]
+            header_tokens = estimate_tokens([section_header])
+            # Chunk token counts already include the preamble and footer
+            needed = unit_tokens
+            if chunk is None or unit.section not in chunk["sections"]:
+                needed += header_tokens
+            if chunk is None or chunk["tokens"] + needed > max_tokens:
+                if chunk_file:
+                    close_chunk()
+
+                part = len(chunks) + 1
+                part_line = f"**Part:** {part}\n"
+                chunk = {
+                    "part": part,
+                    "file": f"part-{part:04d}{extension}",
+                    "period_start": None,
+                    "period_end": None,
+                    "sections": [],
+                    "tokens": preamble_tokens + estimate_tokens([part_line]) + footer_tokens,
+                    "size": 0,
+                }
+                chunks.append(chunk)
+                raw_file = open(os.path.join(directory, chunk["file"]), "wb")
+                chunk_file = (
+                    gzip.GzipFile(fileobj=raw_file, mode="wb", mtime=0) if compress else raw_file
+                )
+                chunk_file.write("\n".join(preamble + [part_line]).encode("utf-8") + b"\n")
+
+            if unit.section not in chunk["sections"]:
+                chunk["sections"].append(unit.section)
+                lines.insert(0, section_header)
+                unit_tokens += header_tokens
+
+            chunk_file.write("\n".join(lines).encode("utf-8") + b"\n")
+            chunk["tokens"] += unit_tokens
+            if unit.period_start and (chunk["period_start"] is None or unit.period_start < chunk["period_start"]):
+                chunk["period_start"] = unit.period_start
+            if unit.period_end and (chunk["period_end"] is None or unit.period_end > chunk["period_end"]):
+                chunk["period_end"] = unit.period_end
+
+        if chunk_file:
+            close_chunk()
+            chunk_file = None
+    except BaseException:
+        if chunk_file:
+            chunk_file.close()
+            raw_file.close()
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+    manifest = {
+        **(metadata or {}),
+        "content_encoding": "gzip" if compress else "",
+        "max_tokens": max_tokens,
+        "total_tokens": sum(chunk["tokens"] for chunk in chunks),
+        "chunks": [
+            {
+                **chunk,
+                "period_start": chunk["period_start"].isoformat() if chunk["period_start"] else None,
+                "period_end": chunk["period_end"].isoformat() if chunk["period_end"] else None,
+            }
+            for chunk in chunks
+        ],
+    }
+    with open(os.path.join(directory, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
+
+
+def _batched(iterable, size: int):
+    """Yield lists of up to `size` items from an iterable."""
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _key_commits_by_group(group_ids: list, limit: int = 10) -> dict:
+    """
+    Latest `limit` commits of each group, fetched in one windowed query.
+
+    Returns {group id: [(sha, subject, author), ...]} newest first.
+    """
+    from .models import CommitData
+
+    rows = (
+        CommitData.objects.filter(commit_group_id__in=group_ids)
+        .annotate(
+            group_rank=Window(
+                RowNumber(),
+                partition_by=F("commit_group_id"),
+                order_by=F("commit_date").desc(),
+            ),
+            # The export shows at most the first 80 characters of the subject line
+            message_head=Left("commit_message", 80),
+        )
+        .filter(group_rank__lte=limit)
+        .order_by("commit_group_id", "group_rank")
+        .values_list("commit_group_id", "commit_sha", "message_head", "author_name")
+    )
+
+    commits_by_group = {}
+    for group_id, sha, message_head, author_name in rows:
+        commits_by_group.setdefault(group_id, []).append((sha, message_head, author_name))
+    return commits_by_group
+
+
+def _timeline_units(commit_groups):
+    """One unit per commit group, with key commits fetched per batch of groups."""
+    groups = commit_groups.iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    for batch in _batched(groups, EXPORT_CHUNK_SIZE):
+        key_commits = _key_commits_by_group([group.id for group in batch])
+        for group in batch:
+            yield ExportUnit(
+                TIMELINE,
+                group.start_date,
+                group.end_date,
+                list(_group_lines(group, key_commits.get(group.id, []))),
+            )
+
+
+def _group_lines(group, key_commits: list):
+    group_type_label = "Week" if group.group_type == "weekly" else "Month"
+    yield f"### {group_type_label} of {group.start_date} to {group.end_date}\n"
+
+    if group.summary:
+        yield "#### Summary\n"
+        yield group.summary
+        yield ""
+
+    # Key Changes
+    if group.key_changes:
+        yield "#### Key Changes\n"
+        for change in group.key_changes:
+            yield f"- {change}"
+        yield ""
+
+    # Notable Features
+    if group.notable_features:
+        yield "#### Notable Features\n"
+        for feature in group.notable_features:
+            yield f"- {feature}"
+        yield ""
+
+    # Bug Fixes
+    if group.bug_fixes:
+        yield "#### Bug Fixes\n"
+        for fix in group.bug_fixes:
+            yield f"- {fix}"
+        yield ""
+
+    # Key Commits
+    if key_commits:
+        yield "#### Key Commits\n"
+        for sha, message_head, author_name in key_commits:
+            msg = message_head.split("\n")[0]
+            yield f"- `{sha[:7]}` - {msg} (by @{author_name})"
+        yield ""
+
+    yield "---\n"
+
+
+def _pull_request_units(pull_requests):
+    for pr in pull_requests.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        created = pr.created_at_github.date()
+        yield ExportUnit(PULL_REQUESTS, created, created, list(_pull_request_lines(pr)))
+
+
+def _pull_request_lines(pr):
+    state_emoji = "🟢" if pr.state == "open" else "🟣" if pr.state == "merged" else "🔴"
+    yield f"### {state_emoji} PR #{pr.pr_number}: {pr.title}\n"
+    yield f"**Author:** @{pr.author}"
+    yield f"**Status:** {pr.state.capitalize()}"
+    yield f"**Created:** {pr.created_at_github.strftime('%Y-%m-%d')}"
+
+    if pr.merged_at:
+        yield f"**Merged:** {pr.merged_at.strftime('%Y-%m-%d')}"
+
+    yield f"**Changes:** +{pr.additions} / -{pr.deletions} ({pr.changed_files} files)\n"
+
+    if pr.description:
+        yield "**Description:**"
+        yield pr.description[:500] + ("..." if len(pr.description) > 500 else "")
+        yield ""
+
+    # Discussion highlights
+    if pr.discussion:
+        yield "**Discussion Highlights:**\n"
+        for comment in pr.discussion[:5]:  # Limit to 5 comments
+            yield f"- **@{comment.get('author', 'unknown')}:** {comment.get('body', '')[:200]}"
+        yield ""
+
+    yield "---\n"
+
+
+def _issue_units(issues):
+    for issue in issues.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+        created = issue.created_at_github.date()
+        yield ExportUnit(ISSUES, created, created, list(_issue_lines(issue)))
+
+
+def _issue_lines(issue):
+    state_emoji = "🟢" if issue.state == "open" else "✅"
+    yield f"### {state_emoji} Issue #{issue.issue_number}: {issue.title}\n"
+    yield f"**Author:** @{issue.author}"
+    yield f"**Status:** {issue.state.capitalize()}"
+    yield f"**Created:** {issue.created_at_github.strftime('%Y-%m-%d')}"
+
+    if issue.closed_at:
+        yield f"**Closed:** {issue.closed_at.strftime('%Y-%m-%d')}"
+
+    if issue.labels:
+        yield f"**Labels:** {', '.join(issue.labels)}"
+
+    yield ""
+
+    if issue.problem_description:
+        yield "**Problem:**"
+        yield issue.problem_description
+        yield ""
+
+    if issue.solution_description:
+        yield "**Solution:**"
+        yield issue.solution_description
+        yield ""
+
+    if issue.description and not issue.problem_description:
+        yield "**Description:**"
+        yield issue.description[:500] + ("..." if len(issue.description) > 500 else "")
+        yield ""
+
+    yield "---\n"
+
+
+def _contributor_units(contributors):
+    for i, contributor in enumerate(contributors.iterator(chunk_size=EXPORT_CHUNK_SIZE), 1):
+        yield ExportUnit(CONTRIBUTORS, None, None, list(_contributor_lines(contributor, i)))
+
+
+def _contributor_lines(contributor, i: int):
+    rank_emoji = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"#{i}"
+    yield f"### {rank_emoji} @{contributor.github_username} (Impact Score: {contributor.impact_score})\n"
+    yield f"- **Commits:** {contributor.total_commits}"
+    yield f"- **Lines Added:** {contributor.total_additions:,}"
+    yield f"- **Lines Removed:** {contributor.total_deletions:,}"
+    yield f"- **PRs Opened/Merged:** {contributor.prs_opened}/{contributor.prs_merged}"
+    yield f"- **Issues Opened/Closed:** {contributor.issues_opened}/{contributor.issues_closed}"
+    yield ""
@@ -0,0 +1,174 @@
+"""
+Server-side filtering, search and ordering for pull requests and issues.
+
+Query params:
+    - state: exact state
+    - label: label the item must carry (repeatable, all must match)
+    - author: GitHub username of the author
+    - <date>_after / <date>_before: inclusive date range on created, merged (PRs) or closed
+    - q: full-text search over title, description and discussion (plus AI
+      descriptions and the linked PR for issues)
+    - ordering: field to order by, prefixed with '-' for descending; items
+      without a value for a date field come last
+"""
+
+from datetime import datetime, time, timedelta, timezone as dt_timezone
+
+from django.contrib.postgres.search import SearchQuery, SearchRank
+from django.db.models import DateTimeField, F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+from rest_framework.exceptions import ValidationError
+
+from .models import text_search_vector
+
+# Query param prefix -> model field
+PULL_REQUEST_DATE_FIELDS = {
+    'created': 'created_at_github',
+    'merged': 'merged_at',
+    'closed': 'closed_at',
+}
+ISSUE_DATE_FIELDS = {
+    'created': 'created_at_github',
+    'closed': 'closed_at',
+}
+
+PULL_REQUEST_ORDERING_FIELDS = [
+    'created_at_github',
+    'updated_at_github',
+    'merged_at',
+    'closed_at',
+    'pr_number',
+    'additions',
+    'deletions',
+    'changed_files',
+]
+ISSUE_ORDERING_FIELDS = [
+    'created_at_github',
+    'updated_at_github',
+    'closed_at',
+    'issue_number',
+]
+
+# Sort values standing in for NULL dates so they order last (nullable ordering fields are all dates)
+NULLS_LAST_DESC = datetime.min.replace(tzinfo=dt_timezone.utc)
+NULLS_LAST_ASC = datetime.max.replace(tzinfo=dt_timezone.utc)
+
+
+def _parse_bound(param: str, value: str, upper: bool) -> datetime:
+    """
+    Parse a date or datetime query param into an aware datetime.
+
+    Plain dates are inclusive, so an upper bound moves to the start of the next day
+    and is compared with `<` (half-open range).
+    """
+    parsed = parse_datetime(value)
+    if parsed is not None:
+        if timezone.is_naive(parsed):
+            parsed = timezone.make_aware(parsed)
+        return parsed
+
+    try:
+        day = parse_date(value)
+    except ValueError:
+        day = None
+    if day is None:
+        raise ValidationError({param: 'Enter a valid date (YYYY-MM-DD) or ISO 8601 datetime.'})
+
+    if upper:
+        day += timedelta(days=1)
+    return timezone.make_aware(datetime.combine(day, time.min))
+
+
+def _filter_and_order(
+    queryset,
+    params,
+    date_fields: dict,
+    ordering_fields: list,
+    default_ordering: tuple,
+    search_document=text_search_vector,
+):
+    """
+    Apply the common filters and return (queryset, ordering).
+
+    `search_document` builds the tsvector expression matched by `q`; it must be
+    the indexed expression (or column) so the GIN index is used.
+    """
+    state = params.get('state')
+    if state:
+        queryset = queryset.filter(state=state)
+
+    labels = params.getlist('label')
+    if labels:
+        # jsonb containment, served by the labels GIN index
+        queryset = queryset.filter(labels__contains=labels)
+
+    author = params.get('author')
+    if author:
+        queryset = queryset.filter(author=author)
+
+    for prefix, field in date_fields.items():
+        after = params.get(f'{prefix}_after')
+        if after:
+            queryset = queryset.filter(**{f'{field}__gte': _parse_bound(f'{prefix}_after', after, upper=False)})
+
+        before = params.get(f'{prefix}_before')
+        if before:
+            queryset = queryset.filter(**{f'{field}__lt': _parse_bound(f'{prefix}_before', before, upper=True)})
+
+    ordering = default_ordering
+    search = params.get('q', '').strip()
+    if search:
+        query = SearchQuery(search, search_type='websearch', config='english')
+        # Match on the same expression as the GIN index so the planner can use it
+        queryset = queryset.alias(
+            search_document=search_document(),
+        ).filter(
+            search_document=query,
+        ).annotate(
+            search_rank=SearchRank(search_document(), query),
+        )
+        ordering = ('-search_rank', 'id')
+
+    ordering_param = params.get('ordering')
+    if ordering_param:
+        field = ordering_param.lstrip('-')
+        if field not in ordering_fields:
+            raise ValidationError({
+                'ordering': f"Invalid ordering field. Choose from: {', '.join(ordering_fields)}."
+            })
+        if queryset.model._meta.get_field(field).null:
+            # Cursor pagination cannot page over NULLs: order by a sort key where
+            # undated items get a sentinel that sorts them last in either direction
+            sort_key = f'{field}_sort'
+            sentinel = NULLS_LAST_DESC if ordering_param.startswith('-') else NULLS_LAST_ASC
+            queryset = queryset.annotate(**{sort_key: Coalesce(field, Value(sentinel, output_field=DateTimeField()))})
+            ordering_param = ordering_param.replace(field, sort_key)
+        ordering = (ordering_param, 'id')
+
+    return queryset.order_by(*ordering), ordering
+
+
+def filter_pull_requests(queryset, params):
+    """Filter, search and order a pull request queryset from query params."""
+    return _filter_and_order(
+        queryset,
+        params,
+        PULL_REQUEST_DATE_FIELDS,
+        PULL_REQUEST_ORDERING_FIELDS,
+        ('-created_at_github', 'id'),
+    )
+
+
+def filter_issues(queryset, params):
+    """Filter, search and order an issue queryset from query params."""
+    return _filter_and_order(
+        queryset,
+        params,
+        ISSUE_DATE_FIELDS,
+        ISSUE_ORDERING_FIELDS,
+        ('-created_at_github', 'id'),
+        # Issues keep a stored search_vector that also covers AI descriptions and linked PRs
+        search_document=lambda: F('search_vector'),
+    )
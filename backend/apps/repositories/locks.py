@@ -0,0 +1,123 @@
+"""
+Per-repository pipeline lease.
+
+Every pipeline stage (fetch, analyze, summaries) runs under a lease on its
+repository: a Redis key holding the pipeline's token, with an expiry. A
+background heartbeat extends the lease while a stage runs, so a crashed
+worker frees the repository after PIPELINE_LEASE_SECONDS. All stages of a run
+share its token (stored on the PipelineRun), so each takes the lease over
+without it being released in between. While the next stage waits in its
+queue, the lease is held for PIPELINE_HANDOFF_SECONDS instead. A trigger that finds the lease held by
+another token coalesces into the running pipeline instead of starting a
+second one.
+"""
+
+import logging
+import threading
+import uuid
+from functools import lru_cache
+
+import redis
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Take the lease if it is free or already ours, refreshing its expiry
+_CLAIM = """
+local holder = redis.call('get', KEYS[1])
+if holder and holder ~= ARGV[1] then
+    return 0
+end
+redis.call('set', KEYS[1], ARGV[1], 'PX', ARGV[2])
+return 1
+"""
+
+_EXTEND = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('pexpire', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+_RELEASE = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    return redis.call('del', KEYS[1])
+end
+return 0
+"""
+
+
+@lru_cache(maxsize=1)
+def pipeline_redis():
+    """Client for the Redis holding pipeline leases and progress."""
+    return redis.Redis.from_url(settings.PIPELINE_REDIS_URL)
+
+
+def lease_key(repository_id) -> str:
+    return f"pipeline:lease:{repository_id}"
+
+
+class RepositoryLease:
+    """
+    Lease on a repository's pipeline, identified by a token.
+
+    Pass the token of a running pipeline to continue it in a later stage;
+    without one a new token is generated.
+    """
+
+    def __init__(self, repository_id, token: str = None):
+        self.repository_id = repository_id
+        self.key = lease_key(repository_id)
+        self.token = token or uuid.uuid4().hex
+        self.ttl_ms = settings.PIPELINE_LEASE_SECONDS * 1000
+        self._stop = threading.Event()
+        self._heartbeat = None
+
+    def acquire(self) -> bool:
+        """Take the lease only if no pipeline holds it."""
+        return bool(pipeline_redis().set(self.key, self.token, nx=True, px=self.ttl_ms))
+
+    def claim(self) -> bool:
+        """Take the lease if it is free or already held with this token."""
+        return bool(pipeline_redis().eval(_CLAIM, 1, self.key, self.token, self.ttl_ms))
+
+    def extend(self, seconds: int = None) -> bool:
+        """Reset the expiry (to `seconds`, default the lease lifetime) if still held."""
+        ttl_ms = seconds * 1000 if seconds else self.ttl_ms
+        return bool(pipeline_redis().eval(_EXTEND, 1, self.key, self.token, ttl_ms))
+
+    def hand_off(self) -> bool:
+        """Keep the lease while the run's next stage (or a retry) waits in its queue."""
+        return self.extend(settings.PIPELINE_HANDOFF_SECONDS)
+
+    def release(self) -> bool:
+        return bool(pipeline_redis().eval(_RELEASE, 1, self.key, self.token))
+
+    def holder(self):
+        """Token of the pipeline currently holding the lease, if any."""
+        token = pipeline_redis().get(self.key)
+        return token.decode() if token else None
+
+    def start_heartbeat(self) -> None:
+        """Extend the lease every third of its lifetime until stopped."""
+        self._stop.clear()
+        self._heartbeat = threading.Thread(
+            target=self._beat, name=f"lease-{self.repository_id}", daemon=True
+        )
+        self._heartbeat.start()
+
+    def stop_heartbeat(self) -> None:
+        if self._heartbeat:
+            self._stop.set()
+            self._heartbeat.join()
+            self._heartbeat = None
+
+    def _beat(self) -> None:
+        interval = self.ttl_ms / 3000
+        while not self._stop.wait(interval):
+            try:
+                if not self.extend():
+                    logger.warning(f"Lost pipeline lease for repository {self.repository_id}")
+                    return
+            except redis.RedisError as e:
+                logger.warning(f"Could not extend pipeline lease for {self.repository_id}: {e}")
@@ -0,0 +1,90 @@
+"""
+Copy the legacy CommitData.files_changed lists into CommitFileChange rows.
+
+Usage:
+    python manage.py backfill_file_changes [--batch-size 500] [--dry-run]
+
+Run once after upgrading to the normalized file-change tables: incremental
+fetches never revisit old commits, so without it hotspots and path rollups
+stay empty for everything fetched before the upgrade. Commits that already
+have CommitFileChange rows (re-fetched since) keep them. Each copied list is
+emptied, so the command can be re-run safely; the files_changed column is
+dropped in a later release, once this has run.
+"""
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+
+from apps.analysis.hotspots import update_hotspot_rollups
+from apps.repositories.cache import mark_repository_data_changed
+from apps.repositories.models import CommitData, CommitFileChange, Repository
+from apps.repositories.tasks import _store_file_changes
+
+
+def _legacy_files(files_changed):
+    """File dicts in the shape `_store_file_changes` takes, from a legacy list."""
+    return [
+        {
+            'filename': f['filename'],
+            'additions': f.get('additions') or 0,
+            'deletions': f.get('deletions') or 0,
+            'status': f.get('status') or CommitFileChange.ChangeStatus.MODIFIED,
+        }
+        for f in files_changed
+        if isinstance(f, dict) and f.get('filename')
+    ]
+
+
+class Command(BaseCommand):
+    help = 'Copy legacy per-commit files_changed lists into CommitFileChange rows'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Count commits to backfill without saving')
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        legacy = CommitData.objects.exclude(files_changed=[]).annotate(
+            has_file_changes=Exists(CommitFileChange.objects.filter(commit=OuterRef('pk')))
+        )
+
+        if options['dry_run']:
+            pending = legacy.filter(has_file_changes=False).count()
+            self.stdout.write(self.style.SUCCESS(
+                f"Would backfill {pending} commits; {legacy.count() - pending} already have file changes"
+            ))
+            return
+
+        repository_ids = legacy.order_by().values_list('repository_id', flat=True).distinct()
+        copied, kept = 0, 0
+        for repository in Repository.objects.filter(pk__in=list(repository_ids)):
+            commits = legacy.filter(repository=repository).only('id', 'files_changed').order_by('pk')
+            repository_copied = 0
+            while True:
+                batch = list(commits[:batch_size])
+                if not batch:
+                    break
+                files_by_commit = {
+                    commit.id: _legacy_files(commit.files_changed)
+                    for commit in batch
+                    if not commit.has_file_changes
+                }
+                with transaction.atomic():
+                    _store_file_changes(repository, files_by_commit)
+                    # Plain update: leaves updated_at alone, so delta exports are unaffected
+                    CommitData.objects.filter(pk__in=[commit.pk for commit in batch]).update(files_changed=[])
+                repository_copied += len(files_by_commit)
+                kept += len(batch) - len(files_by_commit)
+
+            if repository_copied:
+                # Rebuild the rollups of every week, not only those of newly ingested commits
+                repository.hotspots_rolled_up_at = None
+                update_hotspot_rollups(repository)
+                mark_repository_data_changed(repository)
+            copied += repository_copied
+            self.stdout.write(f"{repository.full_name}: backfilled {repository_copied} commits")
+
+        self.stdout.write(self.style.SUCCESS(
+            f"Backfilled {copied} commits; {kept} already had file changes"
+        ))
@@ -0,0 +1,180 @@
+"""
+Run EXPLAIN on the hot pipeline/API queries and fail on sequential scans.
+
+Usage:
+    python manage.py check_query_plans [--repository <id>] [--min-rows 1000]
+
+Run it against a database seeded with a realistically sized repository; small
+tables are skipped because the planner rightly prefers sequential scans there.
+The same queries are checked against a small seeded database by
+apps/repositories/tests/test_query_plans.py.
+"""
+
+import json
+from datetime import timedelta
+
+from django.contrib.postgres.search import SearchQuery
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from apps.repositories.models import (
+    Repository,
+    CommitGroup,
+    CommitData,
+    PullRequest,
+    Issue,
+    text_search_vector,
+)
+from apps.repositories.tasks import _day_range
+
+
+def seq_scans(plan: dict):
+    """Yield relation names of every Seq Scan node in a JSON plan tree."""
+    if plan.get('Node Type') == 'Seq Scan':
+        yield plan.get('Relation Name')
+    for child in plan.get('Plans', []):
+        yield from seq_scans(child)
+
+
+def plan_indexes(plan: dict):
+    """Yield the name of every index used in a JSON plan tree."""
+    if plan.get('Index Name'):
+        yield plan['Index Name']
+    for child in plan.get('Plans', []):
+        yield from plan_indexes(child)
+
+
+def _table_rows(table: str) -> int:
+    with connection.cursor() as cursor:
+        cursor.execute('SELECT reltuples FROM pg_class WHERE relname = %s', [table])
+        row = cursor.fetchone()
+    return int(row[0]) if row else 0
+
+
+def hot_queries(repository):
+    """
+    (name, queryset) of the filters used by tasks.py and views.py, with
+    realistic values for `repository`. Also checked by the query plan tests.
+    """
+    latest = CommitData.objects.filter(repository=repository).order_by('-commit_date').first()
+    end_date = latest.commit_date.date() if latest else repository.created_at.date()
+    period_start, period_end = _day_range(end_date - timedelta(days=6), end_date)
+
+    author = (
+        PullRequest.objects.filter(repository=repository)
+        .values_list('author', flat=True)
+        .first()
+    ) or ''
+    contributor = repository.contributors.first()
+    commit_group = repository.commit_groups.first()
+
+    queries = [
+        ('commits in period', CommitData.objects.filter(
+            repository=repository, commit_date__gte=period_start, commit_date__lt=period_end,
+        )),
+        ('pull requests in period', PullRequest.objects.filter(
+            repository=repository, created_at_github__gte=period_start, created_at_github__lt=period_end,
+        )),
+        ('issues in period', Issue.objects.filter(
+            repository=repository, created_at_github__gte=period_start, created_at_github__lt=period_end,
+        )),
+        ('merged pull requests by author', PullRequest.objects.filter(
+            repository=repository, author=author, state=PullRequest.PRState.MERGED,
+        )),
+        ('closed issues by author', Issue.objects.filter(
+            repository=repository, author=author, state=Issue.IssueState.CLOSED,
+        )),
+        ('issue text search', Issue.objects.filter(
+            repository=repository, search_vector=SearchQuery('error', config='english'),
+        )),
+        ('pull request text search', PullRequest.objects.alias(
+            search_document=text_search_vector(),
+        ).filter(
+            repository=repository, search_document=SearchQuery('error', config='english'),
+        )),
+        ('pull requests by label', PullRequest.objects.filter(
+            repository=repository, labels__contains=['bug'],
+        )),
+        ('issues by label', Issue.objects.filter(
+            repository=repository, labels__contains=['bug'],
+        )),
+    ]
+    # Delta exports read rows changed since a recent snapshot
+    since = timezone.now() - timedelta(days=1)
+    queries += [
+        ('commit groups changed since snapshot', CommitGroup.objects.filter(
+            repository=repository, updated_at__gte=since,
+        )),
+        ('commits changed since snapshot', CommitData.objects.filter(
+            repository=repository, updated_at__gte=since,
+        )),
+        ('pull requests changed since snapshot', PullRequest.objects.filter(
+            repository=repository, updated_at__gte=since,
+        )),
+        ('issues changed since snapshot', Issue.objects.filter(
+            repository=repository, updated_at__gte=since,
+        )),
+    ]
+    if contributor:
+        queries.append(('contributor commit stats', CommitData.objects.filter(
+            contributor=contributor,
+        ).values('contributor').annotate(
+            total_commits=Count('id'),
+            total_additions=Sum('additions'),
+            total_deletions=Sum('deletions'),
+        )))
+    if commit_group:
+        queries.append(('key commits per group', CommitData.objects.filter(
+            commit_group=commit_group,
+        ).order_by('-commit_date')[:10]))
+
+    return queries
+
+
+class Command(BaseCommand):
+    help = 'EXPLAIN the hot repository queries and fail if any uses a sequential scan'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repository', help='Repository id (defaults to the one with most commits)')
+        parser.add_argument(
+            '--min-rows',
+            type=int,
+            default=1000,
+            help='Ignore sequential scans on tables with fewer estimated rows',
+        )
+
+    def handle(self, *args, **options):
+        repository = self._get_repository(options['repository'])
+        queries = hot_queries(repository)
+
+        failures = []
+        for name, queryset in queries:
+            plan = json.loads(queryset.explain(format='json'))[0]['Plan']
+            scanned = [
+                table for table in seq_scans(plan)
+                if _table_rows(table) >= options['min_rows']
+            ]
+            if scanned:
+                failures.append(name)
+                self.stdout.write(self.style.ERROR(f"{name}: sequential scan on {', '.join(scanned)}"))
+            else:
+                self.stdout.write(self.style.SUCCESS(f"{name}: ok"))
+
+        if failures:
+            raise CommandError(f"{len(failures)} hot queries use sequential scans")
+
+    def _get_repository(self, repository_id):
+        if repository_id:
+            try:
+                return Repository.objects.get(id=repository_id)
+            except Repository.DoesNotExist:
+                raise CommandError(f"Repository {repository_id} not found")
+
+        repository = Repository.objects.annotate(
+            num_commits=Count('commits')
+        ).order_by('-num_commits').first()
+        if not repository:
+            raise CommandError('No repositories found; seed the database first')
+        return repository
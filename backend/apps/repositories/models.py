@@ -1,8 +1,34 @@
 import uuid
+from django.contrib.postgres.fields import ArrayField
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
+from django.db.models import F, Func, TextField, Value
+from django.db.models.functions import Cast
 from django.conf import settings
 
 
+def discussion_text():
+    """Comment bodies of a `discussion` JSON list, as text."""
+    return Cast(
+        Func(F('discussion'), Value('$[*].body'), function='jsonb_path_query_array'),
+        TextField(),
+    )
+
+
+def text_search_vector():
+    """
+    Weighted full-text search vector over title, description and discussion.
+
+    Used both for the GIN expression indexes and for queries, so the two must stay identical.
+    """
+    return (
+        SearchVector('title', weight='A', config='english')
+        + SearchVector('description', weight='B', config='english')
+        + SearchVector(discussion_text(), weight='C', config='english')
+    )
+
+
 class Repository(models.Model):
     """Repository model for storing GitHub repository information"""
 
@@ -39,6 +65,17 @@ class Repository(models.Model):
     last_analyzed_at = models.DateTimeField(blank=True, null=True)
     analysis_error = models.TextField(blank=True, null=True)
 
+    # Bumped whenever a pipeline stage finishes writing data (used for ETags and caches)
+    data_version = models.PositiveIntegerField(default=0)
+    data_updated_at = models.DateTimeField(blank=True, null=True)
+
+    # Watermarks for incremental rollups (rows changed after them are processed next)
+    hotspots_rolled_up_at = models.DateTimeField(blank=True, null=True)
+    issues_indexed_at = models.DateTimeField(blank=True, null=True)
+    issues_linked_at = models.DateTimeField(blank=True, null=True)
+    # Start of the last successful GitHub fetch; incremental fetches resume from it
+    github_fetched_at = models.DateTimeField(blank=True, null=True)
+
     # Cron settings
     cron_enabled = models.BooleanField(default=False)
     cron_frequency = models.CharField(
@@ -47,6 +84,8 @@ class Repository(models.Model):
         blank=True,
         null=True
     )
+    # When the scheduler should next enqueue an update (null: due now)
+    next_update_at = models.DateTimeField(blank=True, null=True)
 
     # Metadata
     stars_count = models.IntegerField(default=0)
@@ -62,6 +101,14 @@ class Repository(models.Model):
         verbose_name_plural = 'Repositories'
         unique_together = ['user', 'github_repo_url']
         ordering = ['-created_at']
+        indexes = [
+            # Due repositories for the update scheduler
+            models.Index(
+                fields=['next_update_at'],
+                condition=models.Q(cron_enabled=True),
+                name='repositories_due_update_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.owner}/{self.repo_name}"
@@ -155,6 +202,10 @@ class CommitGroup(models.Model):
         verbose_name = 'Commit Group'
         verbose_name_plural = 'Commit Groups'
         ordering = ['-start_date']
+        indexes = [
+            # Delta exports select rows changed since a snapshot
+            models.Index(fields=['repository', 'updated_at'], name='commit_groups_repo_updated_idx'),
+        ]
 
     def __str__(self):
         return f"{self.repository.full_name} ({self.start_date} - {self.end_date})"
@@ -190,12 +241,17 @@ class CommitData(models.Model):
     author_name = models.CharField(max_length=255)
     author_email = models.EmailField(blank=True, null=True)
 
-    # Stats
-    files_changed = models.JSONField(default=list, blank=True)
+    # Stats (per-file changes live in CommitFileChange)
     additions = models.IntegerField(default=0)
     deletions = models.IntegerField(default=0)
+    # Legacy per-file list (at most 20 files), no longer written. Copied into
+    # CommitFileChange and emptied by `manage.py backfill_file_changes`; the
+    # column is dropped in a later release, once that has run everywhere.
+    files_changed = models.JSONField(default=list, blank=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
+    # Also bumped by the queryset updates that regroup commits (auto_now only fires on save)
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         db_table = 'commit_data'
@@ -203,11 +259,148 @@ class CommitData(models.Model):
         verbose_name_plural = 'Commits'
         unique_together = ['repository', 'commit_sha']
         ordering = ['-commit_date']
+        indexes = [
+            models.Index(fields=['repository', 'commit_date'], name='commit_data_repo_date_idx'),
+            models.Index(fields=['commit_group', '-commit_date'], name='commit_data_group_date_idx'),
+            models.Index(fields=['repository', 'updated_at'], name='commit_data_repo_updated_idx'),
+            # Covers the per-contributor Count/Sum in score calculation (index-only scan)
+            models.Index(
+                fields=['contributor'],
+                include=['additions', 'deletions'],
+                name='commit_data_contrib_stats_idx',
+            ),
+        ]
 
     def __str__(self):
         return f"{self.commit_sha[:7]} - {self.commit_message[:50]}"
 
 
+class FilePath(models.Model):
+    """Interned file path, shared by every change to that path in a repository"""
+
+    repository = models.ForeignKey(
+        Repository,
+        on_delete=models.CASCADE,
+        related_name='file_paths'
+    )
+    path = models.CharField(max_length=1024)
+
+    class Meta:
+        db_table = 'file_paths'
+        verbose_name = 'File Path'
+        verbose_name_plural = 'File Paths'
+        unique_together = ['repository', 'path']
+
+    def __str__(self):
+        return self.path
+
+
+class CommitFileChange(models.Model):
+    """Change to a single file in a commit"""
+
+    class ChangeStatus(models.TextChoices):
+        ADDED = 'added', 'Added'
+        MODIFIED = 'modified', 'Modified'
+        REMOVED = 'removed', 'Removed'
+        RENAMED = 'renamed', 'Renamed'
+        COPIED = 'copied', 'Copied'
+        CHANGED = 'changed', 'Changed'
+        UNCHANGED = 'unchanged', 'Unchanged'
+
+    commit = models.ForeignKey(
+        CommitData,
+        on_delete=models.CASCADE,
+        related_name='file_changes'
+    )
+    path = models.ForeignKey(
+        FilePath,
+        on_delete=models.CASCADE,
+        related_name='changes'
+    )
+    additions = models.IntegerField(default=0)
+    deletions = models.IntegerField(default=0)
+    status = models.CharField(
+        max_length=10,
+        choices=ChangeStatus.choices,
+        default=ChangeStatus.MODIFIED
+    )
+
+    class Meta:
+        db_table = 'commit_file_changes'
+        verbose_name = 'Commit File Change'
+        verbose_name_plural = 'Commit File Changes'
+        unique_together = ['commit', 'path']
+
+    def __str__(self):
+        return f"{self.commit.commit_sha[:7]} {self.path.path}"
+
+
+class PathActivityRollup(models.Model):
+    """
+    Weekly churn per path prefix and author, used for hotspot and ownership analytics.
+
+    Every directory prefix of a changed file gets a row (plus the file itself), with
+    `parent` pointing at the enclosing directory so drilldowns only read children.
+    """
+
+    repository = models.ForeignKey(
+        Repository,
+        on_delete=models.CASCADE,
+        related_name='path_rollups'
+    )
+    path = models.CharField(max_length=1024)
+    parent = models.CharField(max_length=1024, blank=True, default='')
+    is_file = models.BooleanField(default=False)
+    week_start = models.DateField()
+    author = models.CharField(max_length=255)
+
+    commits = models.IntegerField(default=0)
+    additions = models.IntegerField(default=0)
+    deletions = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'path_activity_rollups'
+        verbose_name = 'Path Activity Rollup'
+        verbose_name_plural = 'Path Activity Rollups'
+        unique_together = ['repository', 'path', 'week_start', 'author']
+        indexes = [
+            models.Index(fields=['repository', 'parent', 'week_start'], name='path_rollups_parent_week_idx'),
+            models.Index(fields=['repository', 'week_start'], name='path_rollups_week_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.path or '/'} ({self.week_start}, {self.author})"
+
+
+class DailyActivity(models.Model):
+    """Per-day activity counts for a repository, used by the timeline API"""
+
+    repository = models.ForeignKey(
+        Repository,
+        on_delete=models.CASCADE,
+        related_name='daily_activity'
+    )
+    day = models.DateField()
+
+    commits = models.IntegerField(default=0)
+    additions = models.IntegerField(default=0)
+    deletions = models.IntegerField(default=0)
+    prs_opened = models.IntegerField(default=0)
+    prs_merged = models.IntegerField(default=0)
+    issues_opened = models.IntegerField(default=0)
+    issues_closed = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'daily_activity'
+        verbose_name = 'Daily Activity'
+        verbose_name_plural = 'Daily Activity'
+        unique_together = ['repository', 'day']
+        ordering = ['day']
+
+    def __str__(self):
+        return f"{self.repository.full_name} ({self.day})"
+
+
 class PullRequest(models.Model):
     """PullRequest model for storing PR information"""
 
@@ -263,6 +456,13 @@ class PullRequest(models.Model):
         verbose_name_plural = 'Pull Requests'
         unique_together = ['repository', 'pr_number']
         ordering = ['-created_at_github']
+        indexes = [
+            models.Index(fields=['repository', 'created_at_github'], name='pull_requests_repo_created_idx'),
+            models.Index(fields=['repository', 'author', 'state'], name='pull_requests_repo_author_idx'),
+            models.Index(fields=['repository', 'updated_at'], name='pull_requests_repo_updated_idx'),
+            GinIndex(fields=['labels'], opclasses=['jsonb_path_ops'], name='pull_requests_labels_gin'),
+            GinIndex(text_search_vector(), name='pull_requests_search_gin'),
+        ]
 
     def __str__(self):
         return f"#{self.pr_number} - {self.title}"
@@ -314,6 +514,13 @@ class Issue(models.Model):
     ai_summary = models.TextField(blank=True, null=True)
     problem_description = models.TextField(blank=True, null=True)
     solution_description = models.TextField(blank=True, null=True)
+    # Hash of the content the AI fields were generated from (unchanged issues are skipped)
+    ai_content_hash = models.CharField(max_length=64, blank=True, default='')
+
+    # Search index (maintained by apps.analysis.issue_search)
+    search_vector = SearchVectorField(blank=True, null=True)
+    minhash_signature = ArrayField(models.BigIntegerField(), blank=True, default=list)
+    minhash_bands = ArrayField(models.BigIntegerField(), blank=True, default=list)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -324,6 +531,14 @@ class Issue(models.Model):
         verbose_name_plural = 'Issues'
         unique_together = ['repository', 'issue_number']
         ordering = ['-created_at_github']
+        indexes = [
+            models.Index(fields=['repository', 'created_at_github'], name='issues_repo_created_idx'),
+            models.Index(fields=['repository', 'author', 'state'], name='issues_repo_author_idx'),
+            models.Index(fields=['repository', 'updated_at'], name='issues_repo_updated_idx'),
+            GinIndex(fields=['labels'], opclasses=['jsonb_path_ops'], name='issues_labels_gin'),
+            GinIndex(fields=['search_vector'], name='issues_search_gin'),
+            GinIndex(fields=['minhash_bands'], name='issues_minhash_bands_gin'),
+        ]
 
     def __str__(self):
         return f"#{self.issue_number} - {self.title}"
@@ -373,6 +588,11 @@ class Export(models.Model):
         MONTHLY = 'monthly', 'Monthly'
         COMPLETE = 'complete', 'Complete'
 
+    class ExportFormat(models.TextChoices):
+        MARKDOWN = 'markdown', 'Markdown'
+        JSONL = 'jsonl', 'JSON Lines'
+        PARQUET = 'parquet', 'Parquet'
+
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     repository = models.ForeignKey(
         Repository,
@@ -384,6 +604,11 @@ class Export(models.Model):
         max_length=20,
         choices=ExportType.choices
     )
+    export_format = models.CharField(
+        max_length=20,
+        choices=ExportFormat.choices,
+        default=ExportFormat.MARKDOWN
+    )
 
     # Date range for weekly/monthly exports
     date_range_start = models.DateField(blank=True, null=True)
@@ -391,7 +616,33 @@ class Export(models.Model):
 
     # File info
     file_path = models.CharField(max_length=500)
-    file_size = models.BigIntegerField(default=0)  # In bytes
+    file_size = models.BigIntegerField(default=0)  # In bytes, as stored on disk
+    # Encoding of the stored markdown ('gzip' or '' for plain files)
+    content_encoding = models.CharField(max_length=20, blank=True, default='')
+
+    # Chunked exports: token budget per chunk; file_path is the manifest and
+    # file_size covers all chunk files. Parquet exports also use a manifest,
+    # with one chunk per record type.
+    chunk_tokens = models.PositiveIntegerField(blank=True, null=True)
+    chunk_count = models.PositiveIntegerField(default=0)
+
+    # Cache identity: hash of (repository, data version, parameters); identical
+    # requests against unchanged data reuse this export
+    cache_key = models.CharField(max_length=64, blank=True, default='', db_index=True)
+    data_version = models.PositiveIntegerField(default=0)
+    last_accessed_at = models.DateTimeField(blank=True, null=True)
+
+    # When generation started reading data; deltas against this export start here
+    snapshot_at = models.DateTimeField(blank=True, null=True)
+    # Delta exports: the export they apply on top of, and its snapshot time
+    base_export = models.ForeignKey(
+        'self',
+        on_delete=models.SET_NULL,
+        related_name='deltas',
+        blank=True,
+        null=True
+    )
+    delta_since = models.DateTimeField(blank=True, null=True)
 
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
@@ -404,3 +655,122 @@ class Export(models.Model):
 
     def __str__(self):
         return f"{self.export_type} export for {self.repository.full_name}"
+
+    @property
+    def has_manifest(self):
+        """Whether file_path is a manifest listing the export's files (chunked or Parquet)"""
+        return bool(self.chunk_tokens) or self.export_format == self.ExportFormat.PARQUET
+
+
+class DeletedRecord(models.Model):
+    """Tombstone for an exported record that was deleted, emitted by delta exports"""
+
+    repository = models.ForeignKey(
+        Repository,
+        on_delete=models.CASCADE,
+        related_name='deleted_records'
+    )
+    # Record type and natural key, as in JSONL exports
+    record_type = models.CharField(max_length=20)
+    record_key = models.CharField(max_length=255)
+    deleted_at = models.DateTimeField()
+
+    class Meta:
+        db_table = 'deleted_records'
+        verbose_name = 'Deleted Record'
+        verbose_name_plural = 'Deleted Records'
+        indexes = [
+            models.Index(fields=['repository', 'deleted_at'], name='deleted_records_repo_time_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.record_type} {self.record_key} deleted {self.deleted_at}"
+
+
+class PipelineRun(models.Model):
+    """One run of the fetch -> analyze -> summaries pipeline of a repository"""
+
+    class Status(models.TextChoices):
+        RUNNING = 'running', 'Running'
+        COMPLETED = 'completed', 'Completed'
+        FAILED = 'failed', 'Failed'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    repository = models.ForeignKey(
+        Repository,
+        on_delete=models.CASCADE,
+        related_name='pipeline_runs'
+    )
+    # Token of the repository lease the run's stages execute under
+    token = models.CharField(max_length=32, unique=True)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.RUNNING
+    )
+    # Incremental runs fetch only items changed after fetch_since
+    incremental = models.BooleanField(default=False)
+    fetch_since = models.DateTimeField(blank=True, null=True)
+    error = models.TextField(blank=True, null=True)
+
+    started_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'pipeline_runs'
+        verbose_name = 'Pipeline Run'
+        verbose_name_plural = 'Pipeline Runs'
+        ordering = ['-started_at']
+        indexes = [
+            models.Index(fields=['repository', '-started_at'], name='pipeline_runs_repo_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.repository} pipeline {self.started_at} ({self.status})"
+
+
+class PipelineStage(models.Model):
+    """State and timings of one stage of a pipeline run"""
+
+    class Status(models.TextChoices):
+        PENDING = 'pending', 'Pending'
+        RUNNING = 'running', 'Running'
+        RETRYING = 'retrying', 'Retrying'
+        COMPLETED = 'completed', 'Completed'
+        SKIPPED = 'skipped', 'Skipped'
+        FAILED = 'failed', 'Failed'
+
+    run = models.ForeignKey(
+        PipelineRun,
+        on_delete=models.CASCADE,
+        related_name='stages'
+    )
+    name = models.CharField(max_length=30)
+    status = models.CharField(
+        max_length=20,
+        choices=Status.choices,
+        default=Status.PENDING
+    )
+    attempts = models.PositiveIntegerField(default=0)
+    error = models.TextField(blank=True, null=True)
+
+    # From the first attempt's start to completion, including retry delays
+    started_at = models.DateTimeField(blank=True, null=True)
+    finished_at = models.DateTimeField(blank=True, null=True)
+
+    class Meta:
+        db_table = 'pipeline_stages'
+        verbose_name = 'Pipeline Stage'
+        verbose_name_plural = 'Pipeline Stages'
+        unique_together = ['run', 'name']
+        ordering = ['id']
+
+    def __str__(self):
+        return f"{self.name} ({self.status})"
+
+    @property
+    def duration(self):
+        """Seconds from start to finish, or None while unfinished"""
+        if self.started_at and self.finished_at:
+            return (self.finished_at - self.started_at).total_seconds()
+        return None
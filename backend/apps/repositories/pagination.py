@@ -0,0 +1,32 @@
+"""
+Cursor pagination for the repository data actions.
+
+Each class orders by the natural key of its table so pages stay stable while
+new data is ingested, with ``id`` as a tie-breaker.
+"""
+
+from rest_framework.pagination import CursorPagination
+
+
+class RepositoryDataCursorPagination(CursorPagination):
+    """Base keyset pagination for nested repository data"""
+
+    page_size = 50
+    page_size_query_param = 'page_size'
+    max_page_size = 500
+
+
+class CommitGroupCursorPagination(RepositoryDataCursorPagination):
+    ordering = ('-start_date', 'id')
+
+
+class PullRequestCursorPagination(RepositoryDataCursorPagination):
+    ordering = ('-created_at_github', 'id')
+
+
+class IssueCursorPagination(RepositoryDataCursorPagination):
+    ordering = ('-created_at_github', 'id')
+
+
+class ContributorCursorPagination(RepositoryDataCursorPagination):
+    ordering = ('-impact_score', 'id')
@@ -0,0 +1,191 @@
+"""
+Pipeline runs and their stages.
+
+A repository's data pipeline is a Celery canvas (built in tasks.py):
+
+    metadata -> (commits | pull_requests | issues) -> index -> analyze -> summaries
+
+Each stage is its own task, recorded as a PipelineStage row of the run with
+its status, attempts and timings. A stage that is retried, or redelivered
+after a worker crash, re-runs on its own; stages already completed in the run
+are skipped, so resuming a failed run starts at the stage that failed. Stages
+upsert what they derive, so re-running one converges on the same data: the
+analyze stage keeps unchanged commit groups with their summaries. All
+stages execute under the run's repository lease (see locks.py), which is
+handed off from each stage to the next and released once the run is over and
+none of its stages is still executing. Live progress is reported to Redis
+alongside (see progress.py).
+"""
+
+import functools
+import logging
+from datetime import datetime, timezone
+
+from celery.exceptions import Retry
+
+from .locks import RepositoryLease
+
+logger = logging.getLogger(__name__)
+
+# In execution order; the fetch stages between metadata and index run in parallel
+PIPELINE_STAGES = (
+    "metadata",
+    "commits",
+    "pull_requests",
+    "issues",
+    "index",
+    "analyze",
+    "summaries",
+)
+
+
+def create_pipeline_run(repository, token: str, incremental: bool = False, fetch_since=None):
+    """Record a new run, with all of its stages pending."""
+    from .models import PipelineRun, PipelineStage
+    from .progress import PipelineProgress
+
+    run = PipelineRun.objects.create(
+        repository=repository,
+        token=token,
+        incremental=incremental,
+        fetch_since=fetch_since,
+    )
+    PipelineStage.objects.bulk_create(PipelineStage(run=run, name=name) for name in PIPELINE_STAGES)
+    PipelineProgress(repository.pk).start(run.pk, repository.user_id)
+    return run
+
+
+def finish_pipeline_run(run, status: str, error: str = None) -> bool:
+    """
+    Close a run, skip its stages that are not running, and release its lease.
+
+    While a parallel stage of the run is still executing the lease is kept;
+    that stage releases it when it ends. Returns False if the run was already
+    closed (by a parallel stage).
+    """
+    from .models import PipelineRun, PipelineStage
+    from .progress import PipelineProgress
+
+    now = datetime.now(timezone.utc)
+    closed = PipelineRun.objects.filter(pk=run.pk, status=PipelineRun.Status.RUNNING).update(
+        status=status, error=error, finished_at=now
+    )
+    if closed:
+        run.stages.filter(
+            status__in=[PipelineStage.Status.PENDING, PipelineStage.Status.RETRYING]
+        ).update(status=PipelineStage.Status.SKIPPED)
+        # After a lost lease, progress is reported by the pipeline that took it
+        if RepositoryLease(run.repository_id, run.token).holder() in (None, run.token):
+            PipelineProgress(run.repository_id).finish(status)
+    _release_if_idle(run)
+    return bool(closed)
+
+
+def _release_if_idle(run) -> None:
+    """Release the run's lease unless one of its stages is still executing."""
+    from .models import PipelineStage
+
+    if not run.stages.filter(status=PipelineStage.Status.RUNNING).exists():
+        RepositoryLease(run.repository_id, run.token).release()
+
+
+def _update_stage(run, name: str, **fields) -> None:
+    from .models import PipelineStage
+
+    PipelineStage.objects.filter(run=run, name=name).update(**fields)
+
+
+def pipeline_stage(name: str):
+    """
+    Run a bound task as stage `name` of the pipeline run passed as its first argument.
+
+    The task function is called as `func(task, run, *args, **kwargs)`, with
+    the run's PipelineProgress as `run.progress`. It is not called when the
+    run is over or the stage already completed; if another pipeline took the
+    repository's lease, the run fails. A `self.retry()` from the function
+    marks the stage as retrying; any other exception fails the stage and the
+    run. Completing the last stage completes the run; otherwise the lease is
+    handed off to the next stage.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(task, run_id, *args, **kwargs):
+            from .models import PipelineRun, PipelineStage
+            from .progress import PipelineProgress
+
+            try:
+                run = PipelineRun.objects.select_related("repository").get(pk=run_id)
+            except PipelineRun.DoesNotExist:
+                logger.error(f"Pipeline run {run_id} not found")
+                return None
+
+            stage = run.stages.get(name=name)
+            if run.status != PipelineRun.Status.RUNNING or stage.status == PipelineStage.Status.COMPLETED:
+                logger.info(f"Skipping {name} stage of pipeline run {run_id} ({run.status}, stage {stage.status})")
+                return None
+
+            lease = RepositoryLease(run.repository_id, run.token)
+            if not lease.claim():
+                logger.warning(
+                    f"Pipeline run {run_id} lost its lease before the {name} stage: "
+                    f"pipeline {lease.holder()} is running for repository {run.repository_id}"
+                )
+                finish_pipeline_run(run, PipelineRun.Status.FAILED, error="lease lost")
+                return None
+            lease.start_heartbeat()
+            run.progress = PipelineProgress(run.repository_id)
+            run.progress.stage_started(name)
+
+            now = datetime.now(timezone.utc)
+            _update_stage(
+                run,
+                name,
+                status=PipelineStage.Status.RUNNING,
+                attempts=stage.attempts + 1,
+                started_at=stage.started_at or now,
+                error=None,
+            )
+
+            try:
+                try:
+                    result = func(task, run, *args, **kwargs)
+                finally:
+                    lease.stop_heartbeat()
+            except Retry as e:
+                _update_stage(run, name, status=PipelineStage.Status.RETRYING, error=str(e.exc or e))
+                run.progress.stage_finished(name, PipelineStage.Status.RETRYING)
+                lease.hand_off()
+                raise
+            except Exception as e:
+                _update_stage(
+                    run,
+                    name,
+                    status=PipelineStage.Status.FAILED,
+                    error=str(e),
+                    finished_at=datetime.now(timezone.utc),
+                )
+                run.progress.stage_finished(name, PipelineStage.Status.FAILED)
+                finish_pipeline_run(run, PipelineRun.Status.FAILED, error=f"{name}: {e}")
+                raise
+
+            _update_stage(
+                run,
+                name,
+                status=PipelineStage.Status.COMPLETED,
+                finished_at=datetime.now(timezone.utc),
+            )
+            run.progress.stage_finished(name, PipelineStage.Status.COMPLETED)
+            if name == PIPELINE_STAGES[-1]:
+                finish_pipeline_run(run, PipelineRun.Status.COMPLETED)
+            elif PipelineRun.objects.filter(pk=run.pk, status=PipelineRun.Status.RUNNING).exists():
+                # Hold the lease while the next stage waits in its queue
+                lease.hand_off()
+            else:
+                # The run ended while this stage ran (a parallel stage failed)
+                _release_if_idle(run)
+            return result
+
+        return wrapper
+
+    return decorator
@@ -0,0 +1,218 @@
+"""
+Live pipeline progress, kept in Redis.
+
+Stages publish what they are doing into one hash per repository: the run's
+status, each stage's status, start/finish time and items done/total, and
+counters of GitHub requests, LLM calls and LLM tokens. Every update is a
+single HSET/HINCRBY, so the parallel fetch stages can report concurrently.
+
+The progress endpoint reads the hash in one round trip without touching
+Postgres. Stages that have not started are estimated from their durations in
+the repository's previous completed run, which are kept in a second hash.
+
+Reporting is best-effort: Redis errors are logged and never fail a stage.
+"""
+
+import logging
+import time
+from datetime import datetime, timezone
+
+import redis
+
+from .locks import pipeline_redis
+from .pipeline import PIPELINE_STAGES
+
+logger = logging.getLogger(__name__)
+
+# Progress stays readable this long after its last update
+PROGRESS_TTL = 24 * 3600
+
+# Stages that run at the same time; their estimates overlap instead of adding up
+PARALLEL_STAGES = ("commits", "pull_requests", "issues")
+
+_FINISHED = ("completed", "skipped", "failed")
+
+
+def progress_key(repository_id) -> str:
+    return f"pipeline:progress:{repository_id}"
+
+
+def durations_key(repository_id) -> str:
+    return f"pipeline:durations:{repository_id}"
+
+
+class PipelineProgress:
+    """Progress reporter for the pipeline run of one repository."""
+
+    def __init__(self, repository_id):
+        self.repository_id = repository_id
+        self.key = progress_key(repository_id)
+
+    def _write(self, *commands) -> None:
+        """Run (method, *args) commands in one round trip, refreshing the expiry."""
+        try:
+            pipe = pipeline_redis().pipeline(transaction=False)
+            for method, *args in commands:
+                getattr(pipe, method)(self.key, *args)
+            pipe.expire(self.key, PROGRESS_TTL)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not report pipeline progress for {self.repository_id}: {e}")
+
+    def start(self, run_id, user_id, stage_statuses: dict = None) -> None:
+        """Reset progress for a (new or resumed) run; stages default to pending."""
+        mapping = {
+            "run_id": str(run_id),
+            "user_id": str(user_id),
+            "status": "running",
+            "started_at": time.time(),
+        }
+        for stage in PIPELINE_STAGES:
+            mapping[f"{stage}:status"] = (stage_statuses or {}).get(stage, "pending")
+        self._write(("delete",), ("hset", None, None, mapping))
+
+    def stage_started(self, stage: str) -> None:
+        self._write(
+            ("hset", None, None, {f"{stage}:status": "running", f"{stage}:started_at": time.time()}),
+            ("hdel", f"{stage}:done", f"{stage}:total"),
+        )
+
+    def stage_finished(self, stage: str, status: str) -> None:
+        self._write(("hset", None, None, {f"{stage}:status": status, f"{stage}:finished_at": time.time()}))
+
+    def set_total(self, stage: str, total: int) -> None:
+        self._write(("hset", f"{stage}:total", total))
+
+    def advance(self, stage: str, items: int = 1) -> None:
+        self._write(("hincrby", f"{stage}:done", items))
+
+    def count(self, counter: str, amount: int = 1) -> None:
+        """Add to a run counter: github_requests, llm_calls or llm_tokens."""
+        self._write(("hincrby", counter, amount))
+
+    def record_llm_call(self, tokens: int) -> None:
+        self._write(("hincrby", "llm_calls", 1), ("hincrby", "llm_tokens", tokens))
+
+    def finish(self, status: str) -> None:
+        """
+        Close the run; stages that never ran are marked skipped.
+
+        The stage durations of a completed run become the estimates for the next.
+        """
+        try:
+            client = pipeline_redis()
+            fields = {k.decode(): v.decode() for k, v in client.hgetall(self.key).items()}
+            now = time.time()
+            mapping = {"status": status, "finished_at": now}
+            durations = {}
+            for stage in PIPELINE_STAGES:
+                if fields.get(f"{stage}:status") == "pending":
+                    mapping[f"{stage}:status"] = "skipped"
+                elif f"{stage}:started_at" in fields and f"{stage}:finished_at" in fields:
+                    durations[stage] = float(fields[f"{stage}:finished_at"]) - float(fields[f"{stage}:started_at"])
+
+            pipe = client.pipeline(transaction=False)
+            pipe.hset(self.key, mapping=mapping)
+            pipe.expire(self.key, PROGRESS_TTL)
+            if status == "completed" and durations:
+                pipe.delete(durations_key(self.repository_id))
+                pipe.hset(durations_key(self.repository_id), mapping=durations)
+            pipe.execute()
+        except redis.RedisError as e:
+            logger.warning(f"Could not report pipeline progress for {self.repository_id}: {e}")
+
+
+def _timestamp(value):
+    if value is None:
+        return None
+    return datetime.fromtimestamp(float(value), tz=timezone.utc).isoformat()
+
+
+def _int(value):
+    return int(value) if value is not None else None
+
+
+def _stage_estimate(stage: dict, typical, now: float):
+    """Seconds left in a stage, or None if unknown."""
+    if stage["status"] in _FINISHED:
+        return 0.0
+    if stage["status"] == "pending":
+        return typical
+    # Running or retrying: extrapolate from items done, else from the last run
+    elapsed = now - stage["_started"]
+    done, total = stage["done"], stage["total"]
+    if done and total:
+        return max(elapsed * (total - done) / done, 0.0)
+    if typical is not None:
+        return max(typical - elapsed, 0.0)
+    return None
+
+
+def _eta_seconds(stages: list, durations: dict, now: float):
+    remaining, parallel = 0.0, []
+    for stage in stages:
+        estimate = _stage_estimate(stage, durations.get(stage["name"]), now)
+        if estimate is None:
+            return None
+        if stage["name"] in PARALLEL_STAGES:
+            parallel.append(estimate)
+        else:
+            remaining += estimate
+    return round(remaining + max(parallel, default=0.0))
+
+
+def read_progress(repository_id):
+    """
+    Progress of the repository's current or last run, or None if none was
+    reported in the last PROGRESS_TTL. Includes the owner's `user_id`.
+    """
+    client = pipeline_redis()
+    pipe = client.pipeline(transaction=False)
+    pipe.hgetall(progress_key(repository_id))
+    pipe.hgetall(durations_key(repository_id))
+    raw, raw_durations = pipe.execute()
+    if not raw:
+        return None
+
+    fields = {k.decode(): v.decode() for k, v in raw.items()}
+    if "status" not in fields or "user_id" not in fields:
+        # Only counters: an HINCRBY recreated the hash after it expired or was reset
+        return None
+    durations = {k.decode(): float(v) for k, v in raw_durations.items()}
+    now = time.time()
+
+    stages = []
+    for name in PIPELINE_STAGES:
+        stages.append(
+            {
+                "name": name,
+                "status": fields.get(f"{name}:status", "pending"),
+                "done": _int(fields.get(f"{name}:done")),
+                "total": _int(fields.get(f"{name}:total")),
+                "started_at": _timestamp(fields.get(f"{name}:started_at")),
+                "finished_at": _timestamp(fields.get(f"{name}:finished_at")),
+                "_started": float(fields.get(f"{name}:started_at", now)),
+            }
+        )
+
+    status = fields["status"]
+    started = float(fields.get("started_at", now))
+    finished = fields.get("finished_at")
+    eta = _eta_seconds(stages, durations, now) if status == "running" else 0
+    for stage in stages:
+        del stage["_started"]
+
+    return {
+        "run_id": fields.get("run_id"),
+        "user_id": fields["user_id"],
+        "status": status,
+        "current_stages": [stage["name"] for stage in stages if stage["status"] in ("running", "retrying")],
+        "started_at": _timestamp(started),
+        "finished_at": _timestamp(finished),
+        "elapsed_seconds": round((float(finished) if finished else now) - started),
+        "eta_seconds": eta,
+        "github_requests": int(fields.get("github_requests", 0)),
+        "llm_calls": int(fields.get("llm_calls", 0)),
+        "llm_tokens": int(fields.get("llm_tokens", 0)),
+        "stages": stages,
+    }
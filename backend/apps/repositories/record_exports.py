@@ -0,0 +1,343 @@
+"""
+Machine-readable exports: JSONL and Parquet.
+
+Both formats share one column layout per record type (commit group, commit,
+pull request, issue). Rows are read with `values_list` iterators in chunks
+and written as they arrive, so memory stays flat however large the export:
+
+- JSONL: one JSON object per line, tagged with an `op`, its record `type` and
+  a natural `key`, in a single (gzip-compressed) file.
+- Parquet: one zstd-compressed file per record type plus a manifest.json,
+  written in record batches. Needs the optional `pyarrow` package.
+
+JSONL exports can also be deltas against an earlier export's snapshot: rows
+created or updated since then as "upsert" records, preceded by "delete"
+records from the DeletedRecord tombstones. Applying a delta to the records of
+the earlier export, by (type, key), gives the records of a full export.
+"""
+
+import json
+import os
+import shutil
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.serializers.json import DjangoJSONEncoder
+
+from .exports import EXPORT_CHUNK_SIZE, MANIFEST_FILENAME, export_querysets
+from .tasks import _day_range
+
+JSONL_CONTENT_TYPE = "application/x-ndjson"
+PARQUET_CONTENT_TYPE = "application/vnd.apache.parquet"
+
+
+class RecordTable(NamedTuple):
+    """
+    A record type: JSONL `type` tag, Parquet file name, (column, lookup, kind)
+    triples, the columns forming its natural key and the timestamp field that
+    marks a row as changed.
+    """
+
+    record_type: str
+    name: str
+    columns: tuple
+    key_columns: tuple
+    changed_field: str
+
+
+# Column kinds: string, int, uuid, date, timestamp, list (of strings) and json
+# (free-form JSON, stored as text in Parquet)
+RECORD_TABLES = (
+    RecordTable(
+        "commit_group",
+        "commit_groups",
+        (
+            ("id", "id", "uuid"),
+            ("group_type", "group_type", "string"),
+            ("start_date", "start_date", "date"),
+            ("end_date", "end_date", "date"),
+            ("commit_count", "commit_count", "int"),
+            ("summary", "summary", "string"),
+            ("key_changes", "key_changes", "json"),
+            ("notable_features", "notable_features", "json"),
+            ("bug_fixes", "bug_fixes", "json"),
+            ("technical_decisions", "technical_decisions", "json"),
+            ("main_contributors", "main_contributors", "json"),
+            ("analyzed_at", "analyzed_at", "timestamp"),
+        ),
+        ("group_type", "start_date"),
+        "updated_at",
+    ),
+    RecordTable(
+        "commit",
+        "commits",
+        (
+            ("id", "id", "uuid"),
+            ("commit_sha", "commit_sha", "string"),
+            ("commit_group_id", "commit_group_id", "uuid"),
+            ("contributor", "contributor__github_username", "string"),
+            ("author_name", "author_name", "string"),
+            ("author_email", "author_email", "string"),
+            ("commit_date", "commit_date", "timestamp"),
+            ("commit_message", "commit_message", "string"),
+            ("additions", "additions", "int"),
+            ("deletions", "deletions", "int"),
+        ),
+        ("commit_sha",),
+        "updated_at",
+    ),
+    RecordTable(
+        "pull_request",
+        "pull_requests",
+        (
+            ("id", "id", "uuid"),
+            ("pr_number", "pr_number", "int"),
+            ("title", "title", "string"),
+            ("description", "description", "string"),
+            ("author", "author", "string"),
+            ("state", "state", "string"),
+            ("created_at_github", "created_at_github", "timestamp"),
+            ("updated_at_github", "updated_at_github", "timestamp"),
+            ("merged_at", "merged_at", "timestamp"),
+            ("closed_at", "closed_at", "timestamp"),
+            ("additions", "additions", "int"),
+            ("deletions", "deletions", "int"),
+            ("changed_files", "changed_files", "int"),
+            ("commit_shas", "commit_shas", "list"),
+            ("labels", "labels", "list"),
+            ("discussion", "discussion", "json"),
+            ("ai_summary", "ai_summary", "string"),
+        ),
+        ("pr_number",),
+        "updated_at",
+    ),
+    RecordTable(
+        "issue",
+        "issues",
+        (
+            ("id", "id", "uuid"),
+            ("issue_number", "issue_number", "int"),
+            ("title", "title", "string"),
+            ("description", "description", "string"),
+            ("author", "author", "string"),
+            ("state", "state", "string"),
+            ("created_at_github", "created_at_github", "timestamp"),
+            ("updated_at_github", "updated_at_github", "timestamp"),
+            ("closed_at", "closed_at", "timestamp"),
+            ("labels", "labels", "list"),
+            ("discussion", "discussion", "json"),
+            ("ai_summary", "ai_summary", "string"),
+            ("problem_description", "problem_description", "string"),
+            ("solution_description", "solution_description", "string"),
+            ("resolution_pr_number", "resolution_pr__pr_number", "int"),
+        ),
+        ("issue_number",),
+        "updated_at",
+    ),
+)
+
+RECORD_TABLES_BY_TYPE = {table.record_type: table for table in RECORD_TABLES}
+
+
+def record_key(values) -> str:
+    """Natural key of a record from the values of its key columns."""
+    return ":".join(str(value) for value in values)
+
+
+def record_deletions(repository, record_type: str, queryset) -> int:
+    """
+    Store tombstones for the rows of `queryset`, which is about to be deleted.
+
+    Tombstones older than EXPORT_TOMBSTONE_RETENTION_DAYS are pruned at the
+    same time. Returns the number of tombstones written.
+    """
+    from .models import DeletedRecord
+
+    table = RECORD_TABLES_BY_TYPE[record_type]
+    now = datetime.now(timezone.utc)
+
+    DeletedRecord.objects.filter(
+        repository=repository,
+        deleted_at__lt=now - timedelta(days=settings.EXPORT_TOMBSTONE_RETENTION_DAYS),
+    ).delete()
+
+    tombstones = [
+        DeletedRecord(
+            repository=repository,
+            record_type=record_type,
+            record_key=record_key(values),
+            deleted_at=now,
+        )
+        for values in queryset.values_list(*table.key_columns).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    ]
+    DeletedRecord.objects.bulk_create(tombstones, batch_size=EXPORT_CHUNK_SIZE)
+    return len(tombstones)
+
+
+def record_querysets(repository, start_date=None, end_date=None) -> dict:
+    """Querysets of each record type covered by an export, keyed by record type."""
+    from .models import CommitData
+
+    commit_groups, pull_requests, issues, _ = export_querysets(repository, start_date, end_date)
+
+    commits = CommitData.objects.filter(repository=repository)
+    if start_date and end_date:
+        period_start, period_end = _day_range(start_date, end_date)
+        commits = commits.filter(commit_date__gte=period_start, commit_date__lt=period_end)
+
+    return {
+        "commit_group": commit_groups,
+        "commit": commits.order_by("commit_date"),
+        "pull_request": pull_requests,
+        "issue": issues,
+    }
+
+
+def table_rows(table: RecordTable, queryset):
+    """Stream a record type's rows as tuples in column order."""
+    lookups = [lookup for _, lookup, _ in table.columns]
+    return queryset.values_list(*lookups).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+
+
+def _jsonl_records(table: RecordTable, queryset, encoder):
+    names = [name for name, _, _ in table.columns]
+    key_positions = [names.index(column) for column in table.key_columns]
+
+    for row in table_rows(table, queryset):
+        record = {
+            "op": "upsert",
+            "type": table.record_type,
+            "key": record_key(row[position] for position in key_positions),
+        }
+        record.update(zip(names, row))
+        yield encoder.encode(record)
+
+
+def jsonl_export_lines(repository, start_date=None, end_date=None, since=None):
+    """
+    Yield one JSON object per record, grouped by record type.
+
+    With `since` (a snapshot time) only rows changed since then are included,
+    preceded by delete records for rows removed since then.
+    """
+    from .models import DeletedRecord
+
+    querysets = record_querysets(repository, start_date, end_date)
+    encoder = DjangoJSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+    if since is not None:
+        tombstones = (
+            DeletedRecord.objects.filter(repository=repository, deleted_at__gte=since)
+            .values_list("record_type", "record_key")
+            .distinct()
+            .order_by("record_type", "record_key")
+        )
+        # Rows deleted and recreated since (rebuilt commit groups) are upserts only
+        existing = {}
+        for record_type, key in tombstones.iterator(chunk_size=EXPORT_CHUNK_SIZE):
+            if record_type not in existing:
+                table = RECORD_TABLES_BY_TYPE[record_type]
+                existing[record_type] = {
+                    record_key(values)
+                    for values in querysets[record_type].model.objects.filter(
+                        repository=repository
+                    ).values_list(*table.key_columns)
+                }
+            if key not in existing[record_type]:
+                yield encoder.encode({"op": "delete", "type": record_type, "key": key})
+
+    for table in RECORD_TABLES:
+        queryset = querysets[table.record_type]
+        if since is not None:
+            queryset = queryset.filter(**{f"{table.changed_field}__gte": since})
+        yield from _jsonl_records(table, queryset, encoder)
+
+
+def _arrow_schema(table: RecordTable):
+    import pyarrow as pa
+
+    types = {
+        "string": pa.string(),
+        "int": pa.int64(),
+        "uuid": pa.string(),
+        "date": pa.date32(),
+        "timestamp": pa.timestamp("us", tz="UTC"),
+        "list": pa.list_(pa.string()),
+        "json": pa.string(),
+    }
+    return pa.schema([(name, types[kind]) for name, _, kind in table.columns])
+
+
+def _arrow_column(values: list, kind: str) -> list:
+    if kind == "uuid":
+        return [str(value) if value is not None else None for value in values]
+    if kind == "json":
+        return [json.dumps(value, ensure_ascii=False) if value is not None else None for value in values]
+    if kind == "list":
+        return [[str(item) for item in value] if value is not None else None for value in values]
+    return values
+
+
+def _record_batch(rows: list, kinds: list, schema):
+    import pyarrow as pa
+
+    columns = zip(*rows)
+    arrays = [
+        pa.array(_arrow_column(list(values), kind), type=field.type)
+        for values, kind, field in zip(columns, kinds, schema)
+    ]
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+def write_parquet_export(directory: str, repository, start_date=None, end_date=None, metadata: dict = None) -> dict:
+    """
+    Write one Parquet file per record type into `directory`, plus a manifest.
+
+    Rows are converted and written one record batch at a time. The directory is
+    removed again if writing fails. Returns the manifest.
+    """
+    import pyarrow.parquet as pq
+
+    querysets = record_querysets(repository, start_date, end_date)
+    os.makedirs(directory, exist_ok=True)
+
+    chunks = []
+    try:
+        for part, table in enumerate(RECORD_TABLES, start=1):
+            schema = _arrow_schema(table)
+            kinds = [kind for _, _, kind in table.columns]
+            file_name = f"{table.name}.parquet"
+            file_path = os.path.join(directory, file_name)
+
+            rows = 0
+            with pq.ParquetWriter(file_path, schema, compression="zstd") as writer:
+                batch = []
+                for row in table_rows(table, querysets[table.record_type]):
+                    batch.append(row)
+                    if len(batch) >= EXPORT_CHUNK_SIZE:
+                        writer.write_batch(_record_batch(batch, kinds, schema))
+                        rows += len(batch)
+                        batch = []
+                if batch:
+                    writer.write_batch(_record_batch(batch, kinds, schema))
+                    rows += len(batch)
+
+            chunks.append(
+                {
+                    "part": part,
+                    "file": file_name,
+                    "table": table.name,
+                    "rows": rows,
+                    "size": os.path.getsize(file_path),
+                }
+            )
+    except BaseException:
+        shutil.rmtree(directory, ignore_errors=True)
+        raise
+
+    manifest = {**(metadata or {}), "format": "parquet", "chunks": chunks}
+    with open(os.path.join(directory, MANIFEST_FILENAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return manifest
@@ -1,4 +1,6 @@
 from rest_framework import serializers
+from django.utils import timezone
+from apps.analysis.scheduling import next_update_at
 from .models import (
     Repository,
     Contributor,
@@ -9,13 +11,30 @@ from .models import (
     OverallSummary,
     Export,
 )
+import importlib.util
 import re
 
 # Maximum repositories per user (limited to 1 for now)
 MAX_REPOSITORIES_PER_USER = 1
 
 
-class ContributorSerializer(serializers.ModelSerializer):
+class DynamicFieldsModelSerializer(serializers.ModelSerializer):
+    """
+    ModelSerializer that accepts a `fields` argument to limit the serialized fields.
+
+    Unknown field names are ignored.
+    """
+
+    def __init__(self, *args, **kwargs):
+        fields = kwargs.pop('fields', None)
+        super().__init__(*args, **kwargs)
+
+        if fields is not None:
+            for field_name in set(self.fields) - set(fields):
+                self.fields.pop(field_name)
+
+
+class ContributorSerializer(DynamicFieldsModelSerializer):
     """Serializer for Contributor model"""
 
     class Meta:
@@ -40,13 +59,14 @@ class ContributorSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CommitDataSerializer(serializers.ModelSerializer):
+class CommitDataSerializer(DynamicFieldsModelSerializer):
     """Serializer for CommitData model"""
 
     contributor_username = serializers.CharField(
         source='contributor.github_username',
         read_only=True
     )
+    files_changed = serializers.SerializerMethodField()
 
     class Meta:
         model = CommitData
@@ -65,11 +85,46 @@ class CommitDataSerializer(serializers.ModelSerializer):
         ]
         read_only_fields = ['id', 'created_at']
 
+    def get_files_changed(self, obj):
+        # Views prefetch `file_changes__path` when files are requested
+        return [
+            {
+                'filename': change.path.path,
+                'additions': change.additions,
+                'deletions': change.deletions,
+                'status': change.status,
+            }
+            for change in obj.file_changes.all()
+        ]
+
 
-class CommitGroupSerializer(serializers.ModelSerializer):
-    """Serializer for CommitGroup model"""
+class CommitGroupSerializer(DynamicFieldsModelSerializer):
+    """
+    Serializer for CommitGroup model
 
-    commits = CommitDataSerializer(many=True, read_only=True)
+    Pass `include_files=False` to drop `files_changed` from the nested commits.
+    """
+
+    commits = serializers.SerializerMethodField()
+
+    def __init__(self, *args, **kwargs):
+        include_files = kwargs.pop('include_files', True)
+        super().__init__(*args, **kwargs)
+
+        self.commit_fields = None
+        if not include_files:
+            self.commit_fields = [
+                name for name in CommitDataSerializer.Meta.fields if name != 'files_changed'
+            ]
+
+    def get_commits(self, obj):
+        # Views prefetch the (optionally capped) commits into `prefetched_commits`
+        commits = getattr(obj, 'prefetched_commits', None)
+        if commits is None:
+            commits = obj.commits.all()
+        return CommitDataSerializer(
+            commits, many=True, fields=self.commit_fields, context=self.context
+        ).data
 
     class Meta:
         model = CommitGroup
@@ -93,7 +148,7 @@ class CommitGroupSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class CommitGroupListSerializer(serializers.ModelSerializer):
+class CommitGroupListSerializer(DynamicFieldsModelSerializer):
     """Lighter serializer for listing commit groups without commits"""
 
     class Meta:
@@ -110,7 +165,7 @@ class CommitGroupListSerializer(serializers.ModelSerializer):
         ]
 
 
-class PullRequestSerializer(serializers.ModelSerializer):
+class PullRequestSerializer(DynamicFieldsModelSerializer):
     """Serializer for PullRequest model"""
 
     class Meta:
@@ -140,7 +195,7 @@ class PullRequestSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class PullRequestListSerializer(serializers.ModelSerializer):
+class PullRequestListSerializer(DynamicFieldsModelSerializer):
     """Lighter serializer for listing PRs"""
 
     class Meta:
@@ -158,7 +213,7 @@ class PullRequestListSerializer(serializers.ModelSerializer):
         ]
 
 
-class IssueSerializer(serializers.ModelSerializer):
+class IssueSerializer(DynamicFieldsModelSerializer):
     """Serializer for Issue model"""
 
     resolution_pr_number = serializers.IntegerField(
@@ -192,7 +247,7 @@ class IssueSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class IssueListSerializer(serializers.ModelSerializer):
+class IssueListSerializer(DynamicFieldsModelSerializer):
     """Lighter serializer for listing issues"""
 
     class Meta:
@@ -240,14 +295,27 @@ class ExportSerializer(serializers.ModelSerializer):
         fields = [
             'id',
             'export_type',
+            'export_format',
             'date_range_start',
             'date_range_end',
             'file_path',
             'file_size',
+            'content_encoding',
+            'chunk_tokens',
+            'chunk_count',
+            'data_version',
+            'snapshot_at',
+            'base_export',
+            'delta_since',
             'download_url',
             'created_at',
+            'last_accessed_at',
+        ]
+        read_only_fields = [
+            'id', 'file_path', 'file_size', 'content_encoding', 'chunk_tokens',
+            'chunk_count', 'data_version', 'snapshot_at', 'base_export', 'delta_since',
+            'created_at', 'last_accessed_at',
         ]
-        read_only_fields = ['id', 'file_path', 'file_size', 'created_at']
 
     def get_download_url(self, obj):
         return f"/api/exports/{obj.id}/download/"
@@ -257,14 +325,40 @@ class CreateExportSerializer(serializers.Serializer):
     """Serializer for creating a new export"""
 
     export_type = serializers.ChoiceField(choices=Export.ExportType.choices)
+    export_format = serializers.ChoiceField(
+        choices=Export.ExportFormat.choices, default=Export.ExportFormat.MARKDOWN
+    )
     date_range_start = serializers.DateField(required=False, allow_null=True)
     date_range_end = serializers.DateField(required=False, allow_null=True)
+    # Split into self-contained files of at most this many tokens (markdown only)
+    chunk_tokens = serializers.IntegerField(
+        required=False, allow_null=True, min_value=1000, max_value=1000000
+    )
+    # Only records changed since this export was generated (JSONL only)
+    since_export_id = serializers.UUIDField(required=False, allow_null=True)
 
     def validate(self, attrs):
         export_type = attrs.get('export_type')
+        export_format = attrs.get('export_format')
         date_range_start = attrs.get('date_range_start')
         date_range_end = attrs.get('date_range_end')
 
+        if attrs.get('chunk_tokens') and export_format != Export.ExportFormat.MARKDOWN:
+            raise serializers.ValidationError({
+                'chunk_tokens': 'Chunking is only available for markdown exports.',
+            })
+
+        if attrs.get('since_export_id') and export_format != Export.ExportFormat.JSONL:
+            raise serializers.ValidationError({
+                'since_export_id': 'Delta exports are only available in the jsonl format.',
+            })
+
+        # Parquet is written with the optional pyarrow package
+        if export_format == Export.ExportFormat.PARQUET and not importlib.util.find_spec('pyarrow'):
+            raise serializers.ValidationError({
+                'export_format': 'Parquet exports are not available on this server.',
+            })
+
         # Weekly/Monthly exports require date range
         if export_type in ['weekly', 'monthly']:
             if not date_range_start or not date_range_end:
@@ -306,6 +400,7 @@ class RepositorySerializer(serializers.ModelSerializer):
             'analysis_status',
             'last_analyzed_at',
             'analysis_error',
+            'data_version',
             'cron_enabled',
             'cron_frequency',
             'stars_count',
@@ -327,6 +422,7 @@ class RepositorySerializer(serializers.ModelSerializer):
             'analysis_status',
             'last_analyzed_at',
             'analysis_error',
+            'data_version',
             'stars_count',
             'forks_count',
             'open_issues_count',
@@ -449,3 +545,17 @@ class RepositoryUpdateSerializer(serializers.ModelSerializer):
             })
 
         return attrs
+
+    def update(self, instance, validated_data):
+        cron_enabled = validated_data.get('cron_enabled', instance.cron_enabled)
+        cron_frequency = validated_data.get('cron_frequency', instance.cron_frequency)
+
+        # (Re)schedule at a random point of the period when the schedule changes
+        if not cron_enabled:
+            validated_data['next_update_at'] = None
+        elif not instance.cron_enabled or cron_frequency != instance.cron_frequency:
+            validated_data['next_update_at'] = next_update_at(
+                cron_frequency, timezone.now(), first=True
+            )
+
+        return super().update(instance, validated_data)
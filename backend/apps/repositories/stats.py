@@ -0,0 +1,43 @@
+"""
+Aggregate counts of a repository's data.
+
+Used by the stats endpoint and the export overview. All counts are scalar
+COUNT(*) subqueries of a single query on the repository row.
+"""
+
+from django.db.models import Func, IntegerField, Subquery, Value
+
+
+def _count(queryset):
+    """Scalar COUNT(*) subquery over a queryset."""
+    return Subquery(
+        queryset.order_by().values(count=Func(Value(1), function="COUNT")),
+        output_field=IntegerField(),
+    )
+
+
+def repository_counts(repository, pull_requests=None, issues=None) -> dict:
+    """
+    Commit, contributor, pull request and issue counts in a single query.
+
+    `pull_requests` and `issues` default to all of the repository's; pass
+    filtered querysets to count a period only.
+    """
+    from .models import CommitData, Contributor, Issue, PullRequest, Repository
+
+    if pull_requests is None:
+        pull_requests = PullRequest.objects.filter(repository=repository)
+    if issues is None:
+        issues = Issue.objects.filter(repository=repository)
+
+    counts = {
+        "total_commits": _count(CommitData.objects.filter(repository=repository)),
+        "total_contributors": _count(Contributor.objects.filter(repository=repository)),
+        "total_prs": _count(pull_requests),
+        "merged_prs": _count(pull_requests.filter(state=PullRequest.PRState.MERGED)),
+        "open_prs": _count(pull_requests.filter(state=PullRequest.PRState.OPEN)),
+        "total_issues": _count(issues),
+        "closed_issues": _count(issues.filter(state=Issue.IssueState.CLOSED)),
+        "open_issues": _count(issues.filter(state=Issue.IssueState.OPEN)),
+    }
+    return Repository.objects.filter(pk=repository.pk).values(**counts).get()
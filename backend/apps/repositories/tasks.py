@@ -3,40 +3,219 @@ Celery tasks for repository data fetching and processing.
 """
 
 import logging
-from datetime import datetime, timezone, timedelta
-from celery import shared_task
+from datetime import datetime, time, timezone, timedelta
+from celery import chain, group, shared_task
 from django.db import transaction
 from django.db.models import Sum, Count
 from github import Github, GithubException
 
+from .cache import mark_repository_data_changed
+from .pipeline import pipeline_stage
+
 logger = logging.getLogger(__name__)
 
+# Incremental fetches re-read this much before the last fetch, for commits
+# pushed with older author dates and items updated while it ran
+INCREMENTAL_FETCH_OVERLAP = timedelta(days=3)
 
-@shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def fetch_repository_data(self, repository_id: str):
+# Celery priorities (0 is highest on the Redis broker; see CELERY_TASK_ROUTES):
+# pipelines a user triggered go ahead of scheduled refreshes in every queue
+INTERACTIVE_PRIORITY = 0
+SCHEDULED_PRIORITY = 6
+
+
+def repository_pipeline(run_id, priority: int = INTERACTIVE_PRIORITY):
     """
-    Fetch all repository data from GitHub.
+    The pipeline as a Celery canvas: metadata, then commits, pull requests
+    and issues in parallel (a chord), then indexing, analysis and summaries.
+    Every stage is sent with `priority`.
+    """
+    run_id = str(run_id)
+
+    def stage(task):
+        return task.si(run_id).set(priority=priority)
+
+    return chain(
+        stage(fetch_repository_data),
+        group(
+            stage(fetch_repository_commits),
+            stage(fetch_repository_pull_requests),
+            stage(fetch_repository_issues),
+        ),
+        stage(index_repository_data),
+        stage(analyze_repository_data),
+        stage(generate_ai_summaries),
+    )
 
-    This task:
-    1. Fetches repository metadata
-    2. Fetches all contributors
-    3. Fetches all commits from selected branch
-    4. Fetches all pull requests with comments
-    5. Fetches all issues with comments
+
+def start_repository_pipeline(
+    repository_id, incremental: bool = False, priority: int = INTERACTIVE_PRIORITY
+):
     """
-    from .models import (
-        Repository,
-        Contributor,
-        CommitData,
-        PullRequest,
-        Issue,
+    Start a pipeline run for a repository unless one is running.
+
+    The lease is taken here, atomically, so concurrent triggers cannot both
+    start a run. Returns (token, started); when `started` is False the
+    request was coalesced into the running pipeline identified by `token`.
+    """
+    from .locks import RepositoryLease
+    from .models import Repository
+    from .pipeline import create_pipeline_run
+
+    lease = RepositoryLease(repository_id)
+    if not lease.acquire():
+        return lease.holder(), False
+
+    try:
+        repository = Repository.objects.get(pk=repository_id)
+    except Repository.DoesNotExist:
+        lease.release()
+        raise
+
+    fetch_since = None
+    if incremental and repository.github_fetched_at:
+        fetch_since = repository.github_fetched_at - INCREMENTAL_FETCH_OVERLAP
+    run = create_pipeline_run(repository, lease.token, incremental=incremental, fetch_since=fetch_since)
+
+    Repository.objects.filter(pk=repository_id).update(
+        analysis_status=Repository.AnalysisStatus.PENDING,
+        analysis_error=None,
+        updated_at=datetime.now(timezone.utc),
     )
+    _enqueue_pipeline(run, lease, priority)
+    return lease.token, True
+
 
+def resume_pipeline_run(run):
+    """
+    Re-run a failed pipeline run from the stage that failed.
+
+    Completed stages are skipped; re-running the analyze and summaries
+    stages keeps the commit groups, and the summaries, of the failed attempt.
+    Returns False if the repository's lease is held by another pipeline.
+    """
+    from .locks import RepositoryLease
+    from .models import PipelineRun, PipelineStage, Repository
+    from .progress import PipelineProgress
+
+    lease = RepositoryLease(run.repository_id, run.token)
+    if not lease.acquire():
+        return False
+
+    run.stages.exclude(status=PipelineStage.Status.COMPLETED).update(
+        status=PipelineStage.Status.PENDING, finished_at=None
+    )
+    completed = run.stages.filter(status=PipelineStage.Status.COMPLETED).values_list("name", flat=True)
+    PipelineProgress(run.repository_id).start(
+        run.pk, run.repository.user_id, {name: PipelineStage.Status.COMPLETED for name in completed}
+    )
+    PipelineRun.objects.filter(pk=run.pk).update(
+        status=PipelineRun.Status.RUNNING, error=None, finished_at=None
+    )
+    Repository.objects.filter(pk=run.repository_id).update(
+        analysis_status=Repository.AnalysisStatus.PENDING,
+        analysis_error=None,
+        updated_at=datetime.now(timezone.utc),
+    )
+    _enqueue_pipeline(run, lease, INTERACTIVE_PRIORITY)
+    return True
+
+
+def _enqueue_pipeline(run, lease, priority: int) -> None:
+    """
+    Send the run's canvas, holding the lease while its first stage is queued.
+
+    If sending fails (e.g. the broker is down), nothing would ever run or
+    close the run: it is failed and its lease released before re-raising.
+    """
+    from .models import PipelineRun, Repository
+    from .pipeline import finish_pipeline_run
+
+    lease.hand_off()
     try:
-        repository = Repository.objects.get(id=repository_id)
+        repository_pipeline(run.id, priority).apply_async()
+    except Exception as e:
+        error = f"Failed to start the pipeline: {e}"
+        finish_pipeline_run(run, PipelineRun.Status.FAILED, error=error)
+        Repository.objects.filter(pk=run.repository_id).update(
+            analysis_status=Repository.AnalysisStatus.FAILED,
+            analysis_error=error,
+            updated_at=datetime.now(timezone.utc),
+        )
+        raise
+
+
+@shared_task(ignore_result=True)
+def run_repository_pipeline(repository_id: str, incremental: bool = False):
+    """Start a pipeline run from the update scheduler (coalesced if one is running)."""
+    from apps.analysis.tasks import update_enqueued_key
+    from django.core.cache import cache
+    from .models import Repository
+
+    # A scheduled update has started; the scheduler may queue the next one
+    cache.delete(update_enqueued_key(repository_id))
+
+    try:
+        _, started = start_repository_pipeline(
+            repository_id, incremental=incremental, priority=SCHEDULED_PRIORITY
+        )
     except Repository.DoesNotExist:
         logger.error(f"Repository {repository_id} not found")
         return
+    if not started:
+        logger.info(f"Pipeline already running for repository {repository_id}; update coalesced")
+
+
+def _github_repo(repository, progress=None):
+    """The repository's GitHub API object; requests it makes are counted in `progress`."""
+    github_token = repository.user.get_github_token()
+    if not github_token:
+        raise ValueError("GitHub token not configured for user")
+
+    client = Github(github_token)
+    if progress is not None:
+        # The requester's response hook sees every API response of this client
+        requester = client.requester
+        on_response = requester.DEBUG_ON_RESPONSE
+
+        def count_request(*args, **kwargs):
+            progress.count("github_requests")
+            return on_response(*args, **kwargs)
+
+        requester.DEBUG_ON_RESPONSE = count_request
+    return client.get_repo(repository.full_name)
+
+
+def _fail_fetch(task, repository, exc):
+    """Retry a fetch stage on GitHub rate limits; otherwise record the failure and re-raise."""
+    from .models import Repository
+
+    if isinstance(exc, GithubException):
+        if exc.status == 403 and "rate limit" in str(exc).lower():
+            raise task.retry(exc=exc)
+        logger.error(f"GitHub API error for {repository.full_name}: {exc}")
+        repository.analysis_error = f"GitHub API error: {str(exc)}"
+    else:
+        logger.error(f"Error fetching data for {repository.full_name}: {exc}")
+        repository.analysis_error = str(exc)
+    repository.analysis_status = Repository.AnalysisStatus.FAILED
+    repository.save(update_fields=["analysis_status", "analysis_error", "updated_at"])
+    raise exc
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+@pipeline_stage("metadata")
+def fetch_repository_data(self, run):
+    """
+    Fetch repository metadata and contributors from GitHub.
+
+    First stage of a pipeline run; commits, pull requests and issues are
+    fetched by the next stages, in parallel. Contributors come first so
+    commits can be linked to them.
+    """
+    from .models import Repository
+
+    repository = run.repository
 
     # Update status to fetching
     repository.analysis_status = Repository.AnalysisStatus.FETCHING
@@ -44,13 +223,7 @@ def fetch_repository_data(self, repository_id: str):
     repository.save()
 
     try:
-        # Get GitHub token from user
-        github_token = repository.user.get_github_token()
-        if not github_token:
-            raise ValueError("GitHub token not configured for user")
-
-        g = Github(github_token)
-        github_repo = g.get_repo(repository.full_name)
+        github_repo = _github_repo(repository, run.progress)
 
         # Update repository metadata
         repository.description = github_repo.description or ""
@@ -60,41 +233,99 @@ def fetch_repository_data(self, repository_id: str):
         repository.open_issues_count = github_repo.open_issues_count
         repository.save()
 
-        branch = repository.branch
-
         # Fetch contributors
         logger.info(f"Fetching contributors for {repository.full_name}")
         _fetch_contributors(repository, github_repo)
 
-        # Fetch commits
-        logger.info(f"Fetching commits for {repository.full_name} on branch {branch}")
-        _fetch_commits(repository, github_repo, branch)
+    except Exception as e:
+        _fail_fetch(self, repository, e)
+
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+@pipeline_stage("commits")
+def fetch_repository_commits(self, run):
+    """Fetch commits of the selected branch (since `run.fetch_since` for incremental runs)."""
+    repository = run.repository
+    try:
+        logger.info(f"Fetching commits for {repository.full_name} on branch {repository.branch}")
+        _fetch_commits(
+            repository,
+            _github_repo(repository, run.progress),
+            repository.branch,
+            since=run.fetch_since,
+            progress=run.progress,
+        )
+    except Exception as e:
+        _fail_fetch(self, repository, e)
+
 
-        # Fetch pull requests
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+@pipeline_stage("pull_requests")
+def fetch_repository_pull_requests(self, run):
+    """Fetch pull requests with comments (since `run.fetch_since` for incremental runs)."""
+    repository = run.repository
+    try:
         logger.info(f"Fetching pull requests for {repository.full_name}")
-        _fetch_pull_requests(repository, github_repo)
+        _fetch_pull_requests(
+            repository, _github_repo(repository, run.progress), since=run.fetch_since, progress=run.progress
+        )
+    except Exception as e:
+        _fail_fetch(self, repository, e)
 
-        # Fetch issues
+
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+@pipeline_stage("issues")
+def fetch_repository_issues(self, run):
+    """Fetch issues with comments (since `run.fetch_since` for incremental runs)."""
+    repository = run.repository
+    try:
         logger.info(f"Fetching issues for {repository.full_name}")
-        _fetch_issues(repository, github_repo)
+        _fetch_issues(
+            repository, _github_repo(repository, run.progress), since=run.fetch_since, progress=run.progress
+        )
+    except Exception as e:
+        _fail_fetch(self, repository, e)
 
-        logger.info(f"Successfully fetched data for {repository.full_name}")
 
-        # Trigger analysis task (will group commits and generate AI summaries)
-        analyze_repository_data.delay(repository_id)
+@shared_task(bind=True, max_retries=3, default_retry_delay=60)
+@pipeline_stage("index")
+def index_repository_data(self, run):
+    """
+    Derive rollups and indexes from the fetched data.
 
-    except GithubException as e:
-        logger.error(f"GitHub API error for {repository.full_name}: {e}")
-        repository.analysis_status = Repository.AnalysisStatus.FAILED
-        repository.analysis_error = f"GitHub API error: {str(e)}"
-        repository.save()
+    Recounts daily activity, links issues to the PRs that close them and
+    reindexes issues for search, then records the fetch as successful:
+    the next incremental run resumes from this run's start.
+    """
+    from .models import Repository
 
-        # Retry on rate limit errors
-        if e.status == 403 and "rate limit" in str(e).lower():
-            raise self.retry(exc=e)
+    repository = run.repository
+    try:
+        # Recount daily activity for the days touched by this fetch, or
+        # backfill every day the first time a repository is rolled up
+        from apps.analysis.timeline import update_daily_activity
+
+        has_activity = repository.daily_activity.exists()
+        update_daily_activity(repository, since=run.started_at if has_activity else None)
+
+        # Link issues to the PRs that close them, before indexing picks up the PR text
+        from apps.analysis.linking import link_issues_to_pull_requests
+
+        link_issues_to_pull_requests(repository)
+
+        # Reindex issues upserted by this fetch for search and similarity
+        from apps.analysis.issue_search import update_issue_search_index
+
+        update_issue_search_index(repository)
+
+        repository.github_fetched_at = run.started_at
+        repository.save(update_fields=["github_fetched_at"])
+
+        logger.info(f"Successfully fetched data for {repository.full_name}")
+        mark_repository_data_changed(repository)
 
     except Exception as e:
-        logger.error(f"Error fetching data for {repository.full_name}: {e}")
+        logger.error(f"Error indexing data for {repository.full_name}: {e}")
         repository.analysis_status = Repository.AnalysisStatus.FAILED
         repository.analysis_error = str(e)
         repository.save()
@@ -136,17 +367,24 @@ def _fetch_contributors(repository, github_repo):
             )
 
 
-def _fetch_commits(repository, github_repo, branch: str, limit: int = 500):
-    """Fetch and store commits for a repository."""
+def _fetch_commits(repository, github_repo, branch: str, limit: int = 500, since=None, progress=None):
+    """Fetch and store commits for a repository (authored after `since`, if given)."""
     from .models import CommitData, Contributor
 
     commits_data = []
 
     try:
-        commits = github_repo.get_commits(sha=branch)
+        if since:
+            commits = github_repo.get_commits(sha=branch, since=since)
+        else:
+            commits = github_repo.get_commits(sha=branch)
+        if progress:
+            progress.set_total("commits", min(commits.totalCount, limit))
         for i, commit in enumerate(commits):
             if i >= limit:
                 break
+            if progress:
+                progress.advance("commits")
 
             # Get commit details
             commit_data = {
@@ -160,21 +398,19 @@ def _fetch_commits(repository, github_repo, branch: str, limit: int = 500):
                 "author_login": commit.author.login if commit.author else None,
             }
 
-            # Get files changed (limit to avoid huge payloads)
+            # Get files changed (stored normalized, so no per-commit cap is needed)
             try:
-                files_changed = []
-                for f in commit.files[:20]:  # Limit to 20 files per commit
-                    files_changed.append(
-                        {
-                            "filename": f.filename,
-                            "additions": f.additions,
-                            "deletions": f.deletions,
-                            "status": f.status,
-                        }
-                    )
-                commit_data["files_changed"] = files_changed
+                commit_data["files"] = [
+                    {
+                        "filename": f.filename,
+                        "additions": f.additions,
+                        "deletions": f.deletions,
+                        "status": f.status,
+                    }
+                    for f in commit.files
+                ]
             except Exception:
-                commit_data["files_changed"] = []
+                commit_data["files"] = []
 
             commits_data.append(commit_data)
 
@@ -183,6 +419,7 @@ def _fetch_commits(repository, github_repo, branch: str, limit: int = 500):
         return
 
     with transaction.atomic():
+        files_by_commit = {}
         for data in commits_data:
             # Try to link to contributor
             contributor = None
@@ -191,7 +428,7 @@ def _fetch_commits(repository, github_repo, branch: str, limit: int = 500):
                     repository=repository, github_username=data["author_login"]
                 ).first()
 
-            CommitData.objects.update_or_create(
+            commit, _ = CommitData.objects.update_or_create(
                 repository=repository,
                 commit_sha=data["commit_sha"],
                 defaults={
@@ -201,14 +438,64 @@ def _fetch_commits(repository, github_repo, branch: str, limit: int = 500):
                     "author_email": data["author_email"],
                     "additions": data["additions"],
                     "deletions": data["deletions"],
-                    "files_changed": data["files_changed"],
                     "contributor": contributor,
                 },
             )
+            files_by_commit[commit.id] = data["files"]
+
+        _store_file_changes(repository, files_by_commit)
+
+
+def _store_file_changes(repository, files_by_commit: dict, batch_size: int = 1000):
+    """
+    Replace the per-file changes of the given commits.
+
+    Paths are interned in bulk into FilePath, so each change row only stores a path id.
+    `files_by_commit` maps CommitData ids to lists of file dicts from the GitHub API.
+    """
+    from .models import CommitFileChange, FilePath
+
+    if not files_by_commit:
+        return
+
+    paths = {f["filename"] for files in files_by_commit.values() for f in files}
+    FilePath.objects.bulk_create(
+        [FilePath(repository=repository, path=path) for path in paths],
+        ignore_conflicts=True,
+        batch_size=batch_size,
+    )
+    path_ids = dict(
+        FilePath.objects.filter(repository=repository, path__in=paths).values_list("path", "id")
+    )
+
+    valid_statuses = set(CommitFileChange.ChangeStatus.values)
+    changes = []
+    for commit_id, files in files_by_commit.items():
+        seen = set()
+        for f in files:
+            if f["filename"] in seen:
+                continue
+            seen.add(f["filename"])
+            changes.append(
+                CommitFileChange(
+                    commit_id=commit_id,
+                    path_id=path_ids[f["filename"]],
+                    additions=f["additions"],
+                    deletions=f["deletions"],
+                    status=(
+                        f["status"]
+                        if f["status"] in valid_statuses
+                        else CommitFileChange.ChangeStatus.CHANGED
+                    ),
+                )
+            )
+
+    CommitFileChange.objects.filter(commit_id__in=files_by_commit.keys()).delete()
+    CommitFileChange.objects.bulk_create(changes, batch_size=batch_size)
 
 
-def _fetch_pull_requests(repository, github_repo, limit: int = 100):
-    """Fetch and store pull requests for a repository."""
+def _fetch_pull_requests(repository, github_repo, limit: int = 100, since=None, progress=None):
+    """Fetch and store pull requests for a repository (updated after `since`, if given)."""
     from .models import PullRequest
 
     prs_data = []
@@ -216,10 +503,18 @@ def _fetch_pull_requests(repository, github_repo, limit: int = 100):
     try:
         # Fetch all PRs (open, closed, merged)
         pulls = github_repo.get_pulls(state="all", sort="updated", direction="desc")
+        # With `since` the number of recently updated PRs is not known upfront
+        if progress and not since:
+            progress.set_total("pull_requests", min(pulls.totalCount, limit))
 
         for i, pr in enumerate(pulls):
             if i >= limit:
                 break
+            # Sorted by last update, so everything after this is older still
+            if since and pr.updated_at < since:
+                break
+            if progress:
+                progress.advance("pull_requests")
 
             # Determine state
             if pr.merged:
@@ -278,6 +573,14 @@ def _fetch_pull_requests(repository, github_repo, limit: int = 100):
         logger.warning(f"Could not fetch pull requests: {e}")
         return
 
+    # Merge dates before the upsert, to recount the days PRs move away from
+    previous = {
+        number: (merged_at,)
+        for number, merged_at in PullRequest.objects.filter(
+            repository=repository, pr_number__in=[data["pr_number"] for data in prs_data]
+        ).values_list("pr_number", "merged_at")
+    }
+
     with transaction.atomic():
         for data in prs_data:
             PullRequest.objects.update_or_create(
@@ -302,20 +605,32 @@ def _fetch_pull_requests(repository, github_repo, limit: int = 100):
                 },
             )
 
+        from apps.analysis.timeline import recount_moved_activity
+
+        recount_moved_activity(repository, "pull_request", previous)
+
 
-def _fetch_issues(repository, github_repo, limit: int = 100):
-    """Fetch and store issues for a repository."""
+def _fetch_issues(repository, github_repo, limit: int = 100, since=None, progress=None):
+    """Fetch and store issues for a repository (updated after `since`, if given)."""
     from .models import Issue
 
     issues_data = []
 
     try:
         # Fetch all issues (excluding PRs)
-        issues = github_repo.get_issues(state="all", sort="updated", direction="desc")
+        if since:
+            issues = github_repo.get_issues(state="all", sort="updated", direction="desc", since=since)
+        else:
+            issues = github_repo.get_issues(state="all", sort="updated", direction="desc")
+        # Counts the pull requests listed among issues too, like the loop below
+        if progress:
+            progress.set_total("issues", min(issues.totalCount, limit))
 
         for i, issue in enumerate(issues):
             if i >= limit:
                 break
+            if progress:
+                progress.advance("issues")
 
             # Skip pull requests (they appear as issues in GitHub API)
             if issue.pull_request is not None:
@@ -364,6 +679,14 @@ def _fetch_issues(repository, github_repo, limit: int = 100):
         logger.warning(f"Could not fetch issues: {e}")
         return
 
+    # Close dates and states before the upsert, to recount the days issues move away from
+    previous = {
+        number: (closed_at, state)
+        for number, closed_at, state in Issue.objects.filter(
+            repository=repository, issue_number__in=[data["issue_number"] for data in issues_data]
+        ).values_list("issue_number", "closed_at", "state")
+    }
+
     with transaction.atomic():
         for data in issues_data:
             Issue.objects.update_or_create(
@@ -383,31 +706,39 @@ def _fetch_issues(repository, github_repo, limit: int = 100):
                 },
             )
 
+        from apps.analysis.timeline import recount_moved_activity
+
+        recount_moved_activity(repository, "issue", previous)
+
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=60)
-def analyze_repository_data(self, repository_id: str, group_type: str = "weekly"):
+@pipeline_stage("analyze")
+def analyze_repository_data(self, run, group_type: str = "weekly"):
     """
     Analyze repository data by grouping commits into time periods.
 
     This task:
     1. Groups commits by week or month
-    2. Creates CommitGroup records
+    2. Creates or updates CommitGroup records, keyed by (group_type, start_date)
     3. Links CommitData to CommitGroups
-    4. Triggers AI summary generation
+
+    Only groups and commits whose grouping changed are written, and only
+    groups left without commits are deleted, so re-running the stage leaves
+    the data (and delta exports) unchanged. Unchanged groups keep their
+    summaries; changed ones are marked for the summaries stage to redo. Without commits the run ends
+    here, skipping AI summary generation.
     """
     from .models import (
         Repository,
         CommitData,
         CommitGroup,
+        PipelineRun,
         PullRequest,
         Issue,
     )
+    from .pipeline import finish_pipeline_run
 
-    try:
-        repository = Repository.objects.get(id=repository_id)
-    except Repository.DoesNotExist:
-        logger.error(f"Repository {repository_id} not found")
-        return
+    repository = run.repository
 
     # Update status to analyzing
     repository.analysis_status = Repository.AnalysisStatus.ANALYZING
@@ -423,6 +754,8 @@ def analyze_repository_data(self, repository_id: str, group_type: str = "weekly"
             logger.warning(f"No commits found for {repository.full_name}")
             repository.analysis_status = Repository.AnalysisStatus.COMPLETED
             repository.save()
+            mark_repository_data_changed(repository)
+            finish_pipeline_run(run, PipelineRun.Status.COMPLETED)
             return
 
         # Determine date range
@@ -431,6 +764,7 @@ def analyze_repository_data(self, repository_id: str, group_type: str = "weekly"
 
         if not earliest_commit or not latest_commit:
             logger.warning(f"Could not determine date range for {repository.full_name}")
+            finish_pipeline_run(run, PipelineRun.Status.COMPLETED)
             return
 
         start_date = earliest_commit.commit_date.date()
@@ -442,41 +776,80 @@ def analyze_repository_data(self, repository_id: str, group_type: str = "weekly"
         else:
             groups = _create_monthly_groups(start_date, end_date)
 
-        # Delete existing commit groups for this repository to rebuild
-        CommitGroup.objects.filter(repository=repository).delete()
+        # Groups are upserted by (group_type, start_date): unchanged groups and
+        # their commits are left alone, so a re-run changes nothing and delta
+        # exports only pick up what actually moved
+        from .record_exports import record_deletions
+
+        existing_groups = {
+            (commit_group.group_type, commit_group.start_date): commit_group
+            for commit_group in CommitGroup.objects.filter(repository=repository)
+        }
+        kept_group_ids = set()
+        now = datetime.now(timezone.utc)
 
-        # Create CommitGroup records and link commits
         with transaction.atomic():
+            run.progress.set_total("analyze", len(groups))
             for group_start, group_end in groups:
+                run.progress.advance("analyze")
                 # Get commits in this period
+                period_start, period_end = _day_range(group_start, group_end)
                 group_commits = commits.filter(
-                    commit_date__date__gte=group_start, commit_date__date__lte=group_end
+                    commit_date__gte=period_start, commit_date__lt=period_end
                 )
 
-                if not group_commits.exists():
+                commit_count = group_commits.count()
+                if not commit_count:
                     continue
 
-                # Create the commit group
-                commit_group = CommitGroup.objects.create(
-                    repository=repository,
-                    group_type=group_type,
-                    start_date=group_start,
-                    end_date=group_end,
-                    commit_count=group_commits.count(),
+                commit_group = existing_groups.get((group_type, group_start))
+                if commit_group is None:
+                    commit_group = CommitGroup.objects.create(
+                        repository=repository,
+                        group_type=group_type,
+                        start_date=group_start,
+                        end_date=group_end,
+                        commit_count=commit_count,
+                    )
+                    logger.info(
+                        f"Created commit group {group_start} - {group_end} "
+                        f"with {commit_count} commits"
+                    )
+                elif (commit_group.end_date, commit_group.commit_count) != (group_end, commit_count):
+                    # Its commits changed: summarized again by the summaries stage
+                    commit_group.end_date = group_end
+                    commit_group.commit_count = commit_count
+                    commit_group.analyzed_at = None
+                    commit_group.save(
+                        update_fields=["end_date", "commit_count", "analyzed_at", "updated_at"]
+                    )
+                kept_group_ids.add(commit_group.pk)
+
+                # Link the commits not in this group yet. updated_at is set
+                # explicitly so delta exports pick up the regrouped commits
+                group_commits.exclude(commit_group=commit_group).update(
+                    commit_group=commit_group, updated_at=now
                 )
 
-                # Link commits to this group
-                group_commits.update(commit_group=commit_group)
+            # Remove the groups left without commits (e.g. after switching
+            # group_type), leaving tombstones for delta exports
+            stale_groups = CommitGroup.objects.filter(repository=repository).exclude(
+                pk__in=kept_group_ids
+            )
+            record_deletions(repository, "commit_group", stale_groups)
+            # Unlink first: the group FK cascades, and commits must survive
+            CommitData.objects.filter(commit_group__in=stale_groups).update(
+                commit_group=None, updated_at=now
+            )
+            stale_groups.delete()
 
-                logger.info(
-                    f"Created commit group {group_start} - {group_end} "
-                    f"with {commit_group.commit_count} commits"
-                )
+        # Roll up per-file churn for the weeks that received new commits
+        from apps.analysis.hotspots import update_hotspot_rollups
 
-        logger.info(f"Analysis complete for {repository.full_name}")
+        update_hotspot_rollups(repository)
 
-        # Trigger AI summary generation
-        generate_ai_summaries.delay(repository_id)
+        mark_repository_data_changed(repository)
+        logger.info(f"Analysis complete for {repository.full_name}")
 
     except Exception as e:
         logger.error(f"Error analyzing data for {repository.full_name}: {e}")
@@ -486,6 +859,18 @@ def analyze_repository_data(self, repository_id: str, group_type: str = "weekly"
         raise
 
 
+def _day_range(start_date, end_date):
+    """
+    Return the half-open UTC datetime range covering start_date..end_date inclusive.
+
+    Filtering with `__gte`/`__lt` on this range can use plain B-tree indexes,
+    unlike `__date` lookups which cast every row.
+    """
+    range_start = datetime.combine(start_date, time.min, tzinfo=timezone.utc)
+    range_end = datetime.combine(end_date + timedelta(days=1), time.min, tzinfo=timezone.utc)
+    return range_start, range_end
+
+
 def _create_weekly_groups(start_date, end_date):
     """Create weekly date ranges from start to end."""
     groups = []
@@ -526,15 +911,23 @@ def _create_monthly_groups(start_date, end_date):
 
 
 @shared_task(bind=True, max_retries=3, default_retry_delay=120)
-def generate_ai_summaries(self, repository_id: str):
+@pipeline_stage("summaries")
+def generate_ai_summaries(self, run):
     """
     Generate AI summaries for commit groups and overall repository.
 
     This task:
     1. Generates summaries for each CommitGroup using Claude Haiku
-    2. Calculates contributor impact scores
-    3. Generates overall repository summary using Claude Sonnet
-    4. Creates OverallSummary record
+    2. Summarizes closed issues and their resolution PRs in batches
+    3. Calculates contributor impact scores
+    4. Generates overall repository summary using Claude Sonnet
+    5. Creates OverallSummary record
+
+    Only new and changed commit groups are summarized: groups summarized by
+    an earlier run or attempt (`analyzed_at` set, cleared by the analyze stage
+    when their commits change) and unchanged issues are skipped. The overall
+    summary is only regenerated when a group summary changed. On failure the
+    task is retried.
     """
     from .models import (
         Repository,
@@ -546,16 +939,12 @@ def generate_ai_summaries(self, repository_id: str):
         OverallSummary,
     )
 
-    try:
-        repository = Repository.objects.get(id=repository_id)
-    except Repository.DoesNotExist:
-        logger.error(f"Repository {repository_id} not found")
-        return
+    repository = run.repository
 
     try:
         from apps.ai.client import AIClient
 
-        ai_client = AIClient()
+        ai_client = AIClient(on_usage=run.progress.record_llm_call)
     except Exception as e:
         logger.error(f"Failed to initialize AI client: {e}")
         # Continue without AI - we'll still calculate impact scores
@@ -567,24 +956,40 @@ def generate_ai_summaries(self, repository_id: str):
             "start_date"
         )
 
-        # Generate summary for each commit group
+        # Generate summary for each new or changed commit group
         group_summaries = []
+        groups_summarized = 0
+        run.progress.set_total("summaries", len(commit_groups))
         for commit_group in commit_groups:
+            run.progress.advance("summaries")
+            # Summarized by an earlier run, and unchanged since
+            if ai_client and commit_group.analyzed_at:
+                group_summaries.append(
+                    {
+                        "period": f"{commit_group.start_date} to {commit_group.end_date}",
+                        "summary": commit_group.summary,
+                    }
+                )
+                continue
+
             # Get commits in this group
             commits = CommitData.objects.filter(commit_group=commit_group)
+            period_start, period_end = _day_range(
+                commit_group.start_date, commit_group.end_date
+            )
 
             # Get PRs in this period
             prs = PullRequest.objects.filter(
                 repository=repository,
-                created_at_github__date__gte=commit_group.start_date,
-                created_at_github__date__lte=commit_group.end_date,
+                created_at_github__gte=period_start,
+                created_at_github__lt=period_end,
             )
 
             # Get issues in this period
             issues = Issue.objects.filter(
                 repository=repository,
-                created_at_github__date__gte=commit_group.start_date,
-                created_at_github__date__lte=commit_group.end_date,
+                created_at_github__gte=period_start,
+                created_at_github__lt=period_end,
             )
 
             # Prepare data for AI
@@ -641,6 +1046,7 @@ def generate_ai_summaries(self, repository_id: str):
                 )
                 commit_group.analyzed_at = datetime.now(timezone.utc)
                 commit_group.save()
+                groups_summarized += 1
 
                 group_summaries.append(
                     {
@@ -651,22 +1057,36 @@ def generate_ai_summaries(self, repository_id: str):
 
             logger.info(f"Generated summary for commit group {commit_group.start_date}")
 
+        # Extract problem/solution descriptions for closed issues in batched calls
+        if ai_client:
+            from apps.analysis.issue_search import update_issue_search_index
+            from apps.analysis.issue_summaries import summarize_closed_issues
+
+            summarize_closed_issues(repository, ai_client)
+            update_issue_search_index(repository)
+
         # Calculate contributor impact scores
         _calculate_contributor_scores(repository, ai_client)
 
-        # Generate overall summary
-        if ai_client and commit_groups.exists():
+        # Generate overall summary, unless no group summary changed since the last one
+        if ai_client and commit_groups.exists() and (
+            groups_summarized
+            or not OverallSummary.objects.filter(repository=repository).exists()
+        ):
             _generate_overall_summary(repository, ai_client, group_summaries)
 
         # Update repository status
         repository.analysis_status = Repository.AnalysisStatus.COMPLETED
         repository.last_analyzed_at = datetime.now(timezone.utc)
         repository.save()
+        mark_repository_data_changed(repository)
 
         logger.info(f"AI summaries complete for {repository.full_name}")
 
     except Exception as e:
         logger.error(f"Error generating AI summaries for {repository.full_name}: {e}")
+        if self.request.retries < self.max_retries:
+            raise self.retry(exc=e)
         repository.analysis_status = Repository.AnalysisStatus.FAILED
         repository.analysis_error = f"AI summary error: {str(e)}"
         repository.save()
@@ -808,35 +1228,53 @@ def generate_markdown_export(
     export_type: str,
     date_range_start: str = None,
     date_range_end: str = None,
+    chunk_tokens: int = None,
+    cache_key: str = "",
+    export_format: str = "markdown",
+    since_export_id: str = None,
 ):
     """
-    Generate a markdown export for a repository.
+    Generate an export for a repository (markdown, JSONL or Parquet).
 
     This task:
     1. Fetches data based on export_type and date range
-    2. Generates structured markdown with sections
-    3. Saves markdown to file system
-    4. Creates Export record in DB
+    2. Streams it to the file system as it is read:
+       - markdown: structured markdown, section by section, gzip-compressed
+         unless EXPORT_COMPRESSION is empty (or into token-bounded chunk files
+         plus a manifest if chunk_tokens is set)
+       - jsonl: one JSON record per group/commit/PR/issue, compressed likewise;
+         with since_export_id, only upserts/deletes since that export's snapshot
+       - parquet: one file per record type plus a manifest
+    3. Creates Export record in DB, tagged with the request's cache key
+    4. Evicts least recently used exports beyond the storage quota
     """
     import os
     from django.conf import settings
-    from .models import (
-        Repository,
-        CommitGroup,
-        CommitData,
-        Contributor,
-        PullRequest,
-        Issue,
-        OverallSummary,
-        Export,
+    from django.core.cache import cache
+    from .exports import (
+        MANIFEST_FILENAME,
+        evict_exports,
+        markdown_export_lines,
+        markdown_export_units,
+        write_chunked_export,
+        pending_export_key,
+        write_export,
     )
+    from .models import Repository, Export
+    from .record_exports import jsonl_export_lines, write_parquet_export
 
     try:
         repository = Repository.objects.get(id=repository_id)
     except Repository.DoesNotExist:
         logger.error(f"Repository {repository_id} not found")
+        if cache_key:
+            cache.delete(pending_export_key(cache_key))
         return
 
+    # Read before generating, so the export never claims a newer version than its data
+    data_version = repository.data_version
+    snapshot_at = datetime.now(timezone.utc)
+
     try:
         # Parse date range if provided
         start_date = None
@@ -846,264 +1284,125 @@ def generate_markdown_export(
             start_date = dt.strptime(date_range_start, "%Y-%m-%d").date()
             end_date = dt.strptime(date_range_end, "%Y-%m-%d").date()
 
-        # Build the markdown content
-        markdown_content = _generate_markdown_content(
-            repository=repository,
-            export_type=export_type,
-            start_date=start_date,
-            end_date=end_date,
-        )
-
         # Create exports directory if it doesn't exist
         exports_dir = os.path.join(settings.BASE_DIR, "exports")
         os.makedirs(exports_dir, exist_ok=True)
 
-        # Generate filename
-        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S")
+        # Generate filename (extension added per format)
+        # Microseconds keep exports generated within the same second from sharing a file
+        timestamp = datetime.now(timezone.utc).strftime("%Y%m%d_%H%M%S_%f")
         safe_repo_name = repository.full_name.replace("/", "_")
 
         if export_type == "complete":
-            filename = f"{safe_repo_name}_complete_{timestamp}.md"
+            base_name = f"{safe_repo_name}_complete"
         else:
-            filename = f"{safe_repo_name}_{export_type}_{date_range_start}_{date_range_end}_{timestamp}.md"
-
-        file_path = os.path.join(exports_dir, filename)
-
-        # Write markdown to file
-        with open(file_path, "w", encoding="utf-8") as f:
-            f.write(markdown_content)
+            base_name = f"{safe_repo_name}_{export_type}_{date_range_start}_{date_range_end}"
+
+        base_export = None
+        delta_since = None
+        if since_export_id:
+            base_export = Export.objects.get(id=since_export_id, repository=repository)
+            # Exports from before snapshots were recorded fall back to their creation time
+            delta_since = base_export.snapshot_at or base_export.created_at
+            base_name = f"{base_name}_delta"
+        base_name = f"{base_name}_{timestamp}"
+
+        # Multi-file exports and their manifest go in a directory named after the export
+        base_path = os.path.join(exports_dir, base_name)
+        chunk_count = 0
+        content_encoding = settings.EXPORT_COMPRESSION
+        compress = content_encoding == "gzip"
+        metadata = {
+            "repository": repository.full_name,
+            "export_type": export_type,
+            "date_range_start": date_range_start,
+            "date_range_end": date_range_end,
+            "generated_at": datetime.now(timezone.utc).isoformat(),
+        }
 
-        file_size = os.path.getsize(file_path)
+        if export_format == Export.ExportFormat.PARQUET:
+            # Parquet files carry their own (zstd) compression
+            compress = False
+            manifest = write_parquet_export(
+                base_path, repository, start_date, end_date, metadata=metadata
+            )
+            file_path = os.path.join(base_path, MANIFEST_FILENAME)
+            chunk_count = len(manifest["chunks"])
+            file_size = os.path.getsize(file_path) + sum(
+                chunk["size"] for chunk in manifest["chunks"]
+            )
+        elif export_format == Export.ExportFormat.JSONL:
+            file_path = f"{base_path}.jsonl.gz" if compress else f"{base_path}.jsonl"
+            file_size = write_export(
+                file_path,
+                jsonl_export_lines(repository, start_date, end_date, since=delta_since),
+                compress=compress,
+            )
+        elif chunk_tokens:
+            manifest = write_chunked_export(
+                base_path,
+                markdown_export_units(
+                    repository=repository,
+                    export_type=export_type,
+                    start_date=start_date,
+                    end_date=end_date,
+                ),
+                max_tokens=chunk_tokens,
+                metadata=metadata,
+                compress=compress,
+            )
+            file_path = os.path.join(base_path, MANIFEST_FILENAME)
+            chunk_count = len(manifest["chunks"])
+            file_size = os.path.getsize(file_path) + sum(
+                chunk["size"] for chunk in manifest["chunks"]
+            )
+        else:
+            # Stream the markdown to file section by section
+            file_path = f"{base_path}.md.gz" if compress else f"{base_path}.md"
+            file_size = write_export(
+                file_path,
+                markdown_export_lines(
+                    repository=repository,
+                    export_type=export_type,
+                    start_date=start_date,
+                    end_date=end_date,
+                ),
+                compress=compress,
+            )
 
         # Create Export record
         export = Export.objects.create(
             repository=repository,
             export_type=export_type,
+            export_format=export_format,
             date_range_start=start_date,
             date_range_end=end_date,
             file_path=file_path,
             file_size=file_size,
+            content_encoding=content_encoding if compress else "",
+            chunk_tokens=chunk_tokens,
+            chunk_count=chunk_count,
+            cache_key=cache_key,
+            data_version=data_version,
+            last_accessed_at=datetime.now(timezone.utc),
+            snapshot_at=snapshot_at,
+            base_export=base_export,
+            delta_since=delta_since,
         )
 
         logger.info(
-            f"Generated {export_type} export for {repository.full_name}: {file_path}"
+            f"Generated {export_type} {export_format} export for {repository.full_name}: {file_path}"
         )
 
+        evict_exports(settings.EXPORT_STORAGE_QUOTA_BYTES, keep=export)
+
         return str(export.id)
 
     except Exception as e:
         logger.error(f"Error generating export for {repository.full_name}: {e}")
         raise
 
-
-def _generate_markdown_content(
-    repository,
-    export_type: str,
-    start_date=None,
-    end_date=None,
-) -> str:
-    """Generate markdown content for export."""
-    from .models import (
-        CommitGroup,
-        CommitData,
-        Contributor,
-        PullRequest,
-        Issue,
-        OverallSummary,
-    )
-
-    lines = []
-
-    # Header
-    lines.append("# CommitSaga Analysis Export\n")
-    lines.append(f"## Repository: {repository.full_name}\n")
-    lines.append(f"**Branch:** {repository.branch}")
-    lines.append(f"**Export Type:** {export_type.capitalize()}")
-
-    if start_date and end_date:
-        lines.append(f"**Period:** {start_date} to {end_date}")
-
-    lines.append(f"**Generated:** {datetime.now(timezone.utc).strftime('%Y-%m-%d %H:%M:%S UTC')}\n")
-    lines.append("---\n")
-
-    # Filter data based on date range
-    if start_date and end_date:
-        commit_groups = CommitGroup.objects.filter(
-            repository=repository,
-            start_date__gte=start_date,
-            end_date__lte=end_date,
-        ).order_by("start_date")
-
-        pull_requests = PullRequest.objects.filter(
-            repository=repository,
-            created_at_github__date__gte=start_date,
-            created_at_github__date__lte=end_date,
-        ).order_by("-created_at_github")
-
-        issues = Issue.objects.filter(
-            repository=repository,
-            created_at_github__date__gte=start_date,
-            created_at_github__date__lte=end_date,
-        ).order_by("-created_at_github")
-    else:
-        commit_groups = CommitGroup.objects.filter(
-            repository=repository
-        ).order_by("start_date")
-
-        pull_requests = PullRequest.objects.filter(
-            repository=repository
-        ).order_by("-created_at_github")
-
-        issues = Issue.objects.filter(
-            repository=repository
-        ).order_by("-created_at_github")
-
-    contributors = Contributor.objects.filter(
-        repository=repository
-    ).order_by("-impact_score")
-
-    # Repository Overview
-    lines.append("## Repository Overview\n")
-    lines.append(f"- **Total Commits:** {repository.commits.count()}")
-    lines.append(f"- **Contributors:** {contributors.count()}")
-    lines.append(f"- **Pull Requests:** {pull_requests.count()} ({pull_requests.filter(state='merged').count()} merged, {pull_requests.filter(state='open').count()} open)")
-    lines.append(f"- **Issues:** {issues.count()} ({issues.filter(state='closed').count()} closed, {issues.filter(state='open').count()} open)\n")
-
-    # Overall Summary (for complete exports)
-    if export_type == "complete":
-        overall_summary = OverallSummary.objects.filter(repository=repository).first()
-        if overall_summary:
-            lines.append("## Summary\n")
-            lines.append(overall_summary.summary_text)
-            lines.append("\n---\n")
-
-    # Commit Groups
-    if commit_groups.exists():
-        lines.append("## Development Timeline\n")
-
-        for group in commit_groups:
-            group_type_label = "Week" if group.group_type == "weekly" else "Month"
-            lines.append(f"### {group_type_label} of {group.start_date} to {group.end_date}\n")
-
-            if group.summary:
-                lines.append("#### Summary\n")
-                lines.append(group.summary)
-                lines.append("")
-
-            # Key Changes
-            if group.key_changes:
-                lines.append("#### Key Changes\n")
-                for change in group.key_changes:
-                    lines.append(f"- {change}")
-                lines.append("")
-
-            # Notable Features
-            if group.notable_features:
-                lines.append("#### Notable Features\n")
-                for feature in group.notable_features:
-                    lines.append(f"- {feature}")
-                lines.append("")
-
-            # Bug Fixes
-            if group.bug_fixes:
-                lines.append("#### Bug Fixes\n")
-                for fix in group.bug_fixes:
-                    lines.append(f"- {fix}")
-                lines.append("")
-
-            # Key Commits
-            commits = CommitData.objects.filter(commit_group=group).order_by("-commit_date")[:10]
-            if commits:
-                lines.append("#### Key Commits\n")
-                for commit in commits:
-                    msg = commit.commit_message.split("\n")[0][:80]
-                    lines.append(f"- `{commit.commit_sha[:7]}` - {msg} (by @{commit.author_name})")
-                lines.append("")
-
-            lines.append("---\n")
-
-    # Pull Requests
-    if pull_requests.exists():
-        lines.append("## Pull Requests\n")
-
-        for pr in pull_requests[:50]:  # Limit to 50 PRs
-            state_emoji = "🟢" if pr.state == "open" else "🟣" if pr.state == "merged" else "🔴"
-            lines.append(f"### {state_emoji} PR #{pr.pr_number}: {pr.title}\n")
-            lines.append(f"**Author:** @{pr.author}")
-            lines.append(f"**Status:** {pr.state.capitalize()}")
-            lines.append(f"**Created:** {pr.created_at_github.strftime('%Y-%m-%d')}")
-
-            if pr.merged_at:
-                lines.append(f"**Merged:** {pr.merged_at.strftime('%Y-%m-%d')}")
-
-            lines.append(f"**Changes:** +{pr.additions} / -{pr.deletions} ({pr.changed_files} files)\n")
-
-            if pr.description:
-                lines.append("**Description:**")
-                lines.append(pr.description[:500] + ("..." if len(pr.description) > 500 else ""))
-                lines.append("")
-
-            # Discussion highlights
-            if pr.discussion:
-                lines.append("**Discussion Highlights:**\n")
-                for comment in pr.discussion[:5]:  # Limit to 5 comments
-                    lines.append(f"- **@{comment.get('author', 'unknown')}:** {comment.get('body', '')[:200]}")
-                lines.append("")
-
-            lines.append("---\n")
-
-    # Issues
-    if issues.exists():
-        lines.append("## Issues\n")
-
-        for issue in issues[:50]:  # Limit to 50 issues
-            state_emoji = "🟢" if issue.state == "open" else "✅"
-            lines.append(f"### {state_emoji} Issue #{issue.issue_number}: {issue.title}\n")
-            lines.append(f"**Author:** @{issue.author}")
-            lines.append(f"**Status:** {issue.state.capitalize()}")
-            lines.append(f"**Created:** {issue.created_at_github.strftime('%Y-%m-%d')}")
-
-            if issue.closed_at:
-                lines.append(f"**Closed:** {issue.closed_at.strftime('%Y-%m-%d')}")
-
-            if issue.labels:
-                lines.append(f"**Labels:** {', '.join(issue.labels)}")
-
-            lines.append("")
-
-            if issue.problem_description:
-                lines.append("**Problem:**")
-                lines.append(issue.problem_description)
-                lines.append("")
-
-            if issue.solution_description:
-                lines.append("**Solution:**")
-                lines.append(issue.solution_description)
-                lines.append("")
-
-            if issue.description and not issue.problem_description:
-                lines.append("**Description:**")
-                lines.append(issue.description[:500] + ("..." if len(issue.description) > 500 else ""))
-                lines.append("")
-
-            lines.append("---\n")
-
-    # Contributors
-    if contributors.exists():
-        lines.append("## Contributors\n")
-
-        for i, contributor in enumerate(contributors[:20], 1):  # Top 20
-            rank_emoji = "🥇" if i == 1 else "🥈" if i == 2 else "🥉" if i == 3 else f"#{i}"
-            lines.append(f"### {rank_emoji} @{contributor.github_username} (Impact Score: {contributor.impact_score})\n")
-            lines.append(f"- **Commits:** {contributor.total_commits}")
-            lines.append(f"- **Lines Added:** {contributor.total_additions:,}")
-            lines.append(f"- **Lines Removed:** {contributor.total_deletions:,}")
-            lines.append(f"- **PRs Opened/Merged:** {contributor.prs_opened}/{contributor.prs_merged}")
-            lines.append(f"- **Issues Opened/Closed:** {contributor.issues_opened}/{contributor.issues_closed}")
-            lines.append("")
-
-    # Footer
-    lines.append("---\n")
-    lines.append("*Generated by [CommitSaga](https://github.com/yashChouriya/commitsaga) - Understand Your Code History*")
-
-    return "\n".join(lines)
+    finally:
+        # Identical requests arriving from now on hit the Export row (or start afresh)
+        if cache_key:
+            cache.delete(pending_export_key(cache_key))
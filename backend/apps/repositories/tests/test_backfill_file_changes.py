@@ -0,0 +1,72 @@
+"""
+Tests for the backfill_file_changes management command.
+"""
+
+from datetime import datetime, timezone
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from apps.repositories.models import (
+    CommitData,
+    CommitFileChange,
+    FilePath,
+    PathActivityRollup,
+    Repository,
+)
+from apps.users.models import User
+
+
+class BackfillFileChangesTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='owner@example.com', username='owner', password='x')
+        self.repository = Repository.objects.create(
+            user=user,
+            github_repo_url='https://github.com/octo/app',
+            repo_name='app',
+            owner='octo',
+        )
+
+    def _commit(self, sha, files_changed):
+        return CommitData.objects.create(
+            repository=self.repository,
+            commit_sha=sha.ljust(40, '0'),
+            commit_message='Change',
+            commit_date=datetime(2024, 1, 3, tzinfo=timezone.utc),
+            author_name='dev',
+            files_changed=files_changed,
+        )
+
+    def test_copies_legacy_lists_and_empties_them(self):
+        legacy = self._commit('a', [
+            {'filename': 'src/app.py', 'additions': 3, 'deletions': 1, 'status': 'modified'},
+            {'filename': 'README.md', 'additions': 1, 'deletions': 0, 'status': 'added'},
+        ])
+        refetched = self._commit('b', [{'filename': 'old.py', 'additions': 9, 'deletions': 9, 'status': 'modified'}])
+        path = FilePath.objects.create(repository=self.repository, path='new.py')
+        CommitFileChange.objects.create(commit=refetched, path=path, additions=2)
+
+        call_command('backfill_file_changes', stdout=StringIO())
+
+        self.assertEqual(
+            sorted(legacy.file_changes.values_list('path__path', 'additions', 'deletions', 'status')),
+            [('README.md', 1, 0, 'added'), ('src/app.py', 3, 1, 'modified')],
+        )
+        # Rows written by a newer fetch are kept
+        self.assertEqual(list(refetched.file_changes.values_list('path__path', flat=True)), ['new.py'])
+        self.assertFalse(CommitData.objects.exclude(files_changed=[]).exists())
+        self.assertTrue(PathActivityRollup.objects.filter(repository=self.repository, path='src/app.py').exists())
+
+        # Re-running finds nothing left to copy
+        call_command('backfill_file_changes', stdout=StringIO())
+        self.assertEqual(CommitFileChange.objects.count(), 3)
+
+    def test_dry_run_saves_nothing(self):
+        self._commit('a', [{'filename': 'src/app.py', 'additions': 1, 'deletions': 0, 'status': 'modified'}])
+
+        out = StringIO()
+        call_command('backfill_file_changes', '--dry-run', stdout=out)
+
+        self.assertIn('Would backfill 1 commits', out.getvalue())
+        self.assertFalse(CommitFileChange.objects.exists())
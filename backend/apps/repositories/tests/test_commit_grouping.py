@@ -0,0 +1,171 @@
+"""
+Tests for the analyze stage, which groups commits into periods.
+
+Stage bodies are run directly, without the repository lease and the stage
+bookkeeping of `pipeline_stage` (which need Redis).
+"""
+
+import json
+from datetime import datetime, timedelta, timezone
+from unittest import mock
+
+from django.test import TestCase, override_settings
+
+from apps.repositories.models import CommitData, CommitGroup, DeletedRecord, PipelineRun, Repository
+from apps.repositories.record_exports import jsonl_export_lines
+from apps.repositories.tasks import analyze_repository_data, generate_ai_summaries
+from apps.users.models import User
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+# A Monday, so each week of commits is one weekly group
+FIRST_WEEK = datetime(2024, 1, 1, 12, tzinfo=timezone.utc)
+
+
+class NullProgress:
+    """Progress reporter that drops every update."""
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def run_stage(task, run, *args):
+    """Run a pipeline stage's body for `run`."""
+    run.progress = NullProgress()
+    return task.run.__wrapped__(task, run, *args)
+
+
+class FakeAIClient:
+    """AI client recording the periods and overall summaries it was asked for."""
+
+    group_calls = []
+    overall_calls = 0
+
+    def __init__(self, on_usage=None):
+        pass
+
+    def generate_commit_group_summary(self, commits, pull_requests, issues, start_date, end_date):
+        FakeAIClient.group_calls.append(start_date)
+        return {'summary': f'{start_date}: {len(commits)} commits'}
+
+    def generate_overall_summary(self, **kwargs):
+        FakeAIClient.overall_calls += 1
+        return 'Overall'
+
+    def calculate_impact_score(self, **kwargs):
+        return 0
+
+
+class GroupingTestCase(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(email='owner@example.com', username='owner', password='x')
+        self.repository = Repository.objects.create(
+            user=user,
+            github_repo_url='https://github.com/octo/app',
+            repo_name='app',
+            owner='octo',
+        )
+        for week in range(3):
+            for i in range(2):
+                self._commit(f'{week}{i}', FIRST_WEEK + timedelta(weeks=week, hours=i))
+        self.run = PipelineRun.objects.create(repository=self.repository, token='grouping')
+
+    def _commit(self, sha, commit_date):
+        return CommitData.objects.create(
+            repository=self.repository,
+            commit_sha=sha.ljust(40, '0'),
+            commit_message=f'Commit {sha}',
+            commit_date=commit_date,
+            author_name='dev',
+        )
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CommitGroupingTests(GroupingTestCase):
+    def _delta(self, since):
+        return [json.loads(line) for line in jsonl_export_lines(self.repository, since=since)]
+
+    def test_rerun_without_changes_produces_an_empty_delta(self):
+        run_stage(analyze_repository_data, self.run)
+        groups = dict(CommitGroup.objects.values_list('start_date', 'id'))
+        self.assertEqual(len(groups), 3)
+
+        snapshot = datetime.now(timezone.utc)
+        run_stage(analyze_repository_data, self.run)
+
+        self.assertEqual(dict(CommitGroup.objects.values_list('start_date', 'id')), groups)
+        self.assertEqual(self._delta(snapshot), [])
+        self.assertFalse(DeletedRecord.objects.exists())
+
+    def test_delta_after_a_new_commit_holds_only_that_commit_and_its_group(self):
+        run_stage(analyze_repository_data, self.run)
+        snapshot = datetime.now(timezone.utc)
+
+        self._commit('new', FIRST_WEEK + timedelta(weeks=2, hours=5))
+        run_stage(analyze_repository_data, self.run)
+
+        delta = [(record['op'], record['type'], record['key']) for record in self._delta(snapshot)]
+        self.assertEqual(
+            delta,
+            [('upsert', 'commit_group', 'weekly:2024-01-15'), ('upsert', 'commit', 'new'.ljust(40, '0'))],
+        )
+        self.assertEqual(CommitGroup.objects.get(start_date='2024-01-15').commit_count, 3)
+
+    def test_switching_group_type_tombstones_the_old_groups(self):
+        run_stage(analyze_repository_data, self.run)
+        run_stage(analyze_repository_data, self.run, 'monthly')
+
+        self.assertEqual(list(CommitGroup.objects.values_list('group_type', flat=True)), ['monthly'])
+        self.assertEqual(DeletedRecord.objects.filter(record_type='commit_group').count(), 3)
+        self.assertFalse(CommitData.objects.filter(commit_group=None).exists())
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+@mock.patch('apps.ai.client.AIClient', FakeAIClient)
+class GroupSummaryTests(GroupingTestCase):
+    def _refresh(self):
+        """Run the analyze and summaries stages, returning the LLM calls made."""
+        FakeAIClient.group_calls, FakeAIClient.overall_calls = [], 0
+        run_stage(analyze_repository_data, self.run)
+        run_stage(generate_ai_summaries, self.run)
+        return FakeAIClient.group_calls, FakeAIClient.overall_calls
+
+    def test_only_new_and_changed_groups_are_summarized(self):
+        self.assertEqual(self._refresh(), (['2024-01-01', '2024-01-08', '2024-01-15'], 1))
+        analyzed = dict(CommitGroup.objects.values_list('start_date', 'analyzed_at'))
+
+        # Nothing changed: no LLM calls at all
+        self.assertEqual(self._refresh(), ([], 0))
+
+        # A new commit in the last week: only that group (and the overview) is redone
+        self._commit('new', FIRST_WEEK + timedelta(weeks=2, hours=5))
+        self.assertEqual(self._refresh(), (['2024-01-15'], 1))
+
+        groups = CommitGroup.objects.order_by('start_date')
+        self.assertEqual(
+            [group.summary for group in groups],
+            ['2024-01-01: 2 commits', '2024-01-08: 2 commits', '2024-01-15: 3 commits'],
+        )
+        for group in groups[:2]:
+            self.assertEqual(group.analyzed_at, analyzed[group.start_date])
+
+    def test_rerunning_the_analyze_stage_keeps_summaries_and_tombstones(self):
+        # A first run, then a switch of group type that leaves tombstones behind
+        run_stage(analyze_repository_data, self.run, 'monthly')
+        self._refresh()
+
+        def state():
+            groups = CommitGroup.objects.order_by('start_date').values_list(
+                'id', 'summary', 'analyzed_at', 'updated_at'
+            )
+            tombstones = DeletedRecord.objects.order_by('pk').values_list('pk', 'record_key', 'deleted_at')
+            return list(groups), list(tombstones)
+
+        before = state()
+        self.assertEqual(len(before[1]), 1)
+
+        # A retried or resumed run executes the stage again
+        run_stage(analyze_repository_data, self.run)
+        run_stage(analyze_repository_data, self.run)
+
+        self.assertEqual(state(), before)
@@ -0,0 +1,107 @@
+"""
+Tests for starting and resuming pipeline runs when the broker is unavailable.
+
+The Redis-backed lease and progress reporter are replaced by in-memory stand-ins.
+"""
+
+import uuid
+from unittest import mock
+
+from django.test import TestCase, override_settings
+from kombu.exceptions import OperationalError
+from rest_framework.test import APIClient
+
+from apps.repositories.models import PipelineRun, PipelineStage, Repository
+from apps.repositories.tasks import resume_pipeline_run, start_repository_pipeline
+from apps.users.models import User
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+class FakeLease:
+    """In-memory RepositoryLease: one holder token per repository."""
+
+    holders = {}
+
+    def __init__(self, repository_id, token=None):
+        self.repository_id = repository_id
+        self.token = token or uuid.uuid4().hex
+
+    def acquire(self):
+        return self.holders.setdefault(self.repository_id, self.token) == self.token
+
+    def hand_off(self):
+        return self.holder() == self.token
+
+    def release(self):
+        if self.holder() == self.token:
+            del self.holders[self.repository_id]
+
+    def holder(self):
+        return self.holders.get(self.repository_id)
+
+
+class NullProgress:
+    def __init__(self, repository_id):
+        pass
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: None
+
+
+def _broker_down(*args, **kwargs):
+    canvas = mock.Mock()
+    canvas.apply_async.side_effect = OperationalError('Connection refused')
+    return canvas
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+@mock.patch('apps.repositories.tasks.repository_pipeline', _broker_down)
+@mock.patch('apps.repositories.progress.PipelineProgress', NullProgress)
+@mock.patch('apps.repositories.pipeline.RepositoryLease', FakeLease)
+@mock.patch('apps.repositories.locks.RepositoryLease', FakeLease)
+class PipelineEnqueueFailureTests(TestCase):
+    def setUp(self):
+        FakeLease.holders = {}
+        self.user = User.objects.create_user(email='owner@example.com', username='owner', password='x')
+        self.repository = Repository.objects.create(
+            user=self.user,
+            github_repo_url='https://github.com/octo/app',
+            repo_name='app',
+            owner='octo',
+        )
+
+    def _assert_failed(self, run):
+        run.refresh_from_db()
+        self.assertEqual(run.status, PipelineRun.Status.FAILED)
+        self.assertIn('Connection refused', run.error)
+        self.assertFalse(run.stages.exclude(status=PipelineStage.Status.SKIPPED).exists())
+        self.assertIsNone(FakeLease(self.repository.pk).holder())
+        self.repository.refresh_from_db()
+        self.assertEqual(self.repository.analysis_status, Repository.AnalysisStatus.FAILED)
+
+    def test_start_fails_the_run_and_releases_the_lease(self):
+        with self.assertRaises(OperationalError):
+            start_repository_pipeline(self.repository.pk)
+
+        self._assert_failed(PipelineRun.objects.get())
+
+    def test_resume_fails_the_run_and_releases_the_lease(self):
+        with self.assertRaises(OperationalError):
+            start_repository_pipeline(self.repository.pk)
+        run = PipelineRun.objects.get()
+
+        with self.assertRaises(OperationalError):
+            resume_pipeline_run(run)
+
+        self._assert_failed(run)
+
+    def test_reanalyze_answers_503_and_can_be_retried(self):
+        client = APIClient()
+        client.force_authenticate(self.user)
+        url = f'/api/repositories/{self.repository.pk}/reanalyze/'
+
+        self.assertEqual(client.post(url).status_code, 503)
+        # Not blocked by a phantom pipeline holding the lease
+        self.assertEqual(client.post(url).status_code, 503)
+        self.assertEqual(PipelineRun.objects.filter(status=PipelineRun.Status.FAILED).count(), 2)
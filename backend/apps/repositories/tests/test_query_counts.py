@@ -0,0 +1,113 @@
+"""
+Query-count regression tests for the commit group endpoints.
+
+The number of queries must not grow with the number of groups and nested
+commits serialized.
+"""
+
+from datetime import date, datetime, timedelta, timezone
+
+from django.core.cache import cache
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.repositories.models import (
+    CommitData,
+    CommitFileChange,
+    CommitGroup,
+    Contributor,
+    FilePath,
+    Repository,
+)
+from apps.users.models import User
+
+LOCMEM_CACHE = {'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}}
+
+
+@override_settings(CACHES=LOCMEM_CACHE)
+class CommitGroupQueryCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='owner@example.com', username='owner', password='x')
+        cls.small = cls._create_repository('small', groups=2, commits_per_group=2)
+        cls.large = cls._create_repository('large', groups=8, commits_per_group=5)
+
+    @classmethod
+    def _create_repository(cls, name, groups, commits_per_group):
+        repository = Repository.objects.create(
+            user=cls.user,
+            github_repo_url=f'https://github.com/octo/{name}',
+            repo_name=name,
+            owner='octo',
+            analysis_status=Repository.AnalysisStatus.COMPLETED,
+        )
+        contributors = [
+            Contributor.objects.create(repository=repository, github_username=f'{name}-dev{i}')
+            for i in range(3)
+        ]
+        path = FilePath.objects.create(repository=repository, path='src/app.py')
+
+        start = date(2024, 1, 1)
+        for g in range(groups):
+            group = CommitGroup.objects.create(
+                repository=repository,
+                start_date=start + timedelta(weeks=g),
+                end_date=start + timedelta(weeks=g, days=6),
+                commit_count=commits_per_group,
+            )
+            for c in range(commits_per_group):
+                commit = CommitData.objects.create(
+                    repository=repository,
+                    commit_group=group,
+                    contributor=contributors[c % len(contributors)],
+                    commit_sha=f'{name}{g:04d}{c:04d}'.ljust(40, '0'),
+                    commit_message=f'Commit {c} of week {g}',
+                    commit_date=datetime(2024, 1, 1, tzinfo=timezone.utc) + timedelta(weeks=g, hours=c),
+                    author_name='dev',
+                )
+                CommitFileChange.objects.create(commit=commit, path=path, additions=1)
+        return repository
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def _queries_for(self, repository, url_suffix):
+        """Number of queries needed to serve a data action of `repository`."""
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(f'/api/repositories/{repository.pk}/{url_suffix}')
+        cache.clear()
+        return len(queries)
+
+    def test_commit_groups_list(self):
+        # Repository, then the page of groups
+        with self.assertNumQueries(2):
+            response = self.client.get(f'/api/repositories/{self.large.pk}/commit_groups/')
+        self.assertEqual(len(response.json()['results']), 8)
+
+    def test_commit_groups_detail(self):
+        # Repository, the page of groups, then all of their commits with contributors
+        with self.assertNumQueries(3):
+            response = self.client.get(f'/api/repositories/{self.large.pk}/commit_groups/?detail=true')
+        groups = response.json()['results']
+        self.assertEqual(sum(len(group['commits']) for group in groups), 40)
+        self.assertTrue(all(commit['contributor_username'] for group in groups for commit in group['commits']))
+        self.assertNotIn('files_changed', groups[0]['commits'][0])
+
+    def test_commit_groups_detail_with_files(self):
+        # ...plus the file changes of those commits with their paths
+        with self.assertNumQueries(4):
+            response = self.client.get(
+                f'/api/repositories/{self.large.pk}/commit_groups/?detail=true&include_files=true'
+            )
+        commit = response.json()['results'][0]['commits'][0]
+        self.assertEqual(commit['files_changed'][0]['filename'], 'src/app.py')
+
+    def test_commit_groups_detail_query_count_is_independent_of_size(self):
+        for suffix in ('commit_groups/?detail=true', 'commit_groups/?detail=true&include_files=true&commits_limit=3'):
+            with self.subTest(suffix=suffix):
+                self.assertEqual(self._queries_for(self.small, suffix), self._queries_for(self.large, suffix))
@@ -2,19 +2,32 @@ from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Prefetch
 from django.shortcuts import get_object_or_404
+from django.utils import timezone
+from django.utils.dateparse import parse_date
 from github import Github, GithubException
+import redis
 
-from django.http import FileResponse, Http404
+from django.http import Http404
+from datetime import timedelta
+import json
 import os
+import uuid
 
+from apps.users.authentication import CachedTokenAuthentication
 from .models import (
     Repository,
     Contributor,
     CommitGroup,
+    CommitData,
+    CommitFileChange,
     PullRequest,
     Issue,
     Export,
+    PipelineRun,
 )
 from .serializers import (
     RepositorySerializer,
@@ -32,6 +45,30 @@ from .serializers import (
     ExportSerializer,
     CreateExportSerializer,
 )
+from .cache import stats_cache_key, versioned_response
+from .downloads import export_file_response
+from .exports import (
+    delete_export_files,
+    export_cache_key,
+    find_cached_export,
+    pending_export_key,
+)
+from .filters import filter_pull_requests, filter_issues
+from .pagination import (
+    CommitGroupCursorPagination,
+    PullRequestCursorPagination,
+    IssueCursorPagination,
+    ContributorCursorPagination,
+)
+from .progress import read_progress
+from .stats import repository_counts
+from .record_exports import JSONL_CONTENT_TYPE, PARQUET_CONTENT_TYPE
+
+EXPORT_CONTENT_TYPES = {
+    Export.ExportFormat.MARKDOWN: 'text/markdown',
+    Export.ExportFormat.JSONL: JSONL_CONTENT_TYPE,
+    Export.ExportFormat.PARQUET: PARQUET_CONTENT_TYPE,
+}
 
 
 class RepositoryViewSet(viewsets.ModelViewSet):
@@ -62,6 +99,43 @@ class RepositoryViewSet(viewsets.ModelViewSet):
             return RepositoryUpdateSerializer
         return RepositorySerializer
 
+    def get_object(self):
+        """Return the repository, loaded once per request"""
+        if not hasattr(self, '_repository'):
+            self._repository = super().get_object()
+        return self._repository
+
+    def _get_requested_fields(self):
+        """Parse the `fields` query param into a list of field names"""
+        fields = self.request.query_params.get('fields')
+        if not fields:
+            return None
+        return [name.strip() for name in fields.split(',') if name.strip()]
+
+    def _list_response(self, queryset, serializer_class, pagination_class, ordering=None, **serializer_kwargs):
+        """
+        Serialize a nested repository data queryset.
+
+        Responses are always cursor-paginated (`page_size` up to the pagination
+        class's max_page_size), and limited to the requested `fields` when given.
+        `ordering` overrides the pagination class ordering.
+        """
+        fields = self._get_requested_fields()
+        ordering = ordering or pagination_class.ordering
+
+        if fields:
+            # Only load the requested columns when they are all plain model fields
+            concrete_fields = {f.name for f in queryset.model._meta.concrete_fields}
+            if set(fields) <= concrete_fields:
+                ordering_fields = {name.lstrip('-') for name in ordering} & concrete_fields
+                queryset = queryset.only(*set(fields) | ordering_fields)
+
+        paginator = pagination_class()
+        paginator.ordering = ordering
+        page = paginator.paginate_queryset(queryset, self.request, view=self)
+        serializer = serializer_class(page, many=True, fields=fields, **serializer_kwargs)
+        return paginator.get_paginated_response(serializer.data)
+
     def create(self, request, *args, **kwargs):
         """
         Add a new repository
@@ -133,13 +207,19 @@ class RepositoryViewSet(viewsets.ModelViewSet):
         )
 
         # Trigger Celery task for fetching repository data
-        from .tasks import fetch_repository_data
-        fetch_repository_data.delay(repository.id)
+        from .tasks import start_repository_pipeline
+        message = 'Repository added successfully. Data fetching has started.'
+        try:
+            start_repository_pipeline(repository.id)
+        except Exception as e:
+            # The repository is kept, marked failed; it can be re-analyzed later
+            repository.refresh_from_db()
+            message = f'Repository added, but data fetching could not be started: {str(e)}'
 
         return Response(
             {
                 'repository': RepositorySerializer(repository).data,
-                'message': 'Repository added successfully. Data fetching has started.'
+                'message': message
             },
             status=status.HTTP_201_CREATED
         )
@@ -148,6 +228,8 @@ class RepositoryViewSet(viewsets.ModelViewSet):
         """Delete a repository and all related data"""
         instance = self.get_object()
         repo_name = instance.full_name
+        for export in instance.exports.all():
+            delete_export_files(export)
         self.perform_destroy(instance)
         return Response(
             {'message': f'Repository {repo_name} deleted successfully.'},
@@ -160,111 +242,240 @@ class RepositoryViewSet(viewsets.ModelViewSet):
         Trigger re-analysis of a repository
 
         POST /api/repositories/{id}/reanalyze/
+
+        Query params:
+        - resume: 'true' to resume the last pipeline run, if it failed, at the
+          stage that failed instead of starting over
         """
         repository = self.get_object()
+        resume = request.query_params.get('resume', 'false').lower() == 'true'
+
+        from .tasks import resume_pipeline_run, start_repository_pipeline
 
-        if repository.analysis_status in [
-            Repository.AnalysisStatus.FETCHING,
-            Repository.AnalysisStatus.ANALYZING
-        ]:
+        last_run = repository.pipeline_runs.first()
+        try:
+            if resume and last_run and last_run.status == PipelineRun.Status.FAILED:
+                started = resume_pipeline_run(last_run)
+                message = 'Re-analysis resumed.'
+            else:
+                # Starts only if no pipeline holds the repository's lease
+                _, started = start_repository_pipeline(repository.id)
+                message = 'Re-analysis started.'
+        except Exception as e:
+            # The run was failed and its lease released, so a retry can start it
+            return Response(
+                {'error': f'Failed to start re-analysis: {str(e)}'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
+
+        if not started:
             return Response(
                 {'error': 'Analysis is already in progress.'},
                 status=status.HTTP_400_BAD_REQUEST
             )
 
-        # Reset status and trigger analysis
-        repository.analysis_status = Repository.AnalysisStatus.PENDING
-        repository.analysis_error = None
-        repository.save()
-
-        from .tasks import fetch_repository_data
-        fetch_repository_data.delay(repository.id)
+        repository.refresh_from_db()
 
         return Response({
-            'message': 'Re-analysis started.',
+            'message': message,
             'repository': RepositorySerializer(repository).data
         })
 
     @action(detail=True, methods=['get'])
+    @versioned_response
     def contributors(self, request, pk=None):
         """
         Get contributors for a repository
 
         GET /api/repositories/{id}/contributors/
+        Query params:
+            - fields: comma-separated list of fields to return
+            - cursor / page_size: paginate by impact score
         """
         repository = self.get_object()
         contributors = repository.contributors.all()
-        serializer = ContributorSerializer(contributors, many=True)
-        return Response(serializer.data)
+        return self._list_response(
+            contributors, ContributorSerializer, ContributorCursorPagination
+        )
 
     @action(detail=True, methods=['get'])
+    @versioned_response
     def commit_groups(self, request, pk=None):
         """
         Get commit groups for a repository
 
         GET /api/repositories/{id}/commit_groups/
+        Query params:
+            - detail: 'true' to include commits
+            - commits_limit: max nested commits per group (detail only)
+            - include_files: 'true' to include files_changed on nested commits
+            - fields: comma-separated list of fields to return
+            - cursor / page_size: paginate by start date
         """
         repository = self.get_object()
         commit_groups = repository.commit_groups.all()
 
         # Use lighter serializer for list view
         detail = request.query_params.get('detail', 'false').lower() == 'true'
-        if detail:
-            serializer = CommitGroupSerializer(commit_groups, many=True)
-        else:
-            serializer = CommitGroupListSerializer(commit_groups, many=True)
+        if not detail:
+            return self._list_response(
+                commit_groups, CommitGroupListSerializer, CommitGroupCursorPagination
+            )
 
-        return Response(serializer.data)
+        include_files = request.query_params.get('include_files', 'false').lower() == 'true'
+        try:
+            commits_limit = int(request.query_params.get('commits_limit', 0))
+        except ValueError:
+            return Response(
+                {'error': 'commits_limit must be an integer.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        # Load nested commits and their contributors in one query for the whole page
+        commits = CommitData.objects.select_related('contributor').order_by('-commit_date')
+        if include_files:
+            commits = commits.prefetch_related(
+                Prefetch('file_changes', queryset=CommitFileChange.objects.select_related('path'))
+            )
+        if commits_limit > 0:
+            commits = commits[:commits_limit]
+        commit_groups = commit_groups.prefetch_related(
+            Prefetch('commits', queryset=commits, to_attr='prefetched_commits')
+        )
+
+        return self._list_response(
+            commit_groups,
+            CommitGroupSerializer,
+            CommitGroupCursorPagination,
+            include_files=include_files,
+        )
 
     @action(detail=True, methods=['get'])
+    @versioned_response
     def pull_requests(self, request, pk=None):
         """
         Get pull requests for a repository
 
         GET /api/repositories/{id}/pull_requests/
+        Query params:
+            - state, author: exact match
+            - label: required label (repeatable)
+            - created_after/before, merged_after/before, closed_after/before: date range
+            - q: full-text search over title, description and discussion
+            - ordering: e.g. '-merged_at' (defaults to search rank, then newest)
+            - detail: 'true' for the full serializer
+            - fields: comma-separated list of fields to return
+            - cursor / page_size: paginate in the requested ordering
         """
         repository = self.get_object()
         pull_requests = repository.pull_requests.all()
 
-        # Filter by state if provided
-        state = request.query_params.get('state')
-        if state:
-            pull_requests = pull_requests.filter(state=state)
+        pull_requests, ordering = filter_pull_requests(pull_requests, request.query_params)
 
         # Use lighter serializer for list view
         detail = request.query_params.get('detail', 'false').lower() == 'true'
-        if detail:
-            serializer = PullRequestSerializer(pull_requests, many=True)
-        else:
-            serializer = PullRequestListSerializer(pull_requests, many=True)
+        serializer_class = PullRequestSerializer if detail else PullRequestListSerializer
 
-        return Response(serializer.data)
+        return self._list_response(
+            pull_requests, serializer_class, PullRequestCursorPagination, ordering=ordering
+        )
 
     @action(detail=True, methods=['get'])
+    @versioned_response
     def issues(self, request, pk=None):
         """
         Get issues for a repository
 
         GET /api/repositories/{id}/issues/
+        Query params:
+            - state, author: exact match
+            - label: required label (repeatable)
+            - created_after/before, closed_after/before: date range
+            - q: full-text search over title, descriptions, discussion and linked PR
+            - ordering: e.g. '-closed_at' (defaults to search rank, then newest)
+            - detail: 'true' for the full serializer
+            - fields: comma-separated list of fields to return
+            - cursor / page_size: paginate in the requested ordering
         """
         repository = self.get_object()
         issues = repository.issues.all()
 
-        # Filter by state if provided
-        state = request.query_params.get('state')
-        if state:
-            issues = issues.filter(state=state)
+        issues, ordering = filter_issues(issues, request.query_params)
 
         # Use lighter serializer for list view
         detail = request.query_params.get('detail', 'false').lower() == 'true'
-        if detail:
-            serializer = IssueSerializer(issues, many=True)
-        else:
-            serializer = IssueListSerializer(issues, many=True)
+        serializer_class = IssueSerializer if detail else IssueListSerializer
 
-        return Response(serializer.data)
+        return self._list_response(
+            issues, serializer_class, IssueCursorPagination, ordering=ordering
+        )
+
+    @action(detail=True, methods=['get'], url_path='issues/search')
+    @versioned_response
+    def search_issues(self, request, pk=None):
+        """
+        Search issues by text, ranked by relevance, with highlighted snippets
+
+        GET /api/repositories/{id}/issues/search/?q=<query>
+        Query params:
+            - q: web-search style query (quoted phrases, OR, -exclusions)
+            - state: only issues in this state
+            - limit: number of hits to return (default: 20, max: 100)
+        """
+        from apps.analysis.issue_search import search_issues
+
+        repository = self.get_object()
+
+        query = request.query_params.get('q', '').strip()
+        if not query:
+            return Response(
+                {'error': 'q is required.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        hits = search_issues(
+            repository, query, limit=limit, state=request.query_params.get('state')
+        )
+        return Response({'query': query, 'results': hits})
+
+    @action(detail=True, methods=['get'], url_path=r'issues/(?P<issue_number>\d+)/similar')
+    @versioned_response
+    def similar_issues(self, request, pk=None, issue_number=None):
+        """
+        Get issues similar to the given issue
+
+        GET /api/repositories/{id}/issues/{issue_number}/similar/
+        Query params:
+            - limit: number of issues to return (default: 10, max: 50)
+        """
+        from apps.analysis.issue_search import similar_issues
+
+        repository = self.get_object()
+        issue = get_object_or_404(repository.issues, issue_number=issue_number)
+
+        try:
+            limit = min(int(request.query_params.get('limit', 10)), 50)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'issue_number': issue.issue_number,
+            'similar': similar_issues(issue, limit=limit),
+        })
 
     @action(detail=True, methods=['get'])
+    @versioned_response
     def summary(self, request, pk=None):
         """
         Get the latest overall summary for a repository
@@ -283,6 +494,105 @@ class RepositoryViewSet(viewsets.ModelViewSet):
         serializer = OverallSummarySerializer(summary)
         return Response(serializer.data)
 
+    @action(detail=True, methods=['get'])
+    @versioned_response
+    def hotspots(self, request, pk=None):
+        """
+        Get the most-churned files and directories with their top contributors
+
+        GET /api/repositories/{id}/hotspots/
+        Query params:
+            - path: directory to drill into (default: repository root)
+            - since / until: date window (YYYY-MM-DD)
+            - limit: number of paths to return (default: 20, max: 100)
+        """
+        from apps.analysis.hotspots import get_hotspots
+
+        repository = self.get_object()
+        path = request.query_params.get('path', '').strip('/')
+
+        window = {}
+        for param in ['since', 'until']:
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                window[param] = parse_date(value)
+            except ValueError:
+                window[param] = None
+            if window[param] is None:
+                return Response(
+                    {'error': f'{param} must be a date in YYYY-MM-DD format.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response(
+                {'error': 'limit must be an integer.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response({
+            'path': path,
+            'since': window.get('since'),
+            'until': window.get('until'),
+            'hotspots': get_hotspots(repository, path=path, limit=limit, **window),
+        })
+
+    @action(detail=True, methods=['get'])
+    @versioned_response
+    def timeline(self, request, pk=None):
+        """
+        Get daily activity downsampled into time buckets
+
+        GET /api/repositories/{id}/timeline/
+        Query params:
+            - start / end: date window (YYYY-MM-DD, default: full history)
+            - resolution: auto, day, week, month, quarter or year (default: auto)
+            - points: maximum number of buckets for auto resolution (default: 300, max: 2000)
+        """
+        from apps.analysis.timeline import RESOLUTIONS, get_timeline
+
+        repository = self.get_object()
+
+        window = {}
+        for param in ['start', 'end']:
+            value = request.query_params.get(param)
+            if not value:
+                continue
+            try:
+                window[param] = parse_date(value)
+            except ValueError:
+                window[param] = None
+            if window[param] is None:
+                return Response(
+                    {'error': f'{param} must be a date in YYYY-MM-DD format.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        resolution = request.query_params.get('resolution', 'auto')
+        if resolution != 'auto' and resolution not in RESOLUTIONS:
+            return Response(
+                {'error': f"resolution must be one of: auto, {', '.join(RESOLUTIONS)}."},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        try:
+            points = int(request.query_params.get('points', 300))
+        except ValueError:
+            points = 0
+        if not 1 <= points <= 2000:
+            return Response(
+                {'error': 'points must be an integer between 1 and 2000.'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        return Response(
+            get_timeline(repository, resolution=resolution, points=points, **window)
+        )
+
     @action(detail=True, methods=['get'])
     def branches(self, request, pk=None):
         """
@@ -322,23 +632,23 @@ class RepositoryViewSet(viewsets.ModelViewSet):
         Get statistics for a repository
 
         GET /api/repositories/{id}/stats/
+        Query params:
+            - fresh: '1' to bypass the cached counts
         """
         repository = self.get_object()
 
+        cache_key = stats_cache_key(repository.id)
+        fresh = request.query_params.get('fresh', '').lower() in ['1', 'true']
+        stats = None if fresh else cache.get(cache_key)
+        if stats is None:
+            stats = repository_counts(repository)
+            cache.set(cache_key, stats, settings.REPOSITORY_STATS_CACHE_TIMEOUT)
+
         return Response({
             'repository': repository.full_name,
             'analysis_status': repository.analysis_status,
             'last_analyzed_at': repository.last_analyzed_at,
-            'stats': {
-                'total_commits': repository.commits.count(),
-                'total_contributors': repository.contributors.count(),
-                'total_prs': repository.pull_requests.count(),
-                'total_issues': repository.issues.count(),
-                'open_prs': repository.pull_requests.filter(state='open').count(),
-                'merged_prs': repository.pull_requests.filter(state='merged').count(),
-                'open_issues': repository.issues.filter(state='open').count(),
-                'closed_issues': repository.issues.filter(state='closed').count(),
-            },
+            'stats': stats,
             'github_stats': {
                 'stars': repository.stars_count,
                 'forks': repository.forks_count,
@@ -346,6 +656,36 @@ class RepositoryViewSet(viewsets.ModelViewSet):
             }
         })
 
+    @action(
+        detail=True,
+        methods=['get'],
+        authentication_classes=[CachedTokenAuthentication],
+    )
+    def progress(self, request, pk=None):
+        """
+        Live progress of the repository's current (or last) pipeline run
+
+        GET /api/repositories/{id}/progress/
+
+        Served from Redis without querying Postgres, so it can be polled.
+        Without recent progress (or if Redis is unavailable) the stored
+        analysis status is returned instead, with `run_id` null.
+        """
+        try:
+            progress = read_progress(pk)
+        except redis.RedisError:
+            progress = None
+
+        if progress is None or progress.pop('user_id') != str(request.user.pk):
+            repository = self.get_object()
+            return Response({
+                'run_id': None,
+                'status': repository.analysis_status,
+                'stages': [],
+            })
+
+        return Response(progress)
+
     @action(detail=True, methods=['get'])
     def exports(self, request, pk=None):
         """
@@ -366,6 +706,11 @@ class RepositoryViewSet(viewsets.ModelViewSet):
         POST /api/repositories/{id}/export/
         Body: { "export_type": "complete" } or
               { "export_type": "weekly", "date_range_start": "2024-01-01", "date_range_end": "2024-01-07" }
+        Optional: "chunk_tokens": 100000 to split the export into self-contained
+                  chunks of at most that many tokens, listed in a manifest
+                  "export_format": "markdown" (default), "jsonl" or "parquet"
+                  "since_export_id": "<export id>" for a JSONL delta of the records
+                  created, updated or deleted since that export
         """
         repository = self.get_object()
 
@@ -380,17 +725,76 @@ class RepositoryViewSet(viewsets.ModelViewSet):
         serializer.is_valid(raise_exception=True)
 
         export_type = serializer.validated_data['export_type']
+        export_format = serializer.validated_data['export_format']
         date_range_start = serializer.validated_data.get('date_range_start')
         date_range_end = serializer.validated_data.get('date_range_end')
+        chunk_tokens = serializer.validated_data.get('chunk_tokens')
+        since_export_id = serializer.validated_data.get('since_export_id')
 
-        # Trigger Celery task for generating markdown export
-        from .tasks import generate_markdown_export
-        task = generate_markdown_export.delay(
-            str(repository.id),
+        if since_export_id:
+            base_export = repository.exports.filter(id=since_export_id).first()
+            if base_export is None:
+                return Response(
+                    {'error': 'since_export_id does not match an export of this repository.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+            # Deletions are only remembered for the retention period
+            oldest_snapshot = timezone.now() - timedelta(days=settings.EXPORT_TOMBSTONE_RETENTION_DAYS)
+            if (base_export.snapshot_at or base_export.created_at) < oldest_snapshot:
+                return Response(
+                    {'error': 'The base export is too old for a delta; request a full export.'},
+                    status=status.HTTP_400_BAD_REQUEST
+                )
+
+        # Identical parameters against unchanged data reuse the existing export
+        cache_key = export_cache_key(
+            repository,
             export_type,
-            str(date_range_start) if date_range_start else None,
-            str(date_range_end) if date_range_end else None,
+            date_range_start,
+            date_range_end,
+            chunk_tokens,
+            export_format,
+            since_export_id,
         )
+        export = find_cached_export(repository, cache_key)
+        if export:
+            return Response({
+                'message': 'Export is up to date.',
+                'export': ExportSerializer(export).data,
+            }, status=status.HTTP_200_OK)
+
+        # Concurrent identical requests share the task already generating it
+        pending_key = pending_export_key(cache_key)
+        task_id = str(uuid.uuid4())
+        if not cache.add(pending_key, task_id, timeout=settings.EXPORT_PENDING_TIMEOUT):
+            return Response({
+                'message': 'Export generation already in progress.',
+                'task_id': cache.get(pending_key, task_id),
+            }, status=status.HTTP_202_ACCEPTED)
+
+        # Trigger Celery task for generating markdown export
+        from .tasks import generate_markdown_export
+        try:
+            task = generate_markdown_export.apply_async(
+                args=[
+                    str(repository.id),
+                    export_type,
+                    str(date_range_start) if date_range_start else None,
+                    str(date_range_end) if date_range_end else None,
+                    chunk_tokens,
+                    cache_key,
+                    export_format,
+                    str(since_export_id) if since_export_id else None,
+                ],
+                task_id=task_id,
+            )
+        except Exception as e:
+            # Nothing is generating the export, so don't block identical requests
+            cache.delete(pending_key)
+            return Response(
+                {'error': f'Failed to start export generation: {str(e)}'},
+                status=status.HTTP_503_SERVICE_UNAVAILABLE
+            )
 
         return Response({
             'message': 'Export generation started.',
@@ -420,18 +824,56 @@ class ExportViewSet(viewsets.ReadOnlyModelViewSet):
         Download an export file
 
         GET /api/exports/{id}/download/
+        Query params:
+            - part: chunk number of a chunked export (without it, the manifest is returned)
+
+        Stored gzip files are sent with Content-Encoding: gzip when the client
+        accepts it; Range requests resume interrupted downloads.
         """
         export = self.get_object()
 
         if not export.file_path or not os.path.exists(export.file_path):
             raise Http404("Export file not found.")
 
-        # Get filename for download
-        filename = os.path.basename(export.file_path)
+        Export.objects.filter(pk=export.pk).update(last_accessed_at=timezone.now())
+
+        file_path = export.file_path
+        content_type = EXPORT_CONTENT_TYPES[export.export_format]
+        content_encoding = export.content_encoding
 
-        response = FileResponse(
-            open(export.file_path, 'rb'),
-            content_type='text/markdown',
+        if export.has_manifest:
+            part = request.query_params.get('part')
+            if part is None:
+                # The manifest itself is always stored uncompressed
+                content_type = 'application/json'
+                content_encoding = ''
+            else:
+                try:
+                    part = int(part)
+                except ValueError:
+                    part = 0
+                if not 1 <= part <= export.chunk_count:
+                    return Response(
+                        {'error': f'part must be between 1 and {export.chunk_count}.'},
+                        status=status.HTTP_400_BAD_REQUEST
+                    )
+                with open(file_path, encoding='utf-8') as f:
+                    chunk = json.load(f)['chunks'][part - 1]
+                file_path = os.path.join(os.path.dirname(file_path), chunk['file'])
+                if not os.path.exists(file_path):
+                    raise Http404("Export file not found.")
+
+        # Get filename for download, named after the decoded content
+        filename = os.path.basename(file_path)
+        if content_encoding and filename.endswith('.gz'):
+            filename = filename[:-len('.gz')]
+        if export.has_manifest:
+            filename = f"{os.path.basename(os.path.dirname(file_path))}_{filename}"
+
+        return export_file_response(
+            request,
+            file_path,
+            filename,
+            content_type=content_type,
+            content_encoding=content_encoding,
         )
-        response['Content-Disposition'] = f'attachment; filename="{filename}"'
-        return response
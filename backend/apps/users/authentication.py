@@ -0,0 +1,33 @@
+"""
+Token authentication for frequently polled endpoints.
+"""
+
+from django.conf import settings
+from django.core.cache import cache
+from rest_framework.authentication import TokenAuthentication
+
+from .models import User
+
+
+def auth_token_cache_key(key: str) -> str:
+    return f"auth:token:{key}"
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """
+    Token authentication that remembers token -> user id in the cache.
+
+    Only the first request within AUTH_TOKEN_CACHE_SECONDS looks the token up
+    in Postgres. The authenticated user is an unsaved User carrying just its
+    id, so only use this on views that need nothing else from the user.
+    """
+
+    def authenticate_credentials(self, key):
+        cache_key = auth_token_cache_key(key)
+        user_id = cache.get(cache_key)
+        if user_id is not None:
+            return User(pk=user_id, is_active=True), key
+
+        user, token = super().authenticate_credentials(key)
+        cache.set(cache_key, str(user.pk), timeout=settings.AUTH_TOKEN_CACHE_SECONDS)
+        return user, token
@@ -0,0 +1,71 @@
+"""
+Re-encrypt stored GitHub tokens with the primary encryption key.
+
+Usage:
+    python manage.py rotate_github_tokens [--batch-size 500] [--dry-run]
+
+To rotate keys, prepend a new key to GITHUB_TOKEN_ENCRYPTION_KEY (keeping
+the old ones after it), deploy, run this command, then drop the old keys.
+Tokens are read and rewritten in batches; tokens already encrypted with the
+primary key are left alone, so the command can be re-run safely.
+"""
+
+from cryptography.fernet import InvalidToken
+from django.core.management.base import BaseCommand, CommandError
+
+from apps.users.models import User
+from apps.users.tokens import forget_token, rotate_token, token_fernets
+
+
+class Command(BaseCommand):
+    help = 'Re-encrypt stored GitHub tokens with the primary encryption key'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help='Count tokens to rotate without saving')
+
+    def handle(self, *args, **options):
+        try:
+            token_fernets()
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        batch_size = options['batch_size']
+        users = (
+            User.objects.exclude(github_token__isnull=True)
+            .exclude(github_token='')
+            .only('id', 'github_token')
+            .order_by('pk')
+        )
+
+        rotated, current, unreadable = 0, 0, []
+        batch = []
+        for user in users.iterator(chunk_size=batch_size):
+            try:
+                ciphertext = rotate_token(user.github_token)
+            except InvalidToken:
+                unreadable.append(str(user.pk))
+                continue
+            if ciphertext is None:
+                current += 1
+                continue
+
+            forget_token(user.github_token)
+            user.github_token = ciphertext
+            batch.append(user)
+            if len(batch) >= batch_size:
+                rotated += self._save(batch, options['dry_run'])
+                batch = []
+        rotated += self._save(batch, options['dry_run'])
+
+        verb = 'Would rotate' if options['dry_run'] else 'Rotated'
+        self.stdout.write(self.style.SUCCESS(f"{verb} {rotated} tokens; {current} already use the primary key"))
+        if unreadable:
+            self.stdout.write(self.style.ERROR(
+                f"{len(unreadable)} tokens cannot be decrypted with any configured key: {', '.join(unreadable)}"
+            ))
+
+    def _save(self, users, dry_run):
+        if users and not dry_run:
+            User.objects.bulk_update(users, ['github_token'])
+        return len(users)
@@ -1,8 +1,8 @@
 import uuid
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from cryptography.fernet import Fernet
-from django.conf import settings
+
+from .tokens import decrypt_token, encrypt_token, forget_token, token_fernets
 
 
 class User(AbstractUser):
@@ -29,31 +29,23 @@ class User(AbstractUser):
 
     def set_github_token(self, token: str) -> None:
         """Encrypt and store GitHub token"""
+        if self.github_token:
+            forget_token(self.github_token)
         if not token:
             self.github_token = None
             return
 
-        encryption_key = settings.GITHUB_TOKEN_ENCRYPTION_KEY
-        if not encryption_key:
-            raise ValueError("GITHUB_TOKEN_ENCRYPTION_KEY not configured")
-
-        fernet = Fernet(encryption_key.encode())
-        encrypted_token = fernet.encrypt(token.encode())
-        self.github_token = encrypted_token.decode()
+        self.github_token = encrypt_token(token)
 
     def get_github_token(self) -> str | None:
         """Decrypt and return GitHub token"""
         if not self.github_token:
             return None
 
-        encryption_key = settings.GITHUB_TOKEN_ENCRYPTION_KEY
-        if not encryption_key:
-            raise ValueError("GITHUB_TOKEN_ENCRYPTION_KEY not configured")
-
+        # Raises ValueError if no encryption key is configured
+        token_fernets()
         try:
-            fernet = Fernet(encryption_key.encode())
-            decrypted_token = fernet.decrypt(self.github_token.encode())
-            return decrypted_token.decode()
+            return decrypt_token(self.github_token)
         except Exception:
             return None
 
@@ -0,0 +1,90 @@
+"""
+Encryption of stored GitHub tokens.
+
+GITHUB_TOKEN_ENCRYPTION_KEY holds one or more comma-separated Fernet keys,
+newest first: tokens are encrypted with the first and decrypted with any of
+them (MultiFernet), so a key can be rotated by prepending a new one and
+running `manage.py rotate_github_tokens` before the old one is removed.
+
+The key objects are built once per process. Decrypted tokens are kept in a
+small in-process cache for GITHUB_TOKEN_CACHE_SECONDS, keyed by ciphertext:
+a changed token has a new ciphertext, so it never hits a stale entry, and
+set_github_token() drops the entry of the token it replaces.
+"""
+
+import threading
+import time
+from functools import lru_cache
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
+from django.conf import settings
+
+# Decrypted tokens kept per process; the oldest are dropped beyond this
+TOKEN_CACHE_SIZE = 1024
+
+_decrypted = {}
+_decrypted_lock = threading.Lock()
+
+
+@lru_cache(maxsize=4)
+def _fernets(keys: str):
+    fernets = [Fernet(key.strip().encode()) for key in keys.split(",") if key.strip()]
+    return fernets[0], MultiFernet(fernets)
+
+
+def token_fernets():
+    """(primary Fernet, MultiFernet over all keys) for the configured keys."""
+    keys = settings.GITHUB_TOKEN_ENCRYPTION_KEY
+    if not keys:
+        raise ValueError("GITHUB_TOKEN_ENCRYPTION_KEY not configured")
+    return _fernets(keys)
+
+
+def encrypt_token(token: str) -> str:
+    """Encrypt a token with the primary key."""
+    _, fernet = token_fernets()
+    return fernet.encrypt(token.encode()).decode()
+
+
+def decrypt_token(ciphertext: str) -> str:
+    """
+    Decrypt a stored token, from the in-process cache when possible.
+
+    Raises InvalidToken if no configured key can decrypt it.
+    """
+    now = time.monotonic()
+    with _decrypted_lock:
+        cached = _decrypted.get(ciphertext)
+    if cached and cached[1] > now:
+        return cached[0]
+
+    _, fernet = token_fernets()
+    token = fernet.decrypt(ciphertext.encode()).decode()
+
+    with _decrypted_lock:
+        if len(_decrypted) >= TOKEN_CACHE_SIZE:
+            # Dicts keep insertion order: drop the oldest entry
+            _decrypted.pop(next(iter(_decrypted)))
+        _decrypted[ciphertext] = (token, now + settings.GITHUB_TOKEN_CACHE_SECONDS)
+    return token
+
+
+def forget_token(ciphertext: str) -> None:
+    """Drop a token from the decrypted-token cache."""
+    with _decrypted_lock:
+        _decrypted.pop(ciphertext, None)
+
+
+def rotate_token(ciphertext: str):
+    """
+    Re-encrypt a token stored under an older key with the primary key.
+
+    Returns the new ciphertext, or None if the token already uses the
+    primary key. Raises InvalidToken if no configured key can decrypt it.
+    """
+    primary, fernet = token_fernets()
+    try:
+        primary.decrypt(ciphertext.encode())
+        return None
+    except InvalidToken:
+        return fernet.rotate(ciphertext.encode()).decode()
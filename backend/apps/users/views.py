@@ -4,8 +4,10 @@ from rest_framework.permissions import AllowAny, IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from github import Github, GithubException
 
+from .authentication import auth_token_cache_key
 from .serializers import (
     UserSerializer,
     SignupSerializer,
@@ -69,6 +71,7 @@ def logout_view(request):
     POST /api/auth/logout/
     """
     try:
+        cache.delete(auth_token_cache_key(request.user.auth_token.key))
         request.user.auth_token.delete()
         return Response({
             'message': 'Logout successful'
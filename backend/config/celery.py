@@ -19,9 +19,11 @@ app.autodiscover_tasks()
 
 # Celery Beat schedule for periodic tasks
 app.conf.beat_schedule = {
-    'update-repositories-weekly': {
+    # Hourly (REPOSITORY_UPDATE_WINDOW_SECONDS); each repository's own cron
+    # frequency decides when it is due
+    'update-repositories': {
         'task': 'apps.analysis.tasks.update_all_repositories',
-        'schedule': crontab(day_of_week='monday', hour=0, minute=0),
+        'schedule': crontab(minute=0),
     },
 }
 
@@ -24,6 +24,7 @@ INSTALLED_APPS = [
     'django.contrib.sessions',
     'django.contrib.messages',
     'django.contrib.staticfiles',
+    'django.contrib.postgres',
 
     # Third party apps
     'rest_framework',
@@ -149,6 +150,35 @@ CELERY_TASK_SERIALIZER = 'json'
 CELERY_RESULT_SERIALIZER = 'json'
 CELERY_TIMEZONE = TIME_ZONE
 
+# Queues by workload, so a large backfill or export cannot hold up other work:
+# github_io and llm are I/O bound (run with threads), db_heavy and export are
+# CPU/database bound (run with prefork). Light bookkeeping tasks stay on the
+# default "celery" queue. See docs/celery-queues.md for worker settings.
+CELERY_TASK_ROUTES = {
+    'apps.repositories.tasks.fetch_repository_data': {'queue': 'github_io'},
+    'apps.repositories.tasks.fetch_repository_commits': {'queue': 'github_io'},
+    'apps.repositories.tasks.fetch_repository_pull_requests': {'queue': 'github_io'},
+    'apps.repositories.tasks.fetch_repository_issues': {'queue': 'github_io'},
+    'apps.repositories.tasks.generate_ai_summaries': {'queue': 'llm'},
+    'apps.repositories.tasks.index_repository_data': {'queue': 'db_heavy'},
+    'apps.repositories.tasks.analyze_repository_data': {'queue': 'db_heavy'},
+    'apps.repositories.tasks.generate_markdown_export': {'queue': 'export'},
+}
+
+# Task priorities 0 (highest) to 9; Redis consumes the steps below in order.
+# Unprioritized messages would count as 0, so tasks get a middle default.
+# Redis redelivers messages not acknowledged within visibility_timeout seconds,
+# including tasks waiting on a countdown, so countdowns are kept below it.
+CELERY_BROKER_TRANSPORT_OPTIONS = {
+    'priority_steps': [0, 3, 6, 9],
+    'visibility_timeout': config('CELERY_VISIBILITY_TIMEOUT', default=3600, cast=int),
+}
+CELERY_TASK_DEFAULT_PRIORITY = 3
+
+# Reserve one task per worker process at a time, so a high-priority task is
+# not stuck behind low-priority ones a worker has already prefetched
+CELERY_WORKER_PREFETCH_MULTIPLIER = 1
+
 # Redis Cache
 CACHES = {
     'default': {
@@ -157,8 +187,69 @@ CACHES = {
     }
 }
 
+# Seconds to keep repository stats cached (invalidated when a pipeline finishes)
+REPOSITORY_STATS_CACHE_TIMEOUT = config('REPOSITORY_STATS_CACHE_TIMEOUT', default=3600, cast=int)
+
+# Seconds to keep rendered repository data responses (keyed on the data version)
+REPOSITORY_RESPONSE_CACHE_TIMEOUT = config('REPOSITORY_RESPONSE_CACHE_TIMEOUT', default=86400, cast=int)
+
+# Total bytes of export files kept on disk; least recently used exports are evicted beyond it
+EXPORT_STORAGE_QUOTA_BYTES = config('EXPORT_STORAGE_QUOTA_BYTES', default=5 * 1024 ** 3, cast=int)
+
+# Seconds an identical export request is folded into the one already generating
+EXPORT_PENDING_TIMEOUT = config('EXPORT_PENDING_TIMEOUT', default=3600, cast=int)
+
+# Compression for stored export files: 'gzip', or '' to store plain markdown
+EXPORT_COMPRESSION = config('EXPORT_COMPRESSION', default='gzip')
+
+# Hand export downloads to the web server instead of streaming them from a worker:
+# 'X-Accel-Redirect' (nginx) or 'X-Sendfile' (Apache/lighttpd); empty streams in-process
+EXPORT_SENDFILE_HEADER = config('EXPORT_SENDFILE_HEADER', default='')
+
+# nginx internal location mapped to the exports directory, used with X-Accel-Redirect
+EXPORT_SENDFILE_PREFIX = config('EXPORT_SENDFILE_PREFIX', default='/protected-exports/')
+
+# Days deleted records are remembered for delta exports; older bases need a full export
+EXPORT_TOMBSTONE_RETENTION_DAYS = config('EXPORT_TOMBSTONE_RETENTION_DAYS', default=90, cast=int)
+
+# Seconds between scheduler runs (the beat interval); updates enqueued by a run are spread across it,
+# or across the broker's visibility timeout less a margin, if that is shorter
+REPOSITORY_UPDATE_WINDOW_SECONDS = config('REPOSITORY_UPDATE_WINDOW_SECONDS', default=3600, cast=int)
+
+# Maximum repository updates enqueued by one scheduler run
+REPOSITORY_UPDATE_BATCH_SIZE = config('REPOSITORY_UPDATE_BATCH_SIZE', default=200, cast=int)
+
+# GitHub requests per user and hour the scheduler may spend (GitHub allows 5000 per token)
+GITHUB_HOURLY_REQUEST_BUDGET = config('GITHUB_HOURLY_REQUEST_BUDGET', default=4000, cast=int)
+
+# Estimated GitHub requests of one incremental repository update
+GITHUB_UPDATE_REQUEST_COST = config('GITHUB_UPDATE_REQUEST_COST', default=400, cast=int)
+
+# Redis holding pipeline leases and live progress (see apps/repositories/locks.py, progress.py)
+PIPELINE_REDIS_URL = config('REDIS_URL', default='redis://localhost:6379/1')
+
+# Seconds a pipeline lease outlives a worker that stopped extending it
+PIPELINE_LEASE_SECONDS = config('PIPELINE_LEASE_SECONDS', default=300, cast=int)
+
+# Seconds a pipeline lease is held between stages, while the next one is queued
+PIPELINE_HANDOFF_SECONDS = config('PIPELINE_HANDOFF_SECONDS', default=3600, cast=int)
+
 # Anthropic API Key
 ANTHROPIC_API_KEY = config('ANTHROPIC_API_KEY', default='')
 
-# GitHub Token Encryption Key
+# Per-repository token budget for one run of issue problem/solution summaries
+AI_ISSUE_SUMMARY_TOKEN_BUDGET = config('AI_ISSUE_SUMMARY_TOKEN_BUDGET', default=200000, cast=int)
+
+# Estimated tokens and number of issues packed into a single summary call
+AI_ISSUE_SUMMARY_BATCH_TOKENS = config('AI_ISSUE_SUMMARY_BATCH_TOKENS', default=8000, cast=int)
+AI_ISSUE_SUMMARY_BATCH_SIZE = config('AI_ISSUE_SUMMARY_BATCH_SIZE', default=15, cast=int)
+
+# Seconds CachedTokenAuthentication reuses a token lookup (logout clears it right away)
+AUTH_TOKEN_CACHE_SECONDS = config('AUTH_TOKEN_CACHE_SECONDS', default=60, cast=int)
+
+# GitHub Token Encryption Key(s): comma-separated Fernet keys, newest first. The
+# first encrypts, all decrypt; see `manage.py rotate_github_tokens`
 GITHUB_TOKEN_ENCRYPTION_KEY = config('GITHUB_TOKEN_ENCRYPTION_KEY', default='')
+
+# Seconds a worker process keeps a decrypted GitHub token in memory
+GITHUB_TOKEN_CACHE_SECONDS = config('GITHUB_TOKEN_CACHE_SECONDS', default=300, cast=int)
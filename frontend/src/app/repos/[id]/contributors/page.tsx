@@ -2,9 +2,9 @@
 
 import { useEffect, useState } from "react";
 import { useParams } from "next/navigation";
-import { repositoriesApi } from "@/lib/repositories";
+import { repositoriesApi, pageCursor } from "@/lib/repositories";
 import type { Contributor } from "@/types";
-import { GlassCard, AnimatedSection } from "@/components/ui";
+import { GlassCard, AnimatedSection, Button } from "@/components/ui";
 import {
   Users,
   Trophy,
@@ -27,6 +27,8 @@ export default function ContributorsPage() {
 
   const [contributors, setContributors] = useState<Contributor[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [selectedContributor, setSelectedContributor] =
     useState<Contributor | null>(null);
 
@@ -39,8 +41,9 @@ export default function ContributorsPage() {
   const loadContributors = async () => {
     try {
       setLoading(true);
-      const data = await repositoriesApi.getContributors(repoId);
-      setContributors(data);
+      const page = await repositoriesApi.getContributors(repoId);
+      setContributors(page.results);
+      setNextCursor(pageCursor(page.next));
     } catch (error) {
       console.error("Failed to load contributors:", error);
     } finally {
@@ -48,6 +51,19 @@ export default function ContributorsPage() {
     }
   };
 
+  const loadMoreContributors = async () => {
+    try {
+      setLoadingMore(true);
+      const page = await repositoriesApi.getContributors(repoId, nextCursor);
+      setContributors((prev) => [...prev, ...page.results]);
+      setNextCursor(pageCursor(page.next));
+    } catch (error) {
+      console.error("Failed to load more contributors:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   if (loading) {
     return (
       <div className="flex items-center justify-center py-20">
@@ -148,6 +164,19 @@ export default function ContributorsPage() {
                     />
                   ))}
                 </div>
+
+                {nextCursor && (
+                  <div className="flex justify-center mt-4">
+                    <Button
+                      variant="secondary"
+                      size="sm"
+                      loading={loadingMore}
+                      onClick={loadMoreContributors}
+                    >
+                      Load more
+                    </Button>
+                  </div>
+                )}
               </GlassCard>
             </AnimatedSection>
           )}
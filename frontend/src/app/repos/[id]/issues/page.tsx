@@ -2,9 +2,9 @@
 
 import { useEffect, useState } from "react";
 import { useParams } from "next/navigation";
-import { repositoriesApi } from "@/lib/repositories";
-import type { Issue, IssueListItem } from "@/types";
-import { GlassCard, AnimatedSection } from "@/components/ui";
+import { repositoriesApi, pageCursor, type CursorPage } from "@/lib/repositories";
+import type { Issue, IssueListItem, RepositoryStats } from "@/types";
+import { GlassCard, AnimatedSection, Button } from "@/components/ui";
 import {
   CircleDot,
   CheckCircle,
@@ -27,20 +27,51 @@ export default function IssuesPage() {
   const [issues, setIssues] = useState<IssueListItem[]>([]);
   const [loading, setLoading] = useState(true);
   const [filter, setFilter] = useState<FilterState>("all");
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Cursor of the page each issue was loaded from, to fetch its detail page
+  const [pageCursors, setPageCursors] = useState<
+    Record<string, string | null>
+  >({});
+  const [repositoryStats, setRepositoryStats] =
+    useState<RepositoryStats | null>(null);
   const [selectedIssue, setSelectedIssue] = useState<Issue | null>(null);
   const [loadingDetail, setLoadingDetail] = useState(false);
 
+  const stateParam = filter === "all" ? undefined : filter;
+
   useEffect(() => {
     if (repoId) {
-      loadIssues();
+      repositoriesApi
+        .getStats(repoId)
+        .then(setRepositoryStats)
+        .catch((error) => console.error("Failed to load stats:", error));
     }
   }, [repoId]);
 
+  useEffect(() => {
+    if (repoId) {
+      loadIssues();
+    }
+  }, [repoId, filter]);
+
+  const fetchPage = async (cursor: string | null) => {
+    const page = (await repositoriesApi.getIssues(repoId, {
+      state: stateParam,
+      cursor,
+    })) as CursorPage<IssueListItem>;
+    const cursors = Object.fromEntries(
+      page.results.map((issue) => [issue.id, cursor])
+    );
+    setPageCursors((prev) => (cursor ? { ...prev, ...cursors } : cursors));
+    setNextCursor(pageCursor(page.next));
+    return page.results;
+  };
+
   const loadIssues = async () => {
     try {
       setLoading(true);
-      const data = (await repositoriesApi.getIssues(repoId)) as IssueListItem[];
-      setIssues(data);
+      setIssues(await fetchPage(null));
     } catch (error) {
       console.error("Failed to load issues:", error);
     } finally {
@@ -48,13 +79,27 @@ export default function IssuesPage() {
     }
   };
 
+  const loadMoreIssues = async () => {
+    try {
+      setLoadingMore(true);
+      const results = await fetchPage(nextCursor);
+      setIssues((prev) => [...prev, ...results]);
+    } catch (error) {
+      console.error("Failed to load more issues:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const loadIssueDetail = async (issue: IssueListItem) => {
     try {
       setLoadingDetail(true);
-      const data = (await repositoriesApi.getIssues(repoId, {
+      const page = (await repositoriesApi.getIssues(repoId, {
+        state: stateParam,
         detail: true,
-      })) as Issue[];
-      const detail = data.find((i) => i.id === issue.id);
+        cursor: pageCursors[issue.id],
+      })) as CursorPage<Issue>;
+      const detail = page.results.find((i) => i.id === issue.id);
       if (detail) {
         setSelectedIssue(detail);
       }
@@ -65,30 +110,25 @@ export default function IssuesPage() {
     }
   };
 
-  const filteredIssues = issues.filter((issue) => {
-    if (filter === "all") return true;
-    return issue.state === filter;
-  });
-
   const stats = {
-    total: issues.length,
-    open: issues.filter((issue) => issue.state === "open").length,
-    closed: issues.filter((issue) => issue.state === "closed").length,
+    total: repositoryStats?.stats.total_issues ?? 0,
+    open: repositoryStats?.stats.open_issues ?? 0,
+    closed: repositoryStats?.stats.closed_issues ?? 0,
   };
 
   // Categorize issues by labels
   const categorizedIssues = {
-    bugs: filteredIssues.filter((issue) =>
+    bugs: issues.filter((issue) =>
       issue.labels.some((l) => l.toLowerCase().includes("bug"))
     ),
-    features: filteredIssues.filter((issue) =>
+    features: issues.filter((issue) =>
       issue.labels.some(
         (l) =>
           l.toLowerCase().includes("feature") ||
           l.toLowerCase().includes("enhancement")
       )
     ),
-    others: filteredIssues.filter(
+    others: issues.filter(
       (issue) =>
         !issue.labels.some(
           (l) =>
@@ -167,7 +207,7 @@ export default function IssuesPage() {
       </AnimatedSection>
 
       {/* Issues List */}
-      {filteredIssues.length === 0 ? (
+      {issues.length === 0 ? (
         <GlassCard className="text-center py-16">
           <CircleDot className="w-12 h-12 text-gray-500 mx-auto mb-4" />
           <h3 className="text-lg font-semibold text-white mb-2">
@@ -219,6 +259,19 @@ export default function IssuesPage() {
               delay={450}
             />
           )}
+
+          {nextCursor && (
+            <div className="flex justify-center">
+              <Button
+                variant="secondary"
+                size="sm"
+                loading={loadingMore}
+                onClick={loadMoreIssues}
+              >
+                Load more
+              </Button>
+            </div>
+          )}
         </div>
       )}
 
@@ -3,7 +3,7 @@
 import { useEffect, useState } from "react";
 import { useParams } from "next/navigation";
 import Link from "next/link";
-import { repositoriesApi } from "@/lib/repositories";
+import { repositoriesApi, type CursorPage } from "@/lib/repositories";
 import type {
   RepositoryStats,
   OverallSummary,
@@ -55,14 +55,14 @@ export default function RepositoryOverviewPage() {
           repositoriesApi.getSummary(repoId).catch(() => null),
           repositoriesApi.getContributors(repoId),
           repositoriesApi.getCommitGroups(repoId) as Promise<
-            CommitGroupListItem[]
+            CursorPage<CommitGroupListItem>
           >,
         ]);
 
       setStats(statsData);
       setSummary(summaryData);
-      setContributors(contributorsData);
-      setCommitGroups(groupsData);
+      setContributors(contributorsData.results);
+      setCommitGroups(groupsData.results);
     } catch (error) {
       console.error("Failed to load repository data:", error);
     } finally {
@@ -2,9 +2,9 @@
 
 import { useEffect, useState } from "react";
 import { useParams } from "next/navigation";
-import { repositoriesApi } from "@/lib/repositories";
-import type { PullRequest, PullRequestListItem } from "@/types";
-import { GlassCard, AnimatedSection } from "@/components/ui";
+import { repositoriesApi, pageCursor, type CursorPage } from "@/lib/repositories";
+import type { PullRequest, PullRequestListItem, RepositoryStats } from "@/types";
+import { GlassCard, AnimatedSection, Button } from "@/components/ui";
 import {
   GitPullRequest,
   GitMerge,
@@ -29,22 +29,51 @@ export default function PullRequestsPage() {
   const [pullRequests, setPullRequests] = useState<PullRequestListItem[]>([]);
   const [loading, setLoading] = useState(true);
   const [filter, setFilter] = useState<FilterState>("all");
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
+  // Cursor of the page each PR was loaded from, to fetch its detail page
+  const [pageCursors, setPageCursors] = useState<
+    Record<string, string | null>
+  >({});
+  const [repositoryStats, setRepositoryStats] =
+    useState<RepositoryStats | null>(null);
   const [selectedPR, setSelectedPR] = useState<PullRequest | null>(null);
   const [loadingDetail, setLoadingDetail] = useState(false);
 
+  const stateParam = filter === "all" ? undefined : filter;
+
   useEffect(() => {
     if (repoId) {
-      loadPullRequests();
+      repositoriesApi
+        .getStats(repoId)
+        .then(setRepositoryStats)
+        .catch((error) => console.error("Failed to load stats:", error));
     }
   }, [repoId]);
 
+  useEffect(() => {
+    if (repoId) {
+      loadPullRequests();
+    }
+  }, [repoId, filter]);
+
+  const fetchPage = async (cursor: string | null) => {
+    const page = (await repositoriesApi.getPullRequests(repoId, {
+      state: stateParam,
+      cursor,
+    })) as CursorPage<PullRequestListItem>;
+    const cursors = Object.fromEntries(
+      page.results.map((pr) => [pr.id, cursor])
+    );
+    setPageCursors((prev) => (cursor ? { ...prev, ...cursors } : cursors));
+    setNextCursor(pageCursor(page.next));
+    return page.results;
+  };
+
   const loadPullRequests = async () => {
     try {
       setLoading(true);
-      const data = (await repositoriesApi.getPullRequests(
-        repoId
-      )) as PullRequestListItem[];
-      setPullRequests(data);
+      setPullRequests(await fetchPage(null));
     } catch (error) {
       console.error("Failed to load pull requests:", error);
     } finally {
@@ -52,13 +81,27 @@ export default function PullRequestsPage() {
     }
   };
 
+  const loadMorePullRequests = async () => {
+    try {
+      setLoadingMore(true);
+      const results = await fetchPage(nextCursor);
+      setPullRequests((prev) => [...prev, ...results]);
+    } catch (error) {
+      console.error("Failed to load more pull requests:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const loadPRDetail = async (pr: PullRequestListItem) => {
     try {
       setLoadingDetail(true);
-      const data = (await repositoriesApi.getPullRequests(repoId, {
+      const page = (await repositoriesApi.getPullRequests(repoId, {
+        state: stateParam,
         detail: true,
-      })) as PullRequest[];
-      const detail = data.find((p) => p.id === pr.id);
+        cursor: pageCursors[pr.id],
+      })) as CursorPage<PullRequest>;
+      const detail = page.results.find((p) => p.id === pr.id);
       if (detail) {
         setSelectedPR(detail);
       }
@@ -69,16 +112,14 @@ export default function PullRequestsPage() {
     }
   };
 
-  const filteredPRs = pullRequests.filter((pr) => {
-    if (filter === "all") return true;
-    return pr.state === filter;
-  });
-
+  const counts = repositoryStats?.stats;
   const stats = {
-    total: pullRequests.length,
-    open: pullRequests.filter((pr) => pr.state === "open").length,
-    merged: pullRequests.filter((pr) => pr.state === "merged").length,
-    closed: pullRequests.filter((pr) => pr.state === "closed").length,
+    total: counts?.total_prs ?? 0,
+    open: counts?.open_prs ?? 0,
+    merged: counts?.merged_prs ?? 0,
+    closed: counts
+      ? counts.total_prs - counts.open_prs - counts.merged_prs
+      : 0,
   };
 
   if (loading) {
@@ -157,7 +198,7 @@ export default function PullRequestsPage() {
       </AnimatedSection>
 
       {/* PR List */}
-      {filteredPRs.length === 0 ? (
+      {pullRequests.length === 0 ? (
         <GlassCard className="text-center py-16">
           <GitPullRequest className="w-12 h-12 text-gray-500 mx-auto mb-4" />
           <h3 className="text-lg font-semibold text-white mb-2">
@@ -171,7 +212,7 @@ export default function PullRequestsPage() {
         </GlassCard>
       ) : (
         <div className="space-y-3">
-          {filteredPRs.map((pr, index) => (
+          {pullRequests.map((pr, index) => (
             <AnimatedSection
               key={pr.id}
               animation="fade-up"
@@ -180,6 +221,19 @@ export default function PullRequestsPage() {
               <PRCard pr={pr} onClick={() => loadPRDetail(pr)} />
             </AnimatedSection>
           ))}
+
+          {nextCursor && (
+            <div className="flex justify-center pt-3">
+              <Button
+                variant="secondary"
+                size="sm"
+                loading={loadingMore}
+                onClick={loadMorePullRequests}
+              >
+                Load more
+              </Button>
+            </div>
+          )}
         </div>
       )}
 
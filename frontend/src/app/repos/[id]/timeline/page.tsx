@@ -2,9 +2,9 @@
 
 import { useEffect, useState } from "react";
 import { useParams } from "next/navigation";
-import { repositoriesApi } from "@/lib/repositories";
+import { repositoriesApi, pageCursor, type CursorPage } from "@/lib/repositories";
 import type { CommitGroup } from "@/types";
-import { GlassCard, AnimatedSection, Markdown } from "@/components/ui";
+import { GlassCard, AnimatedSection, Markdown, Button } from "@/components/ui";
 import {
   GitCommit,
   Calendar,
@@ -25,6 +25,8 @@ export default function TimelinePage() {
 
   const [commitGroups, setCommitGroups] = useState<CommitGroup[]>([]);
   const [loading, setLoading] = useState(true);
+  const [nextCursor, setNextCursor] = useState<string | null>(null);
+  const [loadingMore, setLoadingMore] = useState(false);
   const [expandedGroups, setExpandedGroups] = useState<Set<string>>(new Set());
 
   useEffect(() => {
@@ -36,11 +38,13 @@ export default function TimelinePage() {
   const loadCommitGroups = async () => {
     try {
       setLoading(true);
-      const groups = (await repositoriesApi.getCommitGroups(
+      const page = (await repositoriesApi.getCommitGroups(
         repoId,
         true
-      )) as CommitGroup[];
+      )) as CursorPage<CommitGroup>;
+      const groups = page.results;
       setCommitGroups(groups);
+      setNextCursor(pageCursor(page.next));
       // Auto-expand first group
       if (groups.length > 0) {
         setExpandedGroups(new Set([groups[0].id]));
@@ -52,6 +56,23 @@ export default function TimelinePage() {
     }
   };
 
+  const loadMoreCommitGroups = async () => {
+    try {
+      setLoadingMore(true);
+      const page = (await repositoriesApi.getCommitGroups(
+        repoId,
+        true,
+        nextCursor
+      )) as CursorPage<CommitGroup>;
+      setCommitGroups((prev) => [...prev, ...page.results]);
+      setNextCursor(pageCursor(page.next));
+    } catch (error) {
+      console.error("Failed to load more commit groups:", error);
+    } finally {
+      setLoadingMore(false);
+    }
+  };
+
   const toggleGroup = (groupId: string) => {
     setExpandedGroups((prev) => {
       const next = new Set(prev);
@@ -125,6 +146,19 @@ export default function TimelinePage() {
               </AnimatedSection>
             ))}
           </div>
+
+          {nextCursor && (
+            <div className="flex justify-center mt-6">
+              <Button
+                variant="secondary"
+                size="sm"
+                loading={loadingMore}
+                onClick={loadMoreCommitGroups}
+              >
+                Load more
+              </Button>
+            </div>
+          )}
         </div>
       )}
     </div>
@@ -24,6 +24,21 @@ interface PaginatedResponse<T> {
   results: T[];
 }
 
+// Cursor-paginated response of the repository data endpoints
+export interface CursorPage<T> {
+  next: string | null;
+  previous: string | null;
+  results: T[];
+}
+
+/**
+ * Extract the cursor from a page link (`next`/`previous`), to request that page
+ */
+export function pageCursor(url: string | null): string | null {
+  if (!url) return null;
+  return new URL(url).searchParams.get("cursor");
+}
+
 export interface CreateRepositoryRequest {
   github_repo_url: string;
   selected_branch?: string;
@@ -116,70 +131,78 @@ export const repositoriesApi = {
   },
 
   /**
-   * Get contributors for a repository
+   * Get a page of contributors for a repository
    */
-  async getContributors(id: string): Promise<Contributor[]> {
-    const response = await apiClient.get<Contributor[]>(
-      `/api/repositories/${id}/contributors/`
+  async getContributors(
+    id: string,
+    cursor?: string | null
+  ): Promise<CursorPage<Contributor>> {
+    const response = await apiClient.get<CursorPage<Contributor>>(
+      `/api/repositories/${id}/contributors/`,
+      { params: { cursor: cursor ?? undefined } }
     );
     return response.data;
   },
 
   /**
-   * Get commit groups for a repository
+   * Get a page of commit groups for a repository
    */
   async getCommitGroups(
     id: string,
-    detail: boolean = false
-  ): Promise<CommitGroup[] | CommitGroupListItem[]> {
-    const response = await apiClient.get<CommitGroup[] | CommitGroupListItem[]>(
-      `/api/repositories/${id}/commit_groups/`,
-      { params: { detail: detail.toString() } }
-    );
+    detail: boolean = false,
+    cursor?: string | null
+  ): Promise<CursorPage<CommitGroup> | CursorPage<CommitGroupListItem>> {
+    const response = await apiClient.get<
+      CursorPage<CommitGroup> | CursorPage<CommitGroupListItem>
+    >(`/api/repositories/${id}/commit_groups/`, {
+      params: { detail: detail.toString(), cursor: cursor ?? undefined },
+    });
     return response.data;
   },
 
   /**
-   * Get pull requests for a repository
+   * Get a page of pull requests for a repository
    */
   async getPullRequests(
     id: string,
     options?: {
       state?: "open" | "closed" | "merged";
       detail?: boolean;
+      cursor?: string | null;
     }
-  ): Promise<PullRequest[] | PullRequestListItem[]> {
-    const response = await apiClient.get<PullRequest[] | PullRequestListItem[]>(
-      `/api/repositories/${id}/pull_requests/`,
-      {
-        params: {
-          state: options?.state,
-          detail: options?.detail?.toString(),
-        },
-      }
-    );
+  ): Promise<CursorPage<PullRequest> | CursorPage<PullRequestListItem>> {
+    const response = await apiClient.get<
+      CursorPage<PullRequest> | CursorPage<PullRequestListItem>
+    >(`/api/repositories/${id}/pull_requests/`, {
+      params: {
+        state: options?.state,
+        detail: options?.detail?.toString(),
+        cursor: options?.cursor ?? undefined,
+      },
+    });
     return response.data;
   },
 
   /**
-   * Get issues for a repository
+   * Get a page of issues for a repository
    */
   async getIssues(
     id: string,
     options?: {
       state?: "open" | "closed";
       detail?: boolean;
+      cursor?: string | null;
     }
-  ): Promise<Issue[] | IssueListItem[]> {
-    const response = await apiClient.get<Issue[] | IssueListItem[]>(
-      `/api/repositories/${id}/issues/`,
-      {
-        params: {
-          state: options?.state,
-          detail: options?.detail?.toString(),
-        },
-      }
-    );
+  ): Promise<CursorPage<Issue> | CursorPage<IssueListItem>> {
+    const response = await apiClient.get<
+      CursorPage<Issue> | CursorPage<IssueListItem>
+    >(`/api/repositories/${id}/issues/`, {
+      params: {
+        state: options?.state,
+        detail: options?.detail?.toString(),
+        cursor: options?.cursor ?? undefined,
+      },
+    });
     return response.data;
   },
 